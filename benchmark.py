@@ -0,0 +1,553 @@
+# 감시 -> 인쇄 파이프라인 부하 발생기 / 벤치마크
+#
+# 실제 프린터 없이(null/file 인쇄 백엔드) 라벨 PNG를 정해진 속도와 몰림(burst) 형태로 날짜 폴더에 만들고,
+# LabelPrintHandler -> PrintScheduler -> print_label 전체 경로를 거쳐 처리량과 지연 시간을 측정합니다.
+# 결과는 JSON으로 저장해 릴리스 사이의 성능 저하를 비교할 수 있습니다.
+#
+#   python benchmark.py --labels 2000 --rate 200 --channels 2 --date-folders 2 --output bench.json
+#   python benchmark.py --shape burst --burst-size 100 --burst-interval 1 --baseline bench.json
+#   python benchmark.py --backend raw --raw-language zpl   (GDI 대신 ZPL을 로컬 소켓 프린터 대역으로 전송)
+#   python benchmark.py --input csv --csv-rows 500   (PNG 대신 CSV 데이터 파일 + 템플릿으로 같은 수의 라벨)
+#   python benchmark.py --watch-engine polling --prefill 20000 --idle-seconds 10   (파일이 많은 폴더에서 감시 방식 비교)
+#   python benchmark.py --driver http   (같은 라벨을 폴더 대신 라벨 수신 API로 보내 폴더 경로와 비교)
+#   python benchmark.py --label-size 4800 2400 --page-size 4800 2400 --rate 0 --labels 200 --render-processes 4 --render-compare
+#       (1200dpi 라벨을 렌더링 프로세스로 그렸을 때와 인쇄 스레드에서 그렸을 때의 처리량 비교)
+import os
+import sys
+import time
+import json
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import threading
+import logging
+import io
+import socket
+import http.client
+from datetime import datetime, timedelta
+from PIL import Image, ImageDraw, ImageFont
+
+import label_printer_watcher as lpw
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows
+
+
+# #####################################################################
+# 1. 라벨 이미지 생성
+# #####################################################################
+def make_label_png(serial, size=(400, 200)):
+    # 실제 라벨과 비슷하게 글자와 바코드 모양 막대를 그린 PNG 바이트를 만듭니다.
+    width, height = size
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default()
+    draw.rectangle([2, 2, width - 3, height - 3], outline="black", width=2)
+    draw.text((12, 10), f"ITEM KM-{serial % 97:02d}-{serial % 13}", fill="black", font=font)
+    draw.text((12, 28), f"LOT {datetime.now():%Y%m%d}-{serial:06d}", fill="black", font=font)
+    rng = random.Random(serial)
+    x, bar_top, bar_bottom = 12, height // 2 - 10, height - 30
+    while x < width - 16:
+        bar = rng.choice((1, 1, 2, 3))
+        draw.rectangle([x, bar_top, x + bar - 1, bar_bottom], fill="black")
+        x += bar + rng.choice((1, 2, 3))
+    draw.text((12, height - 24), f"{serial:012d}", fill="black", font=font)
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+def build_label_pool(count, unique, size):
+    # 미리 만들어 둔 PNG를 돌려 씁니다. (이미지 생성 시간이 측정에 섞이지 않도록)
+    # unique 개수만큼만 서로 다른 내용이므로, 작을수록 래스터 캐시 적중이 많은 현장(같은 품번 반복)과 비슷해집니다.
+    return [make_label_png(i, size) for i in range(max(1, min(count, unique)))]
+
+
+# #####################################################################
+# 2. 발생 시각 (속도 / 몰림 형태)
+# #####################################################################
+BENCH_TEMPLATE = {
+    "size": [400, 200],
+    "elements": [
+        {"type": "rect", "box": [4, 4, 395, 195], "width": 3},
+        {"type": "text", "xy": [20, 16], "text": "BENCHMARK LABEL", "size": 22},
+        {"type": "line", "points": [10, 50, 390, 50], "width": 2},
+        {"type": "text", "xy": [20, 70], "text": "S/N {serial}", "size": 28},
+        {"type": "text", "xy": [20, 120], "text": "LOT {lot}", "size": 22},
+    ],
+}
+
+def schedule_offsets(count, shape, rate, burst_size, burst_interval):
+    # 각 라벨을 쓸 시각(시작 기준 초)을 돌려줍니다.
+    if shape == "burst":
+        return [(i // burst_size) * burst_interval for i in range(count)]
+    if rate <= 0:
+        return [0.0] * count
+    if shape == "ramp":
+        # 0에서 rate까지 속도가 일정하게 늘어남: t = sqrt(2 * i * T / rate), T = 2 * count / rate
+        total = 2.0 * count / rate
+        return [(2.0 * i * total / rate) ** 0.5 for i in range(count)]
+    return [i / rate for i in range(count)]
+
+
+# #####################################################################
+# 3. 측정
+# #####################################################################
+def percentile_ms(values, pct):
+    return round(lpw.percentile(values, pct) * 1000, 3)
+
+def read_peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def read_os_thread_count():
+    # 파이썬 스레드 외에 watchdog(inotify) 등 네이티브 스레드까지 포함한 수
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+class ResourceSampler:
+    # 실행 중 최대 스레드 수를 주기적으로 기록합니다.
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_threads = threading.active_count()
+        self.peak_os_threads = read_os_thread_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bench-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            os_threads = read_os_thread_count()
+            if os_threads is not None:
+                self.peak_os_threads = max(self.peak_os_threads or 0, os_threads)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+class RawPrinterStandIn:
+    # 9100 포트 프린터 대역: 연결마다 받은 바이트를 세기만 합니다. (--backend raw)
+    def __init__(self):
+        self.bytes_received = 0
+        self.documents = 0
+        self._lock = threading.Lock()
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen(16)
+        self.port = self._server.getsockname()[1]
+        self._thread = threading.Thread(target=self._accept, name="bench-raw-printer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._receive, args=(conn,), daemon=True).start()
+
+    def _receive(self, conn):
+        received = 0
+        with conn:
+            while True:
+                chunk = conn.recv(65536)
+                if not chunk:
+                    break
+                received += len(chunk)
+        with self._lock:
+            self.bytes_received += received
+            self.documents += 1
+
+    def stop(self):
+        self._server.close()
+
+class CompletionTracker:
+    # 스케줄러 리스너: 라벨별 end-to-end 지연을 모으고, 모두 끝나면 알려줍니다.
+    def __init__(self, expected, sent=None):
+        self.expected = expected
+        self.sent = sent if sent is not None else {}  # 라벨 이름 -> 파일 쓰기/요청 시작 시각
+        self.latencies = []
+        self.client_latencies = []
+        self.spooled = 0
+        self.failed = 0
+        self.rejected = 0
+        self.first_finished_at = None
+        self.last_finished_at = None
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    def on_job_stage(self, job, stage):
+        if stage not in ("spooled", "failed", "rejected"):
+            return
+        with self._lock:
+            if stage == "spooled":
+                self.spooled += 1
+            elif stage == "failed":
+                self.failed += 1
+            else:
+                self.rejected += 1
+            if job.finished_at is not None:
+                self.latencies.append(job.end_to_end)
+                # 보내는 쪽에서 본 지연 (감지 전 구간 포함: 파일 쓰기 -> 감시 이벤트 / HTTP 요청 -> 접수)
+                sent_at = self.sent.get(os.path.basename(job.image_path).split("#")[0])
+                if sent_at is not None:
+                    self.client_latencies.append(job.finished_at - sent_at)
+                self.last_finished_at = job.finished_at
+                if self.first_finished_at is None:
+                    self.first_finished_at = job.finished_at
+            if self.spooled + self.failed + self.rejected >= self.expected:
+                self.done.set()
+
+
+# #####################################################################
+# 4. 실행
+# #####################################################################
+class BenchmarkRun:
+    def __init__(self, options, workdir):
+        self.options = options
+        self.workdir = workdir
+        self.folders = []  # [(channel_name, printer_name, folder), ...]
+        self.raw_printer = None
+        self.ingest = None
+        self.input_bytes = 0
+        self.sent = {}
+
+    def configure(self):
+        options = self.options
+        if options.backend == "raw":
+            self.raw_printer = RawPrinterStandIn()
+            self.raw_printer.start()
+            page_dots = list(lpw.CONFIG.get("virtual_page_size") or (812, 406))
+            lpw.CONFIG["raw_printers"] = {
+                f"BENCH-PRINTER-{c + 1}": {"language": options.raw_language, "transport": "tcp", "host": "127.0.0.1",
+                                           "port": self.raw_printer.port, "page_dots": page_dots}
+                for c in range(options.channels)}
+        lpw.CONFIG.update({
+            "print_backend": "null" if options.backend == "raw" else options.backend,
+            "print_output_folder": os.path.join(self.workdir, "print_output"),
+            "print_workers_per_printer": options.workers,
+            "batch_window_ms": options.batch_window_ms,
+            "batch_max_labels": options.batch_max_labels,
+            "raster_mode": options.raster_mode,
+            "print_queue_size": options.queue_size,
+            "render_processes": options.render_processes,
+            "render_lookahead": options.render_lookahead,
+            "render_min_kb": options.render_min_kb,
+        })
+        if options.page_size:
+            lpw.CONFIG["virtual_page_size"] = list(options.page_size)
+        today = datetime.now()
+        for c in range(options.channels):
+            base = os.path.join(self.workdir, f"channel{c + 1}")
+            for d in range(options.date_folders):
+                folder = os.path.join(base, (today - timedelta(days=d)).strftime(lpw.DATE_FOLDER_FORMAT))
+                os.makedirs(folder, exist_ok=True)
+                self.folders.append((f"bench{c + 1}", f"BENCH-PRINTER-{c + 1}", folder))
+        self.prefill()
+        if options.input == "csv":
+            template_folder = os.path.join(self.workdir, "templates")
+            os.makedirs(template_folder, exist_ok=True)
+            with open(os.path.join(template_folder, "bench.json"), "w", encoding="utf-8") as f:
+                json.dump(BENCH_TEMPLATE, f)
+            lpw.CONFIG.update({"template_folder": template_folder, "template_default": "bench"})
+
+    def prefill(self):
+        # 감시 시작 전에 이미 쌓여 있는 파일 (하루 동안 라벨이 많이 쌓인 폴더 흉내). 인쇄 대상이 아니도록 .txt로 만듭니다.
+        for _, _, folder in self.folders:
+            for i in range(self.options.prefill):
+                with open(os.path.join(folder, f"old_{i:07d}.txt"), "wb") as f:
+                    f.write(b"0")
+
+    def build_pipeline(self, tracker):
+        backend = lpw.create_print_backend(lpw.CONFIG["print_backend"])
+        scheduler = lpw.PrintScheduler(backend=backend, listeners=[tracker.on_job_stage])
+        readiness = lpw.FileReadinessTracker()
+        dedup = lpw.DedupIndex()
+        expander = lpw.DataFileExpander(scheduler, lpw.TemplateStore()) if self.options.input == "csv" else None
+        if self.options.driver == "http":
+            printers = {channel: printer for channel, printer, _ in self.folders}
+            folders = {channel: folder for channel, _, folder in self.folders}
+
+            def submit(channel, label, name, stages):
+                return scheduler.submit(os.path.join(folders[channel], "http", name), printers[channel], channel=channel,
+                                        stages=stages, label=label)
+            self.ingest = lpw.IngestServer(submit, lpw.TemplateStore(), 0)
+            self.ingest.start()
+        handlers = {}
+        for channel, printer, folder in self.folders:
+            if channel not in handlers:
+                handlers[channel] = lpw.LabelPrintHandler(printer, lambda: None, scheduler, readiness, dedup, channel=channel,
+                                                          expander=expander)
+        return backend, scheduler, readiness, handlers
+
+    def start_watching(self, handlers):
+        if self.options.driver != "watch":
+            return None
+        observer = lpw.PollingObserver() if self.options.watch_engine == "polling" else lpw.Observer()
+        for channel, _, folder in self.folders:
+            observer.schedule(handlers[channel], folder, recursive=False)
+        observer.start()
+        return observer
+
+    def write_labels(self, pool, offsets, handlers):
+        # 발생 시각에 맞춰 라벨 파일을 씁니다. driver=handler 이면 파일 시스템 이벤트 대신 핸들러를 직접 호출합니다.
+        # driver=http 이면 파일을 쓰지 않고 같은 내용을 라벨 수신 API로 보냅니다 (keep-alive 연결 하나).
+        from watchdog.events import FileCreatedEvent
+        connection = http.client.HTTPConnection("127.0.0.1", self.ingest.port) if self.ingest is not None else None
+        started_at = time.perf_counter()
+        step = self.options.csv_rows if self.options.input == "csv" else 1
+        for n, i in enumerate(range(0, len(offsets), step)):
+            delay = started_at + offsets[i] - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            channel, _, folder = self.folders[n % len(self.folders)]
+            if self.options.input == "csv":
+                # 라벨 step개를 CSV 한 파일로 (행마다 값만 다르고 그림은 템플릿에서)
+                path = os.path.join(folder, f"labels_{i:07d}.csv")
+                data = "serial,lot\n" + "".join(f"{j:07d},LOT-{j % self.options.unique:05d}\n"
+                                                 for j in range(i, min(i + step, len(offsets))))
+                data = data.encode("utf-8")
+            else:
+                path = os.path.join(folder, f"label_{i:07d}.png")
+                data = pool[i % len(pool)]
+            self.sent[os.path.basename(path)] = time.perf_counter()
+            self.input_bytes += len(data)
+            if connection is not None:
+                self.post_labels(connection, channel, os.path.basename(path), data)
+                continue
+            with open(path, "wb") as f:
+                f.write(data)
+            if self.options.driver == "handler":
+                handlers[channel].on_created(FileCreatedEvent(path))
+        if connection is not None:
+            connection.close()
+        return started_at, time.perf_counter()
+
+    def post_labels(self, connection, channel, name, data):
+        kind, content_type = ("batch", "text/csv") if self.options.input == "csv" else ("labels", "image/png")
+        connection.request("POST", f"/v1/channels/{channel}/{kind}?name={name}", data, {"Content-Type": content_type})
+        response = connection.getresponse()
+        body = response.read()
+        if response.status != 202:
+            raise RuntimeError(f"라벨 수신 API 오류 {response.status}: {body.decode('utf-8', 'replace')}")
+
+    def run(self):
+        options = self.options
+        self.configure()
+        pool = build_label_pool(options.labels, options.unique, tuple(options.label_size))
+        offsets = schedule_offsets(options.labels, options.shape, options.rate, options.burst_size, options.burst_interval)
+        tracker = CompletionTracker(options.labels, self.sent)
+        sampler = ResourceSampler()
+        sampler.start()
+        backend, scheduler, readiness, handlers = self.build_pipeline(tracker)
+        observer = self.start_watching(handlers)
+        time.sleep(0.2)  # 감시 시작 대기
+
+        cpu_started = time.process_time()
+        started_at, written_at = self.write_labels(pool, offsets, handlers)
+        completed = tracker.done.wait(options.timeout)
+        finished_at = tracker.last_finished_at or time.perf_counter()
+        cpu_busy = time.process_time() - cpu_started
+        # 라벨이 없는 동안 감시에 드는 CPU (polling은 간격이 최대로 늘어난 상태)
+        cpu_idle_started = time.process_time()
+        time.sleep(options.idle_seconds)
+        cpu_idle = time.process_time() - cpu_idle_started
+        wire = self.wire_bytes(pool, tracker.spooled)
+        polling = observer.stats() if isinstance(observer, lpw.PollingObserver) else None
+
+        if observer is not None:
+            observer.stop()
+            observer.join()
+        if self.ingest is not None:
+            self.ingest.stop()
+        readiness.stop()
+        scheduler.shutdown(wait=True, timeout=5)
+        render_pool = scheduler.render_pool.stats() if scheduler.render_pool is not None else None
+        lpw.shutdown_render_pool()
+        backend.close()
+        sampler.stop()
+
+        elapsed = max(1e-9, finished_at - started_at)
+        latencies = list(tracker.latencies)
+        client_latencies = list(tracker.client_latencies)
+        channel_stats = scheduler.channel_stats()
+        stages = {}
+        for stats in channel_stats.values():
+            for stage, stage_stats in stats["stages"].items():
+                stages.setdefault(stage, []).append(stage_stats)
+        return {
+            "completed": completed,
+            "labels": options.labels,
+            "spooled": tracker.spooled,
+            "failed": tracker.failed,
+            "rejected": tracker.rejected,
+            "lost": options.labels - tracker.spooled - tracker.failed - tracker.rejected,
+            "write_seconds": round(written_at - started_at, 3),
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_per_sec": round(tracker.spooled / elapsed, 2),
+            "latency_ms": {
+                "p50": percentile_ms(latencies, 50),
+                "p95": percentile_ms(latencies, 95),
+                "p99": percentile_ms(latencies, 99),
+                "max": round(max(latencies) * 1000, 3) if latencies else 0.0,
+            },
+            # 파일 쓰기(또는 HTTP 요청) 시작부터 스풀까지: 감시 이벤트 지연까지 포함해 driver 끼리 비교할 때 사용
+            "client_latency_ms": {
+                "p50": percentile_ms(client_latencies, 50),
+                "p95": percentile_ms(client_latencies, 95),
+                "p99": percentile_ms(client_latencies, 99),
+            },
+            # 채널별 p50/p95 중 가장 나쁜 값 (단계별 병목 확인용)
+            "stage_ms": {stage: {q: round(max(s[q] for s in values) * 1000, 3) for q in ("p50", "p95")}
+                         for stage, values in stages.items()},
+            "peak_rss_kb": read_peak_rss_kb(),
+            "peak_threads": sampler.peak_threads,
+            "peak_os_threads": sampler.peak_os_threads,
+            "raster_cache": lpw.get_raster_cache().stats(),
+            "readiness_timeouts": readiness.timeout_count,
+            "cpu_seconds": round(cpu_busy, 3),
+            "idle_cpu_percent": round(cpu_idle / options.idle_seconds * 100, 3) if options.idle_seconds else None,
+            "polling": polling,
+            "cpu_count": os.cpu_count(),
+            "render_pool": render_pool,
+            "input_bytes_per_label": round(self.input_bytes / options.labels) if options.labels else 0,
+            "bytes_per_label": wire[0],
+            "bytes_source": wire[1],
+        }
+
+    def wire_bytes(self, pool, spooled):
+        # raw: 프린터 대역이 받은 실제 바이트 / 그 외: GDI로 넘기는 페이지 래스터 크기 (드라이버 압축 전)
+        if self.raw_printer is not None:
+            time.sleep(0.1)
+            self.raw_printer.stop()
+            return (round(self.raw_printer.bytes_received / spooled) if spooled else 0), "socket"
+        mode = self.options.raster_mode
+        page = tuple(lpw.CONFIG.get("virtual_page_size") or (812, 406))
+        with Image.open(io.BytesIO(pool[0])) as img:
+            raster = lpw.render_label_raster(img, page, mode) if mode else img.convert("RGB")
+        return lpw.raster_size_bytes(raster), "raster"
+
+
+# #####################################################################
+# 5. 결과 저장 / 비교
+# #####################################################################
+def compare_with_baseline(result, baseline, tolerance):
+    # 처리량이 줄었거나 p95 지연이 늘어난 정도가 허용 비율을 넘으면 회귀로 봅니다.
+    regressions = []
+    old, new = baseline["result"], result["result"]
+    if old["throughput_per_sec"] and new["throughput_per_sec"] < old["throughput_per_sec"] * (1 - tolerance):
+        regressions.append(f"처리량 {old['throughput_per_sec']} -> {new['throughput_per_sec']} /s")
+    if old["latency_ms"]["p95"] and new["latency_ms"]["p95"] > old["latency_ms"]["p95"] * (1 + tolerance):
+        regressions.append(f"p95 지연 {old['latency_ms']['p95']} -> {new['latency_ms']['p95']} ms")
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="라벨 감시 -> 인쇄 파이프라인 벤치마크 (실제 프린터 없이 실행)")
+    parser.add_argument("--backend", choices=("null", "file", "raw"), default="null",
+                        help="인쇄 백엔드 (기본: null, raw: ZPL/EPL을 로컬 소켓 프린터 대역으로 전송)")
+    parser.add_argument("--raw-language", choices=sorted(lpw.RAW_ENCODERS), default="zpl", help="raw 백엔드의 프린터 언어")
+    parser.add_argument("--driver", choices=("watch", "handler", "http"), default="watch",
+                        help="watch: 실제 폴더 감시(watchdog) 경유 / handler: 이벤트를 직접 만들어 핸들러 호출 / http: 라벨 수신 API로 전송")
+    parser.add_argument("--watch-engine", choices=("native", "polling"), default="native",
+                        help="driver=watch 일 때 폴더 감시 방식 (기본: native)")
+    parser.add_argument("--prefill", type=int, default=0, help="감시 시작 전 폴더마다 미리 만들어 둘 파일 수")
+    parser.add_argument("--idle-seconds", type=float, default=0, help="처리 후 유휴 CPU 사용률을 잴 시간(초)")
+    parser.add_argument("--input", choices=("png", "csv"), default="png",
+                        help="png: 라벨마다 PNG 파일 / csv: CSV 데이터 파일 + 템플릿 (기본: png)")
+    parser.add_argument("--csv-rows", type=int, default=500, help="input=csv: 파일 하나의 라벨(행) 수")
+    parser.add_argument("--labels", type=int, default=1000, help="만들 라벨 수")
+    parser.add_argument("--rate", type=float, default=100.0, help="초당 라벨 수 (0: 최대한 빠르게)")
+    parser.add_argument("--shape", choices=("steady", "burst", "ramp"), default="steady", help="발생 형태")
+    parser.add_argument("--burst-size", type=int, default=50, help="burst: 한 번에 쏟아지는 라벨 수")
+    parser.add_argument("--burst-interval", type=float, default=1.0, help="burst: 몰림 사이 간격(초)")
+    parser.add_argument("--channels", type=int, default=1, help="감시 채널(기준 폴더/프린터) 수")
+    parser.add_argument("--date-folders", type=int, default=1, help="채널마다 라벨을 나눠 쓸 날짜 폴더 수")
+    parser.add_argument("--unique", type=int, default=1000, help="서로 다른 라벨 내용 수 (작을수록 캐시 적중 증가)")
+    parser.add_argument("--label-size", type=int, nargs=2, default=(400, 200), metavar=("W", "H"))
+    parser.add_argument("--workers", type=int, default=1, help="프린터당 인쇄 작업자 수")
+    parser.add_argument("--queue-size", type=int, default=1000, help="프린터별 대기열 크기")
+    parser.add_argument("--batch-window-ms", type=float, default=0, help="묶음 인쇄 대기 시간(ms)")
+    parser.add_argument("--batch-max-labels", type=int, default=50)
+    parser.add_argument("--raster-mode", default="L", help="래스터 모드 (1 / L / \"\")")
+    parser.add_argument("--page-size", type=int, nargs=2, metavar=("W", "H"), help="null/file 백엔드의 인쇄 가능 영역 (기본: 설정값)")
+    parser.add_argument("--render-processes", type=int, default=0, help="렌더링 프로세스 수 (0: 인쇄 스레드에서 그림)")
+    parser.add_argument("--render-lookahead", type=int, default=4, help="프린터별로 미리 그려 둘 라벨 수")
+    parser.add_argument("--render-min-kb", type=float, default=0, help="이보다 작은 PNG는 인쇄 스레드에서 그림 (KB)")
+    parser.add_argument("--render-compare", action="store_true",
+                        help="렌더링 프로세스 없이 한 번 더 실행해 병렬 속도 향상(render_speedup)을 함께 보고")
+    parser.add_argument("--timeout", type=float, default=120.0, help="모든 라벨 처리를 기다릴 최대 시간(초)")
+    parser.add_argument("--output", help="결과 JSON 파일 경로")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON (회귀 시 종료 코드 1)")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="회귀로 보지 않을 허용 비율 (기본 15%%)")
+    parser.add_argument("--keep", action="store_true", help="작업 폴더를 지우지 않고 남깁니다.")
+    parser.add_argument("--log-level", default="WARNING", help="프로그램 로그 레벨 (기본: WARNING)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    options = parse_args(argv)
+    logging.basicConfig(level=getattr(logging, options.log_level.upper(), logging.WARNING),
+                        format="%(asctime)s [%(levelname)s] %(message)s")
+    # 작업 폴더에 있는 config.json과 상관없이 기본 설정에서 측정합니다. (릴리스 사이 결과 비교용)
+    lpw.replace_config(lpw.build_config({}))
+    workdir = tempfile.mkdtemp(prefix="label_bench_")
+    try:
+        metrics = BenchmarkRun(options, os.path.join(workdir, "run")).run()
+        if options.render_compare and options.render_processes:
+            # 같은 라벨/발생 형태를 인쇄 스레드 렌더링으로 다시 실행합니다. (캐시를 비워 같은 조건에서 시작)
+            lpw.get_raster_cache().clear()
+            serial_options = argparse.Namespace(**dict(vars(options), render_processes=0))
+            serial = BenchmarkRun(serial_options, os.path.join(workdir, "serial")).run()
+            metrics["render_speedup"] = {
+                "serial_throughput_per_sec": serial["throughput_per_sec"],
+                "serial_latency_p50_ms": serial["latency_ms"]["p50"],
+                "serial_cpu_seconds": serial["cpu_seconds"],
+                "throughput_ratio": round(metrics["throughput_per_sec"] / serial["throughput_per_sec"], 3)
+                if serial["throughput_per_sec"] else None,
+            }
+    finally:
+        if options.keep:
+            print(f"작업 폴더: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "version": lpw.CONFIG.get("APP_VERSION"),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "options": {key: value for key, value in vars(options).items() if key not in ("output", "baseline", "keep")},
+        "result": metrics,
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    exit_code = 0 if metrics["completed"] else 1
+    if options.baseline:
+        with open(options.baseline, encoding="utf-8") as f:
+            regressions = compare_with_baseline(result, json.load(f), options.tolerance)
+        for regression in regressions:
+            print(f"[회귀] {regression}", file=sys.stderr)
+        if regressions:
+            exit_code = 1
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,585 @@
+# 라벨 자동 출력기 GUI (설정/로그/통계 창과 트레이 아이콘)
+# tkinter는 이 모듈에서만 불러오므로 --headless 실행이나 label_printer_watcher import 시에는 Tk를 읽지 않습니다.
+# label_printer_watcher.main()이 GUI 모드일 때만 import 합니다.
+import os
+import sys
+import time
+import logging
+import threading
+from datetime import date, datetime
+import tkinter as tk
+from tkinter import scrolledtext, messagebox, ttk, filedialog, simpledialog
+from PIL import Image, ImageDraw, ImageFont
+
+from label_printer_watcher import (
+    CHANNEL_CHOICES, CONFIG, DATE_FOLDER_FORMAT, StreamToLogger, UiLogBuffer, WatcherService, build_config,
+    get_print_backend, get_raster_cache, log, normalize_channel, resource_path, save_config, setup_logging,
+    threaded_update_check, without_cli_overrides,
+)
+
+# 프린터 속성 창/자동 실행 등록에 사용 (pywin32가 없으면 label_printer_watcher에서 이미 안내합니다)
+try:
+    import win32print
+    import win32con
+    import pywintypes
+    import winreg
+except ImportError:
+    win32print = None
+
+
+class App(tk.Tk):
+    def __init__(self):
+        super().__init__()
+        self.title(f"라벨 자동 출력기 ({CONFIG['APP_VERSION']})")
+        self.geometry("700x700")
+
+        # ############### [추가됨] 자동 실행 레지스트리 관련 변수 ###############
+        self.app_name = "LabelPrinterWatcher"
+        # pyinstaller로 빌드된 .exe 경로 또는 .py 스크립트 경로를 가져옴
+        self.app_path = sys.executable if getattr(sys, 'frozen', False) else os.path.abspath(__file__)
+        self.reg_key_path = r"Software\Microsoft\Windows\CurrentVersion\Run"
+
+        try:
+            from PIL import ImageTk
+            logo_path = resource_path('assets/logo.png')
+            self.logo_image = ImageTk.PhotoImage(file=logo_path)
+            self.iconphoto(True, self.logo_image)
+        except Exception as e:
+            log.warning(f"윈도우 로고 이미지 로드 실패: {e}")
+
+        self.protocol("WM_DELETE_WINDOW", self.on_closing)
+
+        self.log_buffer = UiLogBuffer(int(CONFIG.get("log_ui_max_lines", 2000)))
+        setup_logging().addHandler(self.log_buffer)
+        self.is_running = True
+        self.service = WatcherService()
+
+        self.create_widgets()
+        self.redirect_stdout()
+        self.service.start()
+        self.after(100, self.process_log_queue)
+        self.after(500, self.refresh_status)
+        self.setup_tray_icon()
+        threading.Thread(target=threaded_update_check, daemon=True).start()
+
+    def create_widgets(self):
+        self.notebook = ttk.Notebook(self, padding=10)
+        self.notebook.pack(fill=tk.BOTH, expand=True)
+
+        log_frame = ttk.Frame(self.notebook)
+        self.notebook.add(log_frame, text='실행 로그')
+
+        log_label = tk.Label(log_frame, text="실시간 실행 로그", font=("Malgun Gothic", 10, "bold"))
+        log_label.pack(anchor="w", pady=(0, 5))
+        self.log_text = scrolledtext.ScrolledText(log_frame, wrap=tk.WORD, font=("Consolas", 10), state='disabled')
+        self.log_text.pack(fill=tk.BOTH, expand=True)
+
+        settings_frame = ttk.Frame(self.notebook, padding=10)
+        self.notebook.add(settings_frame, text='인쇄 설정')
+
+        channels_frame = ttk.LabelFrame(settings_frame, text="감시 채널 (기준 폴더 -> 프린터)", padding=10)
+        channels_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+
+        columns = ("title", "folder", "printer", "spooled", "failed", "pending")
+        self.channel_tree = ttk.Treeview(channels_frame, columns=columns, show="headings", height=8, selectmode="browse")
+        for column, heading, width in (("title", "이름", 90), ("folder", "감시 폴더", 220), ("printer", "프린터", 150),
+                                       ("spooled", "인쇄", 50), ("failed", "실패", 50), ("pending", "대기", 50)):
+            self.channel_tree.heading(column, text=heading)
+            self.channel_tree.column(column, width=width, stretch=column in ("folder", "printer"))
+        self.channel_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.channel_tree.bind("<Double-Button-1>", lambda event: self.edit_channel())
+
+        channel_buttons = tk.Frame(channels_frame)
+        channel_buttons.pack(side=tk.RIGHT, fill=tk.Y, padx=(10, 0))
+        tk.Button(channel_buttons, text="채널 추가", command=self.add_channel, width=16).pack(pady=2)
+        tk.Button(channel_buttons, text="편집", command=self.edit_channel, width=16).pack(pady=2)
+        tk.Button(channel_buttons, text="삭제", command=self.remove_channel, width=16).pack(pady=2)
+        tk.Button(channel_buttons, text="시스템 프린터 설정", command=lambda: self.open_printer_properties(self.selected_channel_name()), width=16).pack(pady=2)
+        tk.Button(channel_buttons, text="실패 라벨 다시 인쇄", command=self.reprint_failed_labels, width=16).pack(pady=2)
+        tk.Button(channel_buttons, text="보관 라벨 다시 인쇄", command=self.reprint_archived_label, width=16).pack(pady=2)
+
+        self.channel_configs = [dict(c) for c in CONFIG.get("channels", [])]
+        self.config_version = self.service.config_version
+        self.refresh_channel_tree()
+
+        # ############### [추가됨] 자동 실행 설정 프레임 ###############
+        startup_frame = ttk.LabelFrame(settings_frame, text="옵션", padding=10)
+        startup_frame.pack(fill=tk.X, pady=(15, 5))
+
+        self.startup_var = tk.BooleanVar()
+        self.startup_checkbutton = ttk.Checkbutton(startup_frame, text="윈도우 시작 시 자동 실행", variable=self.startup_var, command=self.toggle_startup)
+        self.startup_checkbutton.pack(anchor="w")
+        self.startup_var.set(self.check_startup_registry())
+
+        button_frame = tk.Frame(settings_frame)
+        button_frame.pack(fill=tk.X, pady=20)
+
+        tk.Button(button_frame, text="설정 저장", command=self.save_settings, height=2, bg="#4CAF50", fg="white", font=("Malgun Gothic", 10, "bold")).pack(side=tk.LEFT, expand=True, padx=5)
+        tk.Button(button_frame, text="테스트 라벨 생성", command=self.create_test_label, height=2, bg="#2196F3", fg="white", font=("Malgun Gothic", 10, "bold")).pack(side=tk.RIGHT, expand=True, padx=5)
+
+        stats_frame = ttk.Frame(self.notebook, padding=10)
+        self.notebook.add(stats_frame, text='처리 통계')
+        self.stats_frame = stats_frame
+
+        columns = ("printed", "failed", "deduplicated", "p50", "p95", "p99")
+        self.stats_tree = ttk.Treeview(stats_frame, columns=columns, show="tree headings", height=16, selectmode="none")
+        self.stats_tree.heading("#0", text="채널 / 단계")
+        self.stats_tree.column("#0", width=170)
+        for column, heading, width in (("printed", "인쇄", 60), ("failed", "실패", 60), ("deduplicated", "중복", 60),
+                                       ("p50", "p50 (ms)", 80), ("p95", "p95 (ms)", 80), ("p99", "p99 (ms)", 80)):
+            self.stats_tree.heading(column, text=heading)
+            self.stats_tree.column(column, width=width, anchor="e")
+        self.stats_tree.pack(fill=tk.BOTH, expand=True)
+        metrics_port = int(CONFIG.get("metrics_port", 0) or 0)
+        metrics_text = f"Prometheus 지표: http://{CONFIG.get('metrics_bind', '0.0.0.0')}:{metrics_port}/metrics" if metrics_port else "Prometheus 지표: 사용 안 함 (config.json의 metrics_port 설정)"
+        self.cache_stats_var = tk.StringVar()
+        tk.Label(stats_frame, textvariable=self.cache_stats_var, anchor="w", justify=tk.LEFT).pack(fill=tk.X, pady=(5, 0))
+        tk.Label(stats_frame, text="채널 행의 지연 시간은 파일 감지 -> 스풀러 전송 완료, 단계 행은 직전 단계부터 걸린 시간입니다.\n" + metrics_text,
+                 anchor="w", justify=tk.LEFT).pack(fill=tk.X, pady=(5, 0))
+
+        self.status_var = tk.StringVar(value="초기화 중...")
+        status_bar = tk.Label(self, textvariable=self.status_var, bd=1, relief=tk.SUNKEN, anchor='w', padx=5)
+        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+
+    # ############### [추가됨] 자동 실행 레지스트리 관리 함수들 ###############
+    def toggle_startup(self):
+        if self.startup_var.get():
+            self.set_startup_registry()
+        else:
+            self.remove_startup_registry()
+
+    def set_startup_registry(self):
+        try:
+            key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.reg_key_path, 0, winreg.KEY_WRITE)
+            winreg.SetValueEx(key, self.app_name, 0, winreg.REG_SZ, self.app_path)
+            winreg.CloseKey(key)
+            log.info("자동 실행 설정: 레지스트리에 등록되었습니다.")
+        except Exception as e:
+            messagebox.showerror("오류", f"자동 실행 설정에 실패했습니다:\n{e}")
+            log.error(f"[오류] 자동 실행 레지스트리 등록 실패: {e}")
+
+    def remove_startup_registry(self):
+        try:
+            key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.reg_key_path, 0, winreg.KEY_WRITE)
+            winreg.DeleteValue(key, self.app_name)
+            winreg.CloseKey(key)
+            log.info("자동 실행 해제: 레지스트리에서 제거되었습니다.")
+        except FileNotFoundError:
+            # 이미 없는 경우이므로 정상이므로 무시
+            log.info("자동 실행 해제: 레지스트리에 등록되어 있지 않습니다.")
+            pass
+        except Exception as e:
+            messagebox.showerror("오류", f"자동 실행 해제에 실패했습니다:\n{e}")
+            log.error(f"[오류] 자동 실행 레지스트리 제거 실패: {e}")
+
+    def check_startup_registry(self):
+        try:
+            key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.reg_key_path, 0, winreg.KEY_READ)
+            winreg.QueryValueEx(key, self.app_name)
+            winreg.CloseKey(key)
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            log.error(f"[오류] 자동 실행 상태 확인 실패: {e}")
+            return False
+
+    # ############### 감시 채널 목록 관리 ###############
+    def refresh_channel_tree(self):
+        selected = self.selected_channel_name()
+        stats = self.service.scheduler.channel_stats()
+        self.channel_tree.delete(*self.channel_tree.get_children())
+        for channel in self.channel_configs:
+            channel_stats = stats.get(channel["name"], {})
+            title = channel["title"] if channel.get("enabled", True) else f"{channel['title']} (사용 안 함)"
+            self.channel_tree.insert("", tk.END, iid=channel["name"], values=(
+                title, channel["base_folder"], channel["printer"],
+                channel_stats.get("spooled", 0), channel_stats.get("failed", 0), channel_stats.get("pending", 0)))
+        if selected and self.channel_tree.exists(selected):
+            self.channel_tree.selection_set(selected)
+
+    def refresh_channel_stats(self):
+        stats = self.service.scheduler.channel_stats()
+        for channel in self.channel_configs:
+            name = channel["name"]
+            if name in stats and self.channel_tree.exists(name):
+                channel_stats = stats[name]
+                self.channel_tree.set(name, "spooled", channel_stats["spooled"])
+                self.channel_tree.set(name, "failed", channel_stats["failed"])
+                self.channel_tree.set(name, "pending", channel_stats["pending"])
+
+    STAGE_TITLES = {
+        "ready": "파일 쓰기 완료 대기", "queued": "대기열 등록", "started": "대기열 대기", "decoded": "PNG 디코딩",
+        "rendered": "래스터 렌더링", "dc_acquired": "프린터 DC 획득", "spooled": "스풀러 전송 (EndDoc)", "failed": "실패 처리",
+    }
+
+    def refresh_stats_tab(self):
+        # 통계 탭이 보일 때만 갱신합니다.
+        if self.notebook.select() != str(self.stats_frame):
+            return
+        titles = {channel["name"]: channel["title"] for channel in self.channel_configs}
+        for name, channel_stats in self.service.scheduler.channel_stats().items():
+            values = (channel_stats["spooled"], channel_stats["failed"], channel_stats["deduplicated"],
+                      *(f"{channel_stats[f'end_to_end_{q}'] * 1000:.1f}" for q in ("p50", "p95", "p99")))
+            if self.stats_tree.exists(name):
+                self.stats_tree.item(name, text=titles.get(name, name), values=values)
+            else:
+                self.stats_tree.insert("", tk.END, iid=name, text=titles.get(name, name), values=values, open=True)
+            for stage, stage_stats in channel_stats["stages"].items():
+                iid = f"{name}/{stage}"
+                values = (stage_stats["count"], "", "", *(f"{stage_stats[q] * 1000:.1f}" for q in ("p50", "p95", "p99")))
+                if self.stats_tree.exists(iid):
+                    self.stats_tree.item(iid, values=values)
+                else:
+                    self.stats_tree.insert(name, tk.END, iid=iid, text=self.STAGE_TITLES.get(stage, stage), values=values)
+        cache = get_raster_cache().stats()
+        text = f"래스터 캐시: 적중 {cache['hits']} / 실패 {cache['misses']} / 제거 {cache['evictions']}"
+        sessions = get_print_backend().stats().get("session_cache")
+        if sessions is not None:
+            text += (f"    프린터 연결(DC) 캐시: 적중 {sessions['hits']} / 새 연결 {sessions['misses']} / "
+                     f"초기화 {sessions['invalidations']} (열린 연결 {sessions['sessions']}개)")
+        self.cache_stats_var.set(text)
+
+    def reprint_failed_labels(self):
+        # 대기열이 가득 차 있으면 기다릴 수 있으므로 화면이 멈추지 않게 별도 스레드에서 실행합니다.
+        threading.Thread(target=self.service.reprint_failed, name="reprint-failed", daemon=True).start()
+
+    def reprint_archived_label(self):
+        name = simpledialog.askstring("보관 라벨 다시 인쇄", "다시 인쇄할 라벨 파일 이름 (예: A12345.png):", parent=self)
+        if name and name.strip():
+            threading.Thread(target=self.service.reprint_archived, args=(name,), name="reprint-archived", daemon=True).start()
+
+    def selected_channel_name(self):
+        selection = self.channel_tree.selection()
+        return selection[0] if selection else None
+
+    def find_channel(self, name):
+        for channel in self.channel_configs:
+            if channel["name"] == name:
+                return channel
+        return None
+
+    def add_channel(self):
+        index = len(self.channel_configs)
+        existing = {c["name"] for c in self.channel_configs}
+        while f"channel{index + 1}" in existing:
+            index += 1
+        channel = normalize_channel({}, index)
+        if self.open_channel_dialog(channel, "채널 추가"):
+            self.channel_configs.append(channel)
+            self.refresh_channel_tree()
+
+    def edit_channel(self):
+        channel = self.find_channel(self.selected_channel_name())
+        if channel is None:
+            messagebox.showwarning("채널 선택 필요", "편집할 채널을 선택해주세요.")
+            return
+        if self.open_channel_dialog(channel, "채널 편집"):
+            self.refresh_channel_tree()
+
+    def remove_channel(self):
+        channel = self.find_channel(self.selected_channel_name())
+        if channel is None:
+            messagebox.showwarning("채널 선택 필요", "삭제할 채널을 선택해주세요.")
+            return
+        if messagebox.askyesno("채널 삭제", f"'{channel['title']}' 채널을 삭제하시겠습니까?\n(저장해야 적용됩니다)"):
+            self.channel_configs.remove(channel)
+            self.refresh_channel_tree()
+
+    def open_channel_dialog(self, channel, title):
+        win = tk.Toplevel(self)
+        win.title(title)
+        win.transient(self)
+        win.grab_set()
+
+        title_var = tk.StringVar(value=channel["title"])
+        printer_var = tk.StringVar(value=channel["printer"])
+        folder_var = tk.StringVar(value=channel["base_folder"])
+        backup_var = tk.StringVar(value=channel.get("backup_printer", ""))
+        engine_var = tk.StringVar(value=channel.get("watch_engine", "native"))
+        enabled_var = tk.BooleanVar(value=channel.get("enabled", True))
+
+        tk.Label(win, text="이름:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        tk.Entry(win, textvariable=title_var, width=40).grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+
+        tk.Label(win, text="프린터 선택:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        tk.Entry(win, textvariable=printer_var, width=40).grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+        tk.Button(win, text="찾아보기", command=lambda: self.select_printer(printer_var)).grid(row=1, column=2, padx=5, pady=5)
+
+        tk.Label(win, text="감시 폴더:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        tk.Entry(win, textvariable=folder_var, width=40).grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+        tk.Button(win, text="찾아보기", command=lambda: self.select_folder(folder_var)).grid(row=2, column=2, padx=5, pady=5)
+
+        tk.Label(win, text="예비 프린터:").grid(row=3, column=0, padx=5, pady=5, sticky="w")
+        tk.Entry(win, textvariable=backup_var, width=40).grid(row=3, column=1, padx=5, pady=5, sticky="ew")
+        tk.Button(win, text="찾아보기", command=lambda: self.select_printer(backup_var)).grid(row=3, column=2, padx=5, pady=5)
+
+        tk.Label(win, text="감시 방식:").grid(row=4, column=0, padx=5, pady=5, sticky="w")
+        ttk.Combobox(win, textvariable=engine_var, values=CHANNEL_CHOICES["watch_engine"], state="readonly", width=12).grid(
+            row=4, column=1, padx=5, pady=5, sticky="w")
+        tk.Label(win, text="(네트워크 공유 폴더는 polling 권장)").grid(row=4, column=2, padx=5, pady=5, sticky="w")
+
+        ttk.Checkbutton(win, text="사용", variable=enabled_var).grid(row=5, column=1, padx=5, pady=5, sticky="w")
+        win.columnconfigure(1, weight=1)
+
+        result = {"ok": False}
+        def on_ok():
+            channel["title"] = title_var.get().strip() or channel["name"]
+            channel["printer"] = printer_var.get().strip()
+            channel["base_folder"] = folder_var.get().strip()
+            channel["backup_printer"] = backup_var.get().strip()
+            channel["watch_engine"] = engine_var.get()
+            channel["enabled"] = enabled_var.get()
+            result["ok"] = True
+            win.destroy()
+
+        tk.Button(win, text="확인", command=on_ok, width=10).grid(row=6, column=1, pady=10)
+        win.wait_window()
+        return result["ok"]
+
+    def open_printer_properties(self, channel_name):
+        if not win32print:
+            messagebox.showerror("모듈 오류", "'pywin32'가 설치되지 않았습니다.")
+            return
+
+        channel = self.find_channel(channel_name)
+        printer_name = channel["printer"] if channel else ""
+
+        if not printer_name:
+            messagebox.showwarning("프린터 선택 필요", "먼저 프린터를 선택하고 저장해주세요.")
+            return
+
+        try:
+            PRINTER_DEFAULTS = {"DesiredAccess": win32print.PRINTER_ALL_ACCESS}
+            h_printer = win32print.OpenPrinter(printer_name, PRINTER_DEFAULTS)
+
+            properties = win32print.GetPrinter(h_printer, 2)
+            p_devmode = properties['pDevMode']
+
+            result = win32print.DocumentProperties(self.winfo_id(), h_printer, printer_name, p_devmode, p_devmode, win32con.DM_IN_PROMPT | win32con.DM_OUT_BUFFER | win32con.DM_IN_BUFFER)
+
+            if result == win32con.IDOK:
+                win32print.SetPrinter(h_printer, 2, properties, 0)
+                get_print_backend().invalidate(printer_name)
+
+                self.service.devmodes[channel_name] = p_devmode
+
+                log.info(f"프린터({printer_name})의 시스템 기본 설정이 영구적으로 변경되었습니다.")
+                messagebox.showinfo("설정 완료", f"'{printer_name}' 프린터의 기본 설정이 **영구적으로** 변경되었습니다.")
+            else:
+                log.info("사용자가 프린터 설정 변경을 취소했습니다.")
+                messagebox.showinfo("취소", "프린터 설정 변경이 취소되었습니다.")
+
+            win32print.ClosePrinter(h_printer)
+
+        except pywintypes.error as e:
+            if e.winerror == 5:
+                 messagebox.showerror("권한 오류", "프린터 설정을 변경할 권한이 없습니다.\n프로그램을 관리자 권한으로 실행해주세요.")
+                 log.error(f"[오류] 프린터 설정 변경 권한 부족: {e}")
+            else:
+                messagebox.showerror("설정 오류", f"프린터 속성을 여는 중 오류 발생:\n{e}\n프린터 이름이 올바른지 확인해주세요.")
+                log.error(f"[오류] 프린터 속성 열기 실패: {e}")
+        except Exception as e:
+            messagebox.showerror("알 수 없는 오류", f"예상치 못한 오류 발생:\n{e}")
+            log.error(f"[오류] 프린터 속성 열기 중 예외 발생: {e}")
+
+    def get_current_settings(self):
+        # 화면에 없는 설정(대기열 크기 등)이 저장 시 사라지지 않도록 현재 설정을 기반으로 합니다.
+        # 명령줄 옵션으로 바꾼 값은 파일에 저장하지 않습니다.
+        return without_cli_overrides(CONFIG)
+
+    def select_folder(self, var):
+        folder_selected = filedialog.askdirectory()
+        if folder_selected:
+            var.set(folder_selected)
+
+    def get_printers(self):
+        if not win32print:
+            messagebox.showerror("모듈 오류", "'pywin32' 라이브러리가 설치되지 않았습니다.\n프로그램을 종료하고 'pip install pywin32'를 실행해주세요.")
+            return []
+        try:
+            printers = [printer[2] for printer in win32print.EnumPrinters(2)]
+            if not printers:
+                log.info("[정보] 설치된 프린터를 찾을 수 없습니다.")
+            return printers
+        except Exception as e:
+            log.error(f"[오류] 프린터 목록을 가져오는 데 실패했습니다: {e}")
+            messagebox.showerror("프린터 조회 실패", f"프린터 목록을 가져오는 중 오류가 발생했습니다.\n{e}")
+            return []
+
+    def select_printer(self, var):
+        printers = self.get_printers()
+        if not printers:
+            messagebox.showinfo("프린터 없음", "시스템에 설치된 프린터가 없습니다.")
+            return
+
+        win = tk.Toplevel(self)
+        win.title("프린터 선택")
+        win.geometry("350x300")
+        win.transient(self)
+        win.grab_set()
+
+        tk.Label(win, text="설치된 프린터를 선택하세요:", pady=5).pack()
+
+        list_frame = tk.Frame(win)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        scrollbar = tk.Scrollbar(list_frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        listbox = tk.Listbox(list_frame, yscrollcommand=scrollbar.set)
+        listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        scrollbar.config(command=listbox.yview)
+
+        for printer in printers:
+            listbox.insert(tk.END, printer)
+
+        def on_ok():
+            selected_indices = listbox.curselection()
+            if selected_indices:
+                selected_printer = listbox.get(selected_indices[0])
+                var.set(selected_printer)
+            win.destroy()
+
+        def on_double_click(event):
+            on_ok()
+
+        listbox.bind("<Double-Button-1>", on_double_click)
+
+        ok_button = tk.Button(win, text="확인", command=on_ok, width=10)
+        ok_button.pack(pady=10)
+
+        current_printer = var.get()
+        if current_printer in printers:
+            idx = printers.index(current_printer)
+            listbox.selection_set(idx)
+            listbox.see(idx)
+
+        win.wait_window()
+
+    def save_settings(self):
+        new_config = self.get_current_settings()
+        new_config["channels"] = [dict(c) for c in self.channel_configs]
+
+        try:
+            new_config = build_config(new_config)
+            save_config(new_config)
+            self.service.apply_config(new_config)
+            self.config_version = self.service.config_version
+            messagebox.showinfo("저장 완료", "설정이 성공적으로 저장되었습니다.\n변경된 감시 폴더에 바로 적용됩니다.")
+            log.info("[설정 저장] 새로운 설정이 적용되었습니다.")
+        except Exception as e:
+            messagebox.showerror("저장 실패", f"설정 저장 중 오류가 발생했습니다:\n{e}")
+            log.error(f"[오류] 설정 저장 실패: {e}")
+
+    def create_test_label(self):
+        # 선택한 채널(없으면 첫 번째 채널)의 오늘 폴더에 샘플 라벨을 만듭니다.
+        channel = self.find_channel(self.selected_channel_name()) or (self.channel_configs[0] if self.channel_configs else None)
+        target_folder = channel["base_folder"] if channel else ""
+        if not target_folder or not os.path.isdir(target_folder):
+            messagebox.showwarning("폴더 오류", "라벨 감시 폴더가 올바르게 설정되지 않았습니다.\n설정 탭에서 채널의 폴더를 지정해주세요.")
+            return
+
+        try:
+            today_str = date.today().strftime(channel.get("folder_format") or DATE_FOLDER_FORMAT)
+            today_folder = os.path.join(target_folder, today_str)
+            os.makedirs(today_folder, exist_ok=True)
+
+            width, height = 400, 200
+            img = Image.new('RGB', (width, height), color = 'white')
+            d = ImageDraw.Draw(img)
+
+            try:
+                font = ImageFont.truetype("malgun.ttf", 20)
+            except IOError:
+                font = ImageFont.load_default()
+
+            text = "테스트 라벨입니다."
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            d.text((20,20), "--- 샘플 인쇄 ---", fill=(0,0,0), font=font)
+            d.text((20,60), text, fill=(0,0,0), font=font)
+            d.text((20,100), f"생성 시간: {timestamp}", fill=(0,0,0), font=font)
+            d.rectangle([(5,5), (width-5, height-5)], outline ="black", width=2)
+
+            filename = f"test_label_{int(time.time())}.png"
+            filepath = os.path.join(today_folder, filename)
+            img.save(filepath)
+
+            messagebox.showinfo("생성 완료", f"테스트 라벨이 생성되었습니다.\n경로: {filepath}\n\n잠시 후 설정된 프린터로 자동 인쇄됩니다.")
+            log.info(f"[테스트] 샘플 라벨 생성 완료: {filepath}")
+
+        except Exception as e:
+            messagebox.showerror("생성 실패", f"테스트 라벨 생성 중 오류가 발생했습니다:\n{e}")
+            log.error(f"[오류] 테스트 라벨 생성 실패: {e}")
+
+
+    def add_log(self, lines):
+        # 쌓인 로그 줄을 한 번에 추가하고, 최대 줄 수를 넘는 오래된 줄은 지웁니다.
+        self.log_text.config(state='normal')
+        self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+        line_count = int(self.log_text.index('end-1c').split('.')[0])
+        excess = line_count - self.log_buffer.max_lines
+        if excess > 0:
+            self.log_text.delete('1.0', f'{excess + 1}.0')
+        self.log_text.see(tk.END)
+        self.log_text.config(state='disabled')
+
+    def process_log_queue(self):
+        lines = self.log_buffer.drain()
+        if lines:
+            self.add_log(lines)
+        if self.is_running:
+            self.after(100, self.process_log_queue)
+
+    def redirect_stdout(self):
+        sys.stdout = StreamToLogger(logging.getLogger("stdout"), logging.INFO)
+        sys.stderr = StreamToLogger(logging.getLogger("stderr"), logging.ERROR)
+
+    def refresh_status(self):
+        pending = self.service.scheduler.pending()
+        status_message = self.service.status_message
+        status = f"{status_message} | 인쇄 대기: {pending}건" if pending else status_message
+        paused = self.service.scheduler.paused_printers()
+        if paused:
+            status += f" | 일시 정지: {', '.join(paused)}"
+        if self.status_var.get() != status:
+            self.status_var.set(status)
+        if self.config_version != self.service.config_version:
+            # config.json이 밖에서 바뀌어 적용된 경우 채널 목록을 다시 읽습니다.
+            self.config_version = self.service.config_version
+            self.channel_configs = [dict(c) for c in CONFIG.get("channels", [])]
+            self.refresh_channel_tree()
+        self.refresh_channel_stats()
+        self.refresh_stats_tab()
+        if self.is_running:
+            self.after(500, self.refresh_status)
+
+    def setup_tray_icon(self):
+        import pystray
+        try:
+            logo_path = resource_path('assets/logo.png')
+            image = Image.open(logo_path)
+        except Exception as e:
+            log.warning(f"트레이 아이콘 로고 로드 실패: {e}")
+            image = Image.new('RGB', (64, 64), 'blue')
+        menu = (pystray.MenuItem('열기', self.show_window, default=True),
+                pystray.MenuItem('종료', self.on_closing))
+        self.tray_icon = pystray.Icon("name", image, "라벨 자동 출력기", menu)
+        threading.Thread(target=self.tray_icon.run, daemon=True).start()
+
+    def show_window(self):
+        self.deiconify()
+        self.lift()
+        self.focus_force()
+
+    def on_closing(self):
+        if messagebox.askyesno("종료 확인", "프로그램을 종료하시겠습니까?"):
+            self.quit_app()
+
+    def quit_app(self):
+        self.is_running = False
+        self.service.stop()
+        self.tray_icon.stop()
+        self.destroy()
@@ -1,19 +1,37 @@
 import os
 import sys
 import time
+PROCESS_STARTED_AT = time.perf_counter()  # 시작 소요 시간 측정용
 import json
+import signal
+import logging
+import logging.handlers
+import argparse
 import subprocess
 import threading
-import requests
+import functools
 import zipfile
-from datetime import date, datetime
+import hashlib
+import heapq
+import bisect
+import sqlite3
+import io
+import tempfile
+import random
+import re
+import socket
+import csv
+import string
+from datetime import datetime, timedelta
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
-import tkinter as tk
-from tkinter import scrolledtext, messagebox, ttk, filedialog
-from queue import Queue
-from PIL import Image, ImageDraw, ImageFont, ImageTk
-import pystray
+from watchdog.events import FileSystemEventHandler, FileCreatedEvent, FileModifiedEvent, FileDeletedEvent
+from queue import Queue, Empty, Full
+from collections import deque, OrderedDict
+from PIL import Image, ImageDraw, ImageFont
+# requests(업데이트 확인), pystray(트레이 아이콘), PIL.ImageTk(창 아이콘)는 시작 시간을 줄이기 위해 필요할 때 불러옵니다.
+
+log = logging.getLogger("label_printer_watcher")
+
 
 # pywin32는 pyinstaller로 빌드 시 자동으로 포함되지 않을 수 있어, 별도 import가 필요할 수 있습니다.
 try:
@@ -23,12 +41,13 @@ try:
     import win32gui
     import pywintypes
     from PIL import ImageWin
-    import winreg # <--- 추가
 except ImportError:
     # 프로그램 실행 중에는 설치할 수 없으므로, 사용자에게 안내 메시지를 표시합니다.
-    print("오류: 'pywin32' 모듈을 찾을 수 없습니다. 'pip install pywin32' 명령으로 설치해주세요.")
+    log.error("오류: 'pywin32' 모듈을 찾을 수 없습니다. 'pip install pywin32' 명령으로 설치해주세요.")
     win32print = None
 
+MODULE_LOADED_AT = time.perf_counter()
+
 
 # #####################################################################
 # 1. 기본 설정 (config.json 파일이 없을 경우 사용)
@@ -37,43 +56,400 @@ DEFAULT_CONFIG = {
     "REPO_OWNER": "KMTechn",
     "REPO_NAME": "Label_Printer_Watcher",
     "APP_VERSION": "v1.0.1", # 윈도우 시작 시 자동 실행 기능 추가
-    "remnant_printer": "",
-    "defective_printer": "",
-    "remnant_base_folder": "",
-    "defective_base_folder": "",
+    # "channels": 감시 채널 목록 (기준 폴더 -> 프린터). 없으면 예전 remnant_/defective_ 설정에서 만들어집니다.
+    "print_queue_size": 1000,          # 프린터별 인쇄 대기열 최대 길이 (가득 차면 같은 수만큼 대기 목록에 보관)
+    "print_workers_per_printer": 1,    # 프린터별 작업자 수 (1이면 라벨 순서 보장)
+    "print_enqueue_timeout": 30,       # 대기열이 가득 찼을 때 기다리는 최대 시간(초)
+    "print_backend": "gdi",            # gdi: 실제 프린터 / null: 출력 없음 / file: PNG 파일로 저장
+    "print_output_folder": "print_output",   # file 백엔드 출력 폴더
+    "virtual_page_size": [812, 406],   # null/file 백엔드의 인쇄 가능 영역(픽셀, 203dpi 4x2인치)
+    "batch_window_ms": 0,              # 0보다 크면 이 시간 안에 들어온 라벨을 하나의 인쇄 문서로 묶음
+    "batch_max_labels": 50,            # 한 문서에 묶을 최대 라벨 수
+    "raster_mode": "L",                # 프린터용 래스터 모드 (L: 8비트 회색조, 1: 1비트 흑백, "": 원본 그대로)
+    "raster_cache_mb": 64,             # 렌더링된 라벨 캐시 메모리 상한(MB)
+    "render_processes": 0,             # 큰(고해상도) 라벨을 디코딩/렌더링할 프로세스 수 (0 이면 인쇄 스레드에서 그림)
+    "render_lookahead": 4,             # 프린터별로 인쇄 차례보다 미리 그려 둘 라벨 수 (래스터 메모리 상한)
+    "render_min_kb": 256,              # 이보다 작은 PNG는 프로세스로 넘기지 않고 인쇄 스레드에서 그림 (KB)
+    # 프린터 이름 -> RAW 인쇄 설정. 감열 프린터에 GDI 대신 ZPL/EPL 그래픽 명령을 직접 보냅니다. (설정하지 않은 값은 기본값)
+    # 예: {"ZD421": {"language": "zpl", "transport": "tcp", "host": "192.168.0.50", "port": 9100, "page_dots": [812, 406]}}
+    "raw_printers": {},
+    "ready_min_delay_ms": 50,          # 파일 쓰기 완료 확인 최소 간격 (쓰는 동안 2배씩 늘어남)
+    "ready_max_delay_ms": 1000,        # 파일 쓰기 완료 확인 최대 간격
+    "ready_stable_ms": 1000,           # PNG 끝이 확인되지 않을 때 크기/수정 시각이 유지되어야 하는 시간
+    "ready_timeout_seconds": 120,      # 이 시간 안에 쓰기가 끝나지 않으면 인쇄하지 않음
+    "dedup_ttl_seconds": 10,           # 같은 라벨을 다시 인쇄하지 않는 시간
+    "dedup_max_entries": 20000,        # 중복 확인을 위해 기억하는 최대 라벨 수
+    "dedup_by_content": False,         # True면 이름이 달라도 내용이 같은 라벨은 중복으로 처리
+    "journal_path": "print_journal.db",   # 라벨별 인쇄 상태 기록 (재시작 시 누락 라벨 복구용)
+    "template_drop_files": True,       # 날짜 폴더의 .json/.csv 데이터 파일을 템플릿으로 그려 인쇄
+    "template_folder": "label_templates",     # 라벨 템플릿(<이름>.json) 폴더
+    "template_default": "",            # 데이터에 template 값이 없을 때 사용할 템플릿 이름
+    "template_default_font": "malgun.ttf",    # 템플릿 글꼴을 지정하지 않았을 때 사용할 글꼴
+    "data_file_encoding": "utf-8-sig", # .csv/.json 데이터 파일 인코딩 (예: cp949)
+    "journal_retention_days": 7,       # 저널에 기록을 남기는 기간(일)
+    "rollover_prepare_minutes": 5,     # 자정 몇 분 전부터 다음 날짜 폴더를 미리 감시할지
+    "rollover_grace_minutes": 10,      # 자정 이후 몇 분 동안 이전 날짜 폴더를 계속 감시할지
+    "headless_auto_update": False,     # --headless 실행 시 새 버전이 있으면 묻지 않고 업데이트
+    "update_download_retries": 5,      # 업데이트 다운로드가 끊겼을 때 이어받기 재시도 횟수
+    "update_require_checksum": True,   # 릴리스에 SHA-256(.sha256) 파일이 없으면 업데이트하지 않음
+    "update_manifest_url": "",         # GitHub 대신 확인할 사내 미러/매니페스트 URL (releases/latest 와 같은 JSON 형식)
+    "update_cache_path": "update_cache.json",  # 마지막 릴리스 확인 결과(ETag 포함) 저장 위치
+    "update_check_interval_minutes": 60,       # 이 시간 안에 확인한 적이 있으면 네트워크 요청 없이 캐시 사용
+    "update_backoff_minutes": 5,       # 확인 실패/요청 제한 시 첫 재시도 대기 (실패할 때마다 2배, 무작위 ±50%)
+    "update_backoff_max_hours": 6,     # 재시도 대기 최대값
+    "update_startup_jitter_seconds": 30,       # 교대 시간에 여러 PC가 동시에 확인하지 않도록 시작 후 무작위로 기다림
+    "log_level": "INFO",               # DEBUG / INFO / WARNING / ERROR
+    "log_file": "label_printer_watcher.log",   # 실행 로그 파일 ("" 이면 파일로 남기지 않음)
+    "log_max_mb": 5,                   # 로그 파일 하나의 최대 크기(MB), 넘으면 새 파일로 교체
+    "log_backup_count": 5,             # 보관할 이전 로그 파일 수
+    "log_ui_max_lines": 2000,          # 실행 로그 탭에 유지할 최대 줄 수
+    "metrics_port": 0,                 # Prometheus /metrics 포트 (0 이면 사용 안 함, 예: 9464)
+    "metrics_bind": "0.0.0.0",         # /metrics 를 열 주소 (이 PC에서만 보려면 "127.0.0.1")
+    "ingest_port": 0,                  # 라벨 수신 API(HTTP) 포트 (0 이면 사용 안 함, 예: 8631)
+    "ingest_bind": "127.0.0.1",        # 라벨 수신 API 주소 (다른 PC(MES)에서 보내려면 "0.0.0.0")
+    "ingest_token": "",                # 설정하면 "Authorization: Bearer <값>" 헤더가 있는 요청만 받음
+    "ingest_max_body_mb": 20,          # 요청 하나의 최대 크기(MB, 스트리밍 업로드는 줄 하나 기준)
+    "printer_status_source": "auto",   # 프린터 상태 확인 방법 (auto / win32 / static: 항상 정상으로 간주)
+    "printer_monitor_interval_seconds": 2,     # 프린터 상태/스풀 대기열 확인 간격(초)
+    "printer_max_spool_jobs": 50,      # 스풀러에 이보다 많은 작업이 쌓이면 이상으로 보고 예비 프린터 사용 (0: 확인 안 함)
+    # 오류 종류별 재시도 (max_attempts: 첫 시도 포함 횟수, 대기 시간은 base_seconds부터 2배씩, 최대 max_seconds, 무작위 ±50%)
+    "retry_policies": {
+        "printer": {"max_attempts": 5, "base_seconds": 2, "max_seconds": 60},      # 스풀러/프린터 DC 오류
+        "read": {"max_attempts": 3, "base_seconds": 1, "max_seconds": 10},         # 파일을 읽거나 디코딩할 수 없음
+        "missing": {"max_attempts": 1, "base_seconds": 0, "max_seconds": 0},       # 인쇄 전에 파일이 사라짐
+        "unexpected": {"max_attempts": 2, "base_seconds": 5, "max_seconds": 30},   # 그 밖의 예외
+    },
+    "dead_letter_folder": "_failed",   # 재시도를 모두 실패한 라벨을 옮길 폴더 이름 (날짜 폴더 옆에 만들어짐)
+    "archive_after_days": 0,           # 며칠 지난 날짜 폴더를 zip 하나로 묶어 보관할지 (0 이면 사용 안 함, 예: 3)
+    "archive_folder": "_archive",      # 보관 zip과 색인을 둘 폴더 이름 (날짜 폴더 옆에 만들어짐)
+    "archive_retention_days": 0,       # 보관 zip을 지우기까지의 기간(일) (0 이면 지우지 않음)
+    "archive_io_mb_per_sec": 20,       # 보관 작업의 디스크/네트워크 사용 상한(MB/초, 0 이면 제한 없음)
+    "polling_min_interval_ms": 250,    # polling 감시: 파일이 들어오는 동안의 폴더 확인 간격(ms)
+    "polling_max_interval_seconds": 5, # polling 감시: 조용할 때 늘어나는 최대 확인 간격(초), 공유 폴더 오류 시 재시도 간격
 }
 CONFIG_FILE = 'config.json'
+# 채널별 기본 옵션
+DEFAULT_CHANNEL = {
+    "name": "",
+    "title": "",
+    "base_folder": "",                 # 기준 폴더 (이 아래의 날짜 폴더를 감시)
+    "printer": "",
+    "folder_format": "%Y-%m-%d",       # 날짜 폴더 이름 형식
+    "enabled": True,
+    "backup_printer": "",              # 프린터가 오프라인/용지 걸림 등일 때 대신 인쇄할 예비 프린터 ("" 이면 복구될 때까지 대기)
+    "watch_engine": "native",          # 폴더 감시 방식 (native: OS 이벤트 / polling: 주기적으로 폴더 확인, 네트워크 공유 폴더용)
+}
+LEGACY_CHANNELS = (("remnant", "잔량"), ("defective", "불량"))
 # #####################################################################
 
-# 설정 관리
-def load_config():
-    config = DEFAULT_CONFIG.copy()
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            try:
-                user_config = json.load(f)
-                config.update(user_config)
-            except json.JSONDecodeError:
-                print(f"오류: '{CONFIG_FILE}' 파일 형식이 잘못되었습니다. 기본 설정으로 복원합니다.")
-                save_config(config)
-                return config
+def normalize_channel(raw, index=0):
+    channel = DEFAULT_CHANNEL.copy()
+    channel.update(raw or {})
+    channel["name"] = str(channel.get("name") or f"channel{index + 1}")
+    channel["title"] = str(channel.get("title") or channel["name"])
+    return channel
 
+def migrate_channels(config):
+    # 예전 버전의 잔량/불량 두 채널 설정을 channels 목록으로 옮깁니다.
+    legacy = {}
+    for name, _ in LEGACY_CHANNELS:
+        legacy[name] = (config.pop(f"{name}_base_folder", ""), config.pop(f"{name}_printer", ""))
+    if not isinstance(config.get("channels"), list):
+        config["channels"] = [{"name": name, "title": title, "base_folder": legacy[name][0], "printer": legacy[name][1]}
+                              for name, title in LEGACY_CHANNELS]
+    channels, names = [], set()
+    for i, raw in enumerate(config["channels"]):
+        if raw is not None and not isinstance(raw, dict):
+            # 예: "channels": ["line1"] 처럼 객체가 아닌 항목은 읽을 수 없으므로 기본 채널로 바꿉니다.
+            log.warning(f"경고: 설정 값이 올바르지 않아 기본값을 사용합니다: channels[{i}]={raw!r}")
+            raw = None
+        channel = normalize_channel(raw, i)
+        while channel["name"] in names:
+            channel["name"] += "_"
+        names.add(channel["name"])
+        channels.append(channel)
+    config["channels"] = channels
+    return config
+
+# 값이 정해진 몇 가지 설정 (그 외에는 DEFAULT_CONFIG의 값 형식으로 확인)
+CONFIG_CHOICES = {
+    "raster_mode": ("1", "L", ""),
+    "log_level": ("DEBUG", "INFO", "WARNING", "ERROR"),
+}
+CHANNEL_CHOICES = {
+    "watch_engine": ("native", "polling"),
+}
+
+def config_value_ok(value, default):
+    if isinstance(default, bool):
+        return isinstance(value, bool)
+    if isinstance(default, (int, float)):
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+    if isinstance(default, (list, str, dict)):
+        return isinstance(value, type(default))
+    return True
+
+def validate_config(config):
+    # DEFAULT_CONFIG/DEFAULT_CHANNEL을 기준으로 값 형식을 확인하고, 잘못된 값은 기본값으로 되돌립니다.
+    # 반환: 고친 항목 목록 (로그 안내용)
+    problems = []
+    for key, default in DEFAULT_CONFIG.items():
+        value = config.get(key, default)
+        if not config_value_ok(value, default) or (key in CONFIG_CHOICES and value not in CONFIG_CHOICES[key]):
+            problems.append(f"{key}={value!r}")
+            value = default
+        config[key] = value
+    for channel in config["channels"]:
+        for key, default in DEFAULT_CHANNEL.items():
+            value = channel.get(key, default)
+            if not config_value_ok(value, default) or (key in CHANNEL_CHOICES and value not in CHANNEL_CHOICES[key]):
+                problems.append(f"channels[{channel['name']}].{key}={channel.get(key)!r}")
+                channel[key] = default
+        if not channel["folder_format"]:
+            channel["folder_format"] = DEFAULT_CHANNEL["folder_format"]
+    return problems
+
+def build_config(user_config):
+    # 기본값 + 사용자 설정 -> 예전 채널 설정 변환 -> 형식 확인 순서로 완성된 설정을 만듭니다.
+    config = DEFAULT_CONFIG.copy()
+    config.update(user_config)
     config['APP_VERSION'] = DEFAULT_CONFIG['APP_VERSION']
     config['REPO_OWNER'] = DEFAULT_CONFIG['REPO_OWNER']
     config['REPO_NAME'] = DEFAULT_CONFIG['REPO_NAME']
-    
-    save_config(config)
-        
+    migrate_channels(config)
+    problems = validate_config(config)
+    if problems:
+        log.warning(f"경고: 설정 값이 올바르지 않아 기본값을 사용합니다: {', '.join(problems)}")
     return config
 
-def save_config(config_data):
-    config_to_save = config_data.copy()
-    config_to_save.pop('remnant_devmode', None)
-    config_to_save.pop('defective_devmode', None)
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config_to_save, f, indent=4, ensure_ascii=False)
+def read_config_file(path=None):
+    # 반환: 파일의 설정 dict (파일이 없으면 None). 형식이 잘못되었으면 ValueError
+    try:
+        with open(path or CONFIG_FILE, 'r', encoding='utf-8') as f:
+            user_config = json.load(f)
+    except FileNotFoundError:
+        return None
+    if not isinstance(user_config, dict):
+        raise ValueError("설정 파일의 최상위 값이 객체({...})가 아닙니다.")
+    return user_config
+
+# 설정 관리
+# (읽기만 합니다. 잘못된 파일을 옮기거나 기본값을 채워 쓰는 것은 프로그램을 실행할 때 main()에서 한 번만
+#  - benchmark/테스트가 import해도 작업 폴더의 파일을 바꾸지 않음)
+def load_config():
+    try:
+        user_config = read_config_file()
+    except (OSError, ValueError) as e:
+        log.error(f"오류: '{CONFIG_FILE}' 파일 형식이 잘못되었습니다. 기본 설정을 사용합니다. ({e})")
+        user_config = None
+    try:
+        config = build_config(user_config or {})
+    except Exception as e:
+        log.error(f"오류: '{CONFIG_FILE}' 설정을 적용하지 못했습니다. 기본 설정으로 실행합니다.\n{e}")
+        config = build_config({})
+    return config
+
+def quarantine_broken_config():
+    # 읽을 수 없는 설정 파일은 기본 설정으로 덮어쓰기 전에 .broken으로 옮겨 둡니다. (고쳐 쓸 수 있도록 지우지 않음)
+    try:
+        read_config_file()
+        return False
+    except (OSError, ValueError):
+        pass
+    try:
+        os.replace(CONFIG_FILE, CONFIG_FILE + ".broken")
+    except OSError:
+        return False
+    log.warning(f"'{CONFIG_FILE}' 파일을 '{CONFIG_FILE}.broken'으로 옮기고 기본 설정 파일을 새로 만듭니다.")
+    return True
+
+def serialize_config(config_data):
+    return json.dumps(config_data, indent=4, ensure_ascii=False)
+
+def save_config(config_data, path=None):
+    # 내용이 바뀌었을 때만, 임시 파일에 쓴 뒤 이름을 바꾸는 방식으로 저장합니다. (쓰는 도중 꺼져도 파일이 깨지지 않음)
+    path = path or CONFIG_FILE
+    text = serialize_config(config_data)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    except (OSError, ValueError):
+        pass
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return True
+
+def replace_config(new_config):
+    # 다른 스레드가 읽는 중에도 키가 비지 않도록 같은 CONFIG 객체를 제자리에서 바꿉니다.
+    CONFIG.update(new_config)
+    for key in [key for key in CONFIG if key not in new_config]:
+        CONFIG.pop(key, None)
+
+class ConfigFileWatcher(FileSystemEventHandler):
+    # config.json을 직접 고쳐도(메모장, 배포 스크립트 등) 프로그램을 다시 시작하지 않고 적용합니다.
+    # 저장 프로그램이 여러 번 나눠 쓰는 경우를 위해 마지막 변경 후 잠시 기다렸다가 읽습니다.
+    DEBOUNCE_SECONDS = 0.5
+    EVENT_TYPES = ("created", "modified", "moved", "closed")
+
+    def __init__(self, on_change, path=None):
+        self.path = os.path.normcase(os.path.abspath(path or CONFIG_FILE))
+        self.on_change = on_change
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def schedule(self, observer):
+        return observer.schedule(self, os.path.dirname(self.path), recursive=False)
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in self.EVENT_TYPES:
+            return
+        paths = (event.src_path, getattr(event, "dest_path", None))
+        if not any(p and os.path.normcase(os.path.abspath(p)) == self.path for p in paths):
+            return
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.DEBOUNCE_SECONDS, self._reload)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _reload(self):
+        try:
+            user_config = read_config_file(self.path)
+        except (OSError, ValueError) as e:
+            log.warning(f"경고: '{CONFIG_FILE}'을 읽을 수 없어 이전 설정을 유지합니다. ({e})")
+            return
+        if user_config is None:
+            return
+        try:
+            self.on_change(build_config(user_config))
+        except Exception as e:
+            log.error(f"오류: '{CONFIG_FILE}' 변경 내용을 적용하지 못했습니다.\n{e}")
+
+    def stop(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
 
 CONFIG = load_config()
+# 명령줄 옵션(--backend 등)으로 이번 실행에만 바꾼 설정
+# 설정 파일이 다시 읽혀도 명령줄 값을 유지하고, 설정을 저장할 때는 파일에 있던 값을 그대로 남깁니다.
+CLI_OVERRIDES = {}
+CLI_FILE_VALUES = {}
+
+def override_config(key, value):
+    CLI_FILE_VALUES[key] = CONFIG.get(key)
+    CLI_OVERRIDES[key] = value
+    CONFIG[key] = value
+
+def with_cli_overrides(config):
+    # 새로 읽은 설정(파일/설정 화면)에 명령줄 값을 다시 덮어씁니다.
+    config = dict(config)
+    for key, value in CLI_OVERRIDES.items():
+        CLI_FILE_VALUES[key] = config.get(key)
+        config[key] = value
+    return config
+
+def without_cli_overrides(config):
+    # 저장용: 명령줄로 바꾼 항목은 설정 파일의 값으로 되돌립니다.
+    config = dict(config)
+    for key in CLI_OVERRIDES:
+        config[key] = CLI_FILE_VALUES.get(key)
+    return config
+
+HEADLESS = False  # --headless 실행 여부 (메시지 상자 대신 로그만 남김)
+
+# #####################################################################
+# 로그 (화면/파일/콘솔)
+# #####################################################################
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+UI_LOG_FORMAT = "%(asctime)s %(message)s"
+
+class UiLogBuffer(logging.Handler):
+    # 실행 로그 탭에 보여줄 줄을 모아두는 링 버퍼입니다.
+    # 화면은 주기적으로 drain()해 한 번에 추가하므로, 로그가 아무리 많아도 갱신 비용은 최대 줄 수로 제한됩니다.
+    def __init__(self, max_lines):
+        super().__init__()
+        self.max_lines = max_lines
+        self.dropped = 0
+        self._pending = deque(maxlen=max_lines)
+        self.setFormatter(logging.Formatter(UI_LOG_FORMAT, "%H:%M:%S"))
+
+    def emit(self, record):
+        try:
+            message = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self.lock:
+            if len(self._pending) == self.max_lines:
+                self.dropped += 1
+            self._pending.append(message)
+
+    def drain(self):
+        with self.lock:
+            lines = list(self._pending)
+            self._pending.clear()
+            return lines
+
+class StreamToLogger:
+    # print()나 외부 라이브러리가 stdout/stderr로 쓰는 내용을 줄 단위로 모아 로그로 보냅니다.
+    def __init__(self, logger, level):
+        self.logger = logger
+        self.level = level
+        self._buffer = ""
+        self._local = threading.local()
+
+    def write(self, text):
+        if getattr(self._local, "busy", False):
+            # 로그 처리 중 발생한 오류 출력이 다시 로그로 들어와 무한 반복되지 않도록 합니다.
+            return
+        self._local.busy = True
+        try:
+            self._buffer += text
+            while "\n" in self._buffer:
+                line, self._buffer = self._buffer.split("\n", 1)
+                if line.strip():
+                    self.logger.log(self.level, line.rstrip())
+        finally:
+            self._local.busy = False
+
+    def flush(self):
+        pass
+
+_logging_configured = False
+
+def apply_log_level():
+    logging.getLogger().setLevel(getattr(logging, str(CONFIG.get("log_level", "INFO")).upper(), logging.INFO))
+
+def setup_logging(console=False):
+    # 로그 레벨/회전 로그 파일/콘솔 출력을 설정합니다. (한 번만 적용)
+    global _logging_configured
+    root = logging.getLogger()
+    if _logging_configured:
+        return root
+    _logging_configured = True
+    apply_log_level()
+    log_file = CONFIG.get("log_file")
+    if log_file:
+        try:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=int(float(CONFIG.get("log_max_mb", 5)) * 1024 * 1024),
+                backupCount=int(CONFIG.get("log_backup_count", 5)), encoding="utf-8", delay=True)
+            file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            root.addHandler(file_handler)
+        except OSError as e:
+            log.error(f"[오류] 로그 파일을 열 수 없습니다: {e}")
+    if console:
+        console_handler = logging.StreamHandler(sys.stderr)
+        console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(console_handler)
+    return root
 
 def resource_path(relative_path):
     try:
@@ -82,41 +458,238 @@ def resource_path(relative_path):
         base_path = os.path.dirname(os.path.abspath(__file__))
     return os.path.join(base_path, relative_path)
 
-def check_for_updates():
+def release_check_url():
+    manifest_url = CONFIG.get("update_manifest_url")
+    if manifest_url:
+        return manifest_url
+    return f"https://api.github.com/repos/{CONFIG['REPO_OWNER']}/{CONFIG['REPO_NAME']}/releases/latest"
+
+def load_update_cache(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def save_update_cache(path, cache):
+    temp_path = path + ".tmp"
     try:
-        owner, repo, version = CONFIG["REPO_OWNER"], CONFIG["REPO_NAME"], CONFIG["APP_VERSION"]
-        api_url = f"https://api.github.com/repos/{owner}/{repo}/releases/latest"
-        response = requests.get(api_url, timeout=5)
-        response.raise_for_status()
-        latest_version = response.json()['tag_name']
-        print(f"현재 버전: {version}, 최신 버전: {latest_version}")
-        if latest_version.strip().lower() != version.strip().lower():
-            for asset in response.json()['assets']:
-                if asset['name'].endswith('.zip'):
-                    return asset['browser_download_url'], latest_version
-        return None, None
-    except requests.exceptions.RequestException as e:
-        print(f"업데이트 확인 중 오류 발생: {e}")
-        return None, None
-
-def download_and_apply_update(url):
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+    except OSError as e:
+        log.warning(f"경고: 업데이트 확인 결과를 저장하지 못했습니다: {e}")
+
+def update_backoff_seconds(failures, retry_after=None):
+    # 실패 횟수에 따라 2배씩 늘어나는 대기 시간에 ±50% 무작위 값을 더해, 여러 PC가 같은 시각에 다시 요청하지 않게 합니다.
+    base = float(CONFIG.get("update_backoff_minutes", 5)) * 60
+    limit = float(CONFIG.get("update_backoff_max_hours", 6)) * 3600
+    delay = min(limit, base * (2 ** max(0, failures - 1))) * random.uniform(0.5, 1.5)
+    if retry_after:
+        delay = max(delay, retry_after)
+    return delay
+
+def rate_limit_wait(response, now):
+    # GitHub가 알려주는 요청 제한 해제 시각(Retry-After / X-RateLimit-Reset)까지 남은 초
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    if response.headers.get("X-RateLimit-Remaining") == "0" and response.headers.get("X-RateLimit-Reset", "").isdigit():
+        return max(0.0, float(response.headers["X-RateLimit-Reset"]) - now)
+    return None
+
+def fetch_latest_release(url=None, cache_path=None, session=None, now=None):
+    # 최신 릴리스 정보(dict, tag_name/assets)를 돌려줍니다. 실패하면 마지막으로 받은 정보(없으면 None)를 돌려줍니다.
+    # - update_check_interval_minutes 안에 확인했으면 네트워크 요청을 하지 않습니다.
+    # - ETag로 조건부 요청(If-None-Match)을 보내 변경이 없으면 304(요청 제한에 포함되지 않음)로 끝납니다.
+    # - 실패나 요청 제한(403/429) 시에는 재시도 시각을 저장해 그때까지 요청하지 않습니다.
+    import requests
+    url = url or release_check_url()
+    cache_path = cache_path or CONFIG.get("update_cache_path") or "update_cache.json"
+    now = time.time() if now is None else now
+    cache = load_update_cache(cache_path)
+    if cache.get("url") != url:
+        cache = {"url": url}
+    release = cache.get("release")
+
+    if now < cache.get("next_attempt_at", 0):
+        log.info(f"업데이트 확인 건너뜀: {(cache['next_attempt_at'] - now) / 60:.0f}분 후 다시 확인합니다.")
+        return release
+    if release and now - cache.get("checked_at", 0) < float(CONFIG.get("update_check_interval_minutes", 60)) * 60:
+        return release
+
+    headers = {"Accept": "application/vnd.github+json"}
+    if cache.get("etag") and release:
+        headers["If-None-Match"] = cache["etag"]
+    retry_after = None
+    try:
+        data = None
+        if not url.lower().startswith(("http://", "https://")):
+            # 공유 폴더 등에 둔 매니페스트 파일 (예: \\server\share\latest.json)
+            with open(url, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        else:
+            response = (session or requests).get(url, headers=headers, timeout=5)
+            if response.status_code == 304:
+                log.info("업데이트 확인: 변경 없음 (캐시 사용)")
+            else:
+                if response.status_code in (403, 429):
+                    retry_after = rate_limit_wait(response, now)
+                response.raise_for_status()
+                data = response.json()
+                cache["etag"] = response.headers.get("ETag")
+        if data is not None:
+            release = {
+                "tag_name": data["tag_name"],
+                "assets": [{"name": a["name"], "browser_download_url": a["browser_download_url"]} for a in data.get("assets", [])],
+            }
+            cache["release"] = release
+        cache["checked_at"] = now
+        cache["failures"] = 0
+        cache["next_attempt_at"] = 0
+    except (requests.exceptions.RequestException, OSError, ValueError, KeyError, TypeError) as e:
+        cache["failures"] = cache.get("failures", 0) + 1
+        delay = update_backoff_seconds(cache["failures"], retry_after)
+        cache["next_attempt_at"] = now + delay
+        log.warning(f"업데이트 확인 중 오류 발생: {e} ({delay / 60:.0f}분 후 다시 시도)")
+    save_update_cache(cache_path, cache)
+    return release
+
+def check_for_updates(url=None, cache_path=None, session=None):
+    # 반환: (zip 다운로드 URL, 새 버전, .sha256 파일 URL) / 업데이트가 없으면 (None, None, None)
+    release = fetch_latest_release(url, cache_path, session)
+    if not release:
+        return None, None, None
+    version, latest_version = CONFIG["APP_VERSION"], release["tag_name"]
+    log.info(f"현재 버전: {version}, 최신 버전: {latest_version}")
+    if latest_version.strip().lower() != version.strip().lower():
+        assets = {asset['name']: asset['browser_download_url'] for asset in release['assets']}
+        for name, asset_url in assets.items():
+            if name.endswith('.zip'):
+                return asset_url, latest_version, assets.get(name + '.sha256')
+    return None, None, None
+
+UPDATE_CHUNK_SIZE = 256 * 1024
+
+class UpdateError(Exception):
+    pass
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(functools.partial(f.read, UPDATE_CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def fetch_expected_sha256(checksum_url, session=None):
+    # "<sha256>  <파일 이름>" 형식(sha256sum/Get-FileHash 출력)의 첫 항목을 읽습니다.
+    import requests
+    response = (session or requests).get(checksum_url, timeout=(10, 30))
+    response.raise_for_status()
+    digest = response.text.strip().split()[0].lower() if response.text.strip() else ""
+    if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+        raise UpdateError(f"체크섬 파일 형식이 올바르지 않습니다: {checksum_url}")
+    return digest
+
+def download_file(url, dest_path, retries=None, session=None, progress=None):
+    # dest_path + ".part"에 조금씩 받아 쓰고, 연결이 끊기면 HTTP Range로 받은 위치부터 이어받습니다.
+    # 메모리에는 한 번에 UPDATE_CHUNK_SIZE만 올라갑니다. progress(받은 바이트, 전체 바이트 또는 None)
+    import requests
+    session = session or requests.Session()
+    retries = int(CONFIG.get("update_download_retries", 5)) if retries is None else retries
+    part_path = dest_path + ".part"
+    attempt = 0
+    while True:
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=(10, 60)) as response:
+                if response.status_code == 416 and offset:
+                    # 이미 끝까지 받은 파일입니다. (체크섬으로 확인)
+                    break
+                response.raise_for_status()
+                if offset and response.status_code != 206:
+                    # 서버가 이어받기를 지원하지 않으면 처음부터 다시 받습니다.
+                    offset = 0
+                length = response.headers.get("Content-Length")
+                total = offset + int(length) if length is not None else None
+                received = offset
+                next_report = 0.1
+                with open(part_path, 'ab' if offset else 'wb') as f:
+                    for chunk in response.iter_content(UPDATE_CHUNK_SIZE):
+                        f.write(chunk)
+                        received += len(chunk)
+                        if progress:
+                            progress(received, total)
+                        if total and received / total >= next_report:
+                            log.info(f"업데이트 다운로드 중... {received * 100 // total}% ({received // 1024:,} / {total // 1024:,} KB)")
+                            next_report = (received * 10 // total + 1) / 10.0
+                if total is not None and received < total:
+                    raise requests.exceptions.ConnectionError(f"다운로드가 중간에 끊겼습니다. ({received:,} / {total:,} 바이트)")
+                break
+        except requests.exceptions.RequestException as e:
+            attempt += 1
+            if attempt > retries:
+                raise UpdateError(f"업데이트 다운로드 실패: {e}")
+            delay = min(30, 2 ** attempt)
+            log.warning(f"경고: 업데이트 다운로드가 중단되었습니다. {delay}초 후 이어받습니다. ({attempt}/{retries}) {e}")
+            time.sleep(delay)
+    os.replace(part_path, dest_path)
+    return dest_path
+
+def extract_update_zip(zip_path, dest_folder):
+    # 파일을 하나씩 조금씩 풀어 메모리 사용량을 제한하고, 폴더 밖으로 풀리는 경로(zip slip)는 거부합니다.
+    import shutil
+    dest_root = os.path.abspath(dest_folder)
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for member in zip_ref.infolist():
+            target = os.path.abspath(os.path.join(dest_root, member.filename))
+            if os.path.commonpath([dest_root, target]) != dest_root:
+                raise UpdateError(f"업데이트 파일에 잘못된 경로가 있습니다: {member.filename}")
+            if member.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with zip_ref.open(member) as source, open(target, 'wb') as out:
+                shutil.copyfileobj(source, out, UPDATE_CHUNK_SIZE)
+
+def fetch_update(url, checksum_url, temp_dir, progress=None):
+    # 다운로드 -> SHA-256 확인 -> 압축 해제까지 하고, 새 프로그램 파일이 있는 폴더를 돌려줍니다.
+    import shutil
+    zip_path = os.path.join(temp_dir, os.path.basename(url.split("?", 1)[0]) or "update.zip")
+    expected_sha256 = None
+    if checksum_url:
+        expected_sha256 = fetch_expected_sha256(checksum_url)
+    elif CONFIG.get("update_require_checksum", True):
+        raise UpdateError("릴리스에 SHA-256 체크섬 파일이 없어 업데이트하지 않습니다.")
+    else:
+        log.warning("경고: 릴리스에 체크섬 파일이 없어 다운로드 파일을 검증하지 않습니다.")
+
+    download_file(url, zip_path, progress=progress)
     try:
-        temp_dir = os.environ.get("TEMP", "C:\\Temp")
-        zip_path = os.path.join(temp_dir, "update.zip")
-        response = requests.get(url, stream=True, timeout=120)
-        response.raise_for_status()
-        with open(zip_path, 'wb') as f: f.write(response.content)
+        if expected_sha256:
+            actual_sha256 = file_sha256(zip_path)
+            if actual_sha256 != expected_sha256:
+                raise UpdateError(f"다운로드한 파일의 SHA-256이 일치하지 않습니다. (기대값 {expected_sha256}, 실제 {actual_sha256})")
+            log.info("업데이트 파일 SHA-256 확인 완료")
         temp_update_folder = os.path.join(temp_dir, "temp_update")
         if os.path.exists(temp_update_folder):
-            import shutil
             shutil.rmtree(temp_update_folder)
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(temp_update_folder)
+        extract_update_zip(zip_path, temp_update_folder)
+    finally:
         os.remove(zip_path)
+    extracted_content = os.listdir(temp_update_folder)
+    if len(extracted_content) == 1 and os.path.isdir(os.path.join(temp_update_folder, extracted_content[0])):
+        return temp_update_folder, os.path.join(temp_update_folder, extracted_content[0])
+    return temp_update_folder, temp_update_folder
+
+def download_and_apply_update(url, checksum_url=None):
+    try:
+        temp_dir = os.environ.get("TEMP") or tempfile.gettempdir()
+        temp_update_folder, new_program_folder_path = fetch_update(url, checksum_url, temp_dir)
         application_path = os.path.dirname(sys.executable if getattr(sys, 'frozen', False) else __file__)
         updater_script_path = os.path.join(application_path, "updater.bat")
-        extracted_content = os.listdir(temp_update_folder)
-        new_program_folder_path = os.path.join(temp_update_folder, extracted_content[0]) if len(extracted_content) == 1 and os.path.isdir(os.path.join(temp_update_folder, extracted_content[0])) else temp_update_folder
         with open(updater_script_path, "w", encoding='utf-8') as bat_file:
             bat_file.write(f"""@echo off
 chcp 65001 > nul & echo. & echo ========================================================== & echo    프로그램을 업데이트합니다. 이 창을 닫지 마세요. & echo ========================================================== & echo. & echo 잠시 후 프로그램이 자동으로 종료됩니다... & timeout /t 3 /nobreak > nul & taskkill /F /IM "{os.path.basename(sys.executable)}" > nul & echo. & echo 새 파일로 교체합니다... & xcopy "{new_program_folder_path}" "{application_path}" /E /H /C /I /Y > nul & echo. & echo 임시 파일을 삭제합니다... & rmdir /s /q "{temp_update_folder}" & echo. & echo ======================================== & echo    업데이트 완료! & echo ======================================== & echo. & echo 3초 후에 프로그램을 다시 시작합니다. & timeout /t 3 /nobreak > nul & start "" "{os.path.join(application_path, os.path.basename(sys.executable))}" & del "%~f0"
@@ -124,521 +697,3825 @@ chcp 65001 > nul & echo. & echo ================================================
         subprocess.Popen(updater_script_path, creationflags=subprocess.CREATE_NEW_CONSOLE)
         sys.exit(0)
     except Exception as e:
-        messagebox.showerror("업데이트 적용 실패", f"업데이트 적용 중 오류 발생:\n{e}")
+        log.error(f"[오류] 업데이트 적용 중 오류 발생: {e}")
+        if not HEADLESS:
+            from tkinter import messagebox
+            messagebox.showerror("업데이트 적용 실패", f"업데이트 적용 중 오류 발생:\n{e}")
         sys.exit(1)
 
-def threaded_update_check():
-    print("백그라운드 업데이트 확인 시작...")
-    download_url, new_version = check_for_updates()
+def confirm_update_dialog(new_version):
+    from tkinter import messagebox
+    return messagebox.askyesno("업데이트 발견", f"새로운 버전({new_version})이 있습니다.\n지금 업데이트하시겠습니까? (현재 버전: {CONFIG['APP_VERSION']})")
+
+def threaded_update_check(confirm=confirm_update_dialog):
+    # confirm(new_version)이 True를 돌려주면 업데이트를 적용합니다. (헤드리스 모드에서는 설정에 따라 자동 결정)
+    # 교대 시간에 여러 PC가 동시에 켜져도 요청이 몰리지 않도록 무작위로 조금 기다린 뒤 확인합니다.
+    time.sleep(random.uniform(0, float(CONFIG.get("update_startup_jitter_seconds", 30))))
+    log.info("백그라운드 업데이트 확인 시작...")
+    download_url, new_version, checksum_url = check_for_updates()
     if download_url:
-        if messagebox.askyesno("업데이트 발견", f"새로운 버전({new_version})이 있습니다.\n지금 업데이트하시겠습니까? (현재 버전: {CONFIG['APP_VERSION']})"):
-            download_and_apply_update(download_url)
+        if confirm(new_version):
+            download_and_apply_update(download_url, checksum_url)
         else:
-            print("사용자가 업데이트를 거부했습니다.")
+            log.info(f"업데이트를 적용하지 않았습니다. (새 버전: {new_version})")
 
-def print_label(image_path: str, printer_name: str, devmode=None):
-    if not win32print:
-        print("오류: pywin32 모듈이 없어 인쇄할 수 없습니다.")
-        return
-    if not os.path.exists(image_path):
-        print(f"인쇄 실패: 파일 '{image_path}'를 찾을 수 없습니다.")
-        return
+# #####################################################################
+# 2. 인쇄 백엔드 (GDI 프린터 / null / 파일 출력)
+# #####################################################################
+def compute_draw_rect(image_size, printable_size):
+    # 라벨 비율을 유지하면서 인쇄 가능 영역의 가운데에 최대 크기로 배치합니다.
+    img_width, img_height = image_size
+    printable_width, printable_height = printable_size
+
+    img_aspect = img_width / img_height
+    printable_aspect = printable_width / printable_height
+
+    if img_aspect > printable_aspect:
+        draw_width = printable_width
+        draw_height = int(draw_width / img_aspect)
+    else:
+        draw_height = printable_height
+        draw_width = int(draw_height * img_aspect)
+
+    draw_x = (printable_width - draw_width) // 2
+    draw_y = (printable_height - draw_height) // 2
+    return draw_x, draw_y, draw_width, draw_height
+
+class PrintBackend:
+    name = "base"
+    # 백엔드가 던지는 인쇄 오류 타입 (print_label에서 프린터 설정 안내 메시지로 처리)
+    errors = ()
+    # 백엔드가 정하는 래스터 모드 (None: 설정의 raster_mode)와 submit에 넘길 인쇄 데이터 형식 (None: PIL 이미지)
+    raster_mode = None
+    payload_format = None
+
+    def available(self):
+        return True
+
+    def get_printable_size(self, printer_name, devmode=None):
+        raise NotImplementedError
+
+    def submit(self, image, printer_name, devmode=None, doc_name="label", on_acquired=None):
+        # on_acquired(): 프린터 DC를 얻어 실제로 그리기 직전에 호출됩니다. (단계별 지연 측정용)
+        raise NotImplementedError
+
+    def submit_batch(self, pages, printer_name, devmode=None, on_acquired=None):
+        # pages: [(image, doc_name), ...] / 반환: 라벨별 오류 목록 (성공이면 None)
+        results = []
+        for image, doc_name in pages:
+            try:
+                self.submit(image, printer_name, devmode, doc_name=doc_name, on_acquired=None if results else on_acquired)
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def encode(self, raster):
+        # 렌더링한 래스터를 submit에 넘길 형식으로 바꿉니다. 결과는 래스터 캐시에 함께 저장됩니다.
+        return raster
+
+    def invalidate(self, printer_name=None):
+        # 프린터 설정이 바뀌었을 때 캐시된 프린터 상태를 버립니다.
+        pass
+
+    def stats(self):
+        return {}
 
-    hDC = None
+    def close(self):
+        pass
+
+def resolve_devmode(printer_name):
+    # 프린터에 저장된 기본 DEVMODE를 가져옵니다. 실패하면 None(드라이버 기본값)을 사용합니다.
+    h_printer = None
     try:
-        print(f"인쇄 시도: '{os.path.basename(image_path)}' -> '{printer_name}'")
-        
-        if devmode:
-            print(" - 시스템 프린터 설정(DEVMODE)을 적용합니다.")
-            hDC = win32gui.CreateDC("WINSPOOL", printer_name, devmode)
-        else:
-            print(" - 기본 프린터 설정을 사용합니다.")
-            hDC = win32gui.CreateDC("WINSPOOL", printer_name, None)
-        
-        hdc = win32ui.CreateDCFromHandle(hDC)
+        h_printer = win32print.OpenPrinter(printer_name)
+        return win32print.GetPrinter(h_printer, 2)['pDevMode']
+    except Exception:
+        return None
+    finally:
+        if h_printer:
+            win32print.ClosePrinter(h_printer)
+
+class PrinterSession:
+    # 프린터 DC, 인쇄 가능 영역, 적용된 DEVMODE를 작업 사이에 재사용하기 위한 묶음
+    def __init__(self, printer_name, devmode=None):
+        self.printer_name = printer_name
+        self.requested_devmode = devmode
+        self.devmode = devmode if devmode else resolve_devmode(printer_name)
+        self.hDC = win32gui.CreateDC("WINSPOOL", printer_name, self.devmode)
+        self.hdc = win32ui.CreateDCFromHandle(self.hDC)
+        self.printable_size = (self.hdc.GetDeviceCaps(win32con.HORZRES), self.hdc.GetDeviceCaps(win32con.VERTRES))
+        self.lock = threading.Lock()
+
+    def close(self):
+        if self.hDC:
+            try:
+                win32gui.DeleteDC(self.hDC)
+            except Exception:
+                pass
+            self.hDC = None
+
+class PrinterSessionCache:
+    def __init__(self, session_factory=PrinterSession):
+        self.session_factory = session_factory
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, printer_name, devmode=None):
+        with self._lock:
+            session = self._sessions.get(printer_name)
+            if session is not None and session.requested_devmode is devmode:
+                self.hits += 1
+                return session
+            self.misses += 1
+            if session is not None:
+                session.close()
+            if devmode:
+                log.info(" - 시스템 프린터 설정(DEVMODE)을 적용합니다.")
+            else:
+                log.info(" - 기본 프린터 설정을 사용합니다.")
+            session = self.session_factory(printer_name, devmode)
+            self._sessions[printer_name] = session
+            return session
+
+    def invalidate(self, printer_name=None, reason=""):
+        with self._lock:
+            names = list(self._sessions) if printer_name is None else [printer_name]
+            for name in names:
+                session = self._sessions.pop(name, None)
+                if session is not None:
+                    session.close()
+                    self.invalidations += 1
+                    log.info(f" - 프린터 연결 캐시를 초기화했습니다: '{name}'" + (f" ({reason})" if reason else ""))
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations, "sessions": len(self._sessions)}
+
+class GdiPrintBackend(PrintBackend):
+    name = "gdi"
+    errors = (win32ui.error, pywintypes.error) if win32print else ()
 
-        printable_width = hdc.GetDeviceCaps(win32con.HORZRES)
-        printable_height = hdc.GetDeviceCaps(win32con.VERTRES)
+    def __init__(self, session_cache=None):
+        self.sessions = session_cache or PrinterSessionCache()
 
-        hdc.StartDoc(image_path)
-        hdc.StartPage()
+    def available(self):
+        return win32print is not None
 
-        img = Image.open(image_path)
-        img_width, img_height = img.size
+    def get_printable_size(self, printer_name, devmode=None):
+        return self.sessions.acquire(printer_name, devmode).printable_size
 
-        img_aspect = img_width / img_height
-        printable_aspect = printable_width / printable_height
+    def submit(self, image, printer_name, devmode=None, doc_name="label", on_acquired=None):
+        session = self.sessions.acquire(printer_name, devmode)
+        try:
+            with session.lock:
+                if on_acquired:
+                    on_acquired()
+                hdc = session.hdc
+                hdc.StartDoc(doc_name)
+                hdc.StartPage()
+
+                draw_x, draw_y, draw_width, draw_height = compute_draw_rect(image.size, session.printable_size)
+                dib = ImageWin.Dib(image)
+                dib.draw(hdc.GetHandleOutput(), (draw_x, draw_y, draw_x + draw_width, draw_y + draw_height))
+
+                hdc.EndPage()
+                hdc.EndDoc()
+        except self.errors:
+            # 프린터 오류 후에는 DC 상태를 신뢰할 수 없으므로 다음 작업에서 새로 연결합니다.
+            self.sessions.invalidate(printer_name, "인쇄 오류")
+            raise
+
+    def submit_batch(self, pages, printer_name, devmode=None, on_acquired=None):
+        # 여러 라벨을 하나의 스풀러 문서(여러 페이지)로 보냅니다.
+        session = self.sessions.acquire(printer_name, devmode)
+        results = []
+        try:
+            with session.lock:
+                if on_acquired:
+                    on_acquired()
+                hdc = session.hdc
+                hdc.StartDoc(f"{os.path.basename(pages[0][1])} 외 {len(pages) - 1}건")
+                for image, doc_name in pages:
+                    try:
+                        hdc.StartPage()
+                        draw_x, draw_y, draw_width, draw_height = compute_draw_rect(image.size, session.printable_size)
+                        dib = ImageWin.Dib(image)
+                        dib.draw(hdc.GetHandleOutput(), (draw_x, draw_y, draw_x + draw_width, draw_y + draw_height))
+                        hdc.EndPage()
+                        results.append(None)
+                    except self.errors as e:
+                        results.append(e)
+                hdc.EndDoc()
+        except self.errors as e:
+            # 문서 자체가 실패하면 스풀러에 들어간 페이지가 없으므로 모두 실패로 처리합니다.
+            self.sessions.invalidate(printer_name, "인쇄 오류")
+            return [e] * len(pages)
+        if any(results):
+            self.sessions.invalidate(printer_name, "인쇄 오류")
+        return results
+
+    def invalidate(self, printer_name=None):
+        self.sessions.invalidate(printer_name, "프린터 설정 변경")
+
+    def stats(self):
+        return {"session_cache": self.sessions.stats()}
+
+    def close(self):
+        self.sessions.invalidate()
+
+class NullPrintBackend(PrintBackend):
+    # 실제 출력 없이 print_label과 같은 디코딩/배치 계산만 수행합니다. (벤치마크, CI 용)
+    name = "null"
+
+    def __init__(self, page_size=None):
+        self.page_size = tuple(page_size or CONFIG.get("virtual_page_size") or (812, 406))
+        self.submitted = 0
+        self._lock = threading.Lock()
+
+    def get_printable_size(self, printer_name, devmode=None):
+        return self.page_size
+
+    def layout(self, image, printer_name, devmode=None):
+        image.load()
+        return compute_draw_rect(image.size, self.get_printable_size(printer_name, devmode))
+
+    def submit(self, image, printer_name, devmode=None, doc_name="label", on_acquired=None):
+        if on_acquired:
+            on_acquired()
+        rect = self.layout(image, printer_name, devmode)
+        with self._lock:
+            self.submitted += 1
+        return rect
+
+class FilePrintBackend(NullPrintBackend):
+    # 프린터로 보낼 페이지를 PNG로 그려 폴더에 저장합니다. (출력 결과 확인, 벤치마크 용)
+    name = "file"
+
+    def __init__(self, output_folder=None, page_size=None):
+        super().__init__(page_size)
+        self.output_folder = output_folder or CONFIG.get("print_output_folder") or "print_output"
+        os.makedirs(self.output_folder, exist_ok=True)
+
+    def submit(self, image, printer_name, devmode=None, doc_name="label", on_acquired=None):
+        if on_acquired:
+            on_acquired()
+        draw_x, draw_y, draw_width, draw_height = self.layout(image, printer_name, devmode)
+        page = Image.new("RGB", self.get_printable_size(printer_name, devmode), "white")
+        page.paste(image.convert("RGB").resize((draw_width, draw_height)), (draw_x, draw_y))
+        with self._lock:
+            self.submitted += 1
+            sequence = self.submitted
+        base_name = os.path.splitext(os.path.basename(doc_name))[0]
+        page.save(os.path.join(self.output_folder, f"{sequence:06d}_{base_name}.png"))
+        return draw_x, draw_y, draw_width, draw_height
 
-        if img_aspect > printable_aspect:
-            draw_width = printable_width
-            draw_height = int(draw_width / img_aspect)
+# RAW 인쇄: 1비트 래스터를 프린터 언어의 그래픽 명령으로 바꿔 드라이버(GDI)를 거치지 않고 보냅니다.
+RAW_PRINTER_DEFAULTS = {
+    "language": "zpl",                 # zpl: Zebra ^GF (ASCII 압축) / epl: EPL2 GW
+    "transport": "spooler",            # spooler: Windows 스풀러에 RAW 문서로 / tcp: 프린터 9100 포트로 직접
+    "host": "",                        # tcp: 프린터 주소
+    "port": 9100,
+    "page_dots": [812, 406],           # 인쇄 영역 크기(도트, 203dpi 4x2인치 = 812x406)
+    "timeout_seconds": 5,              # tcp 연결/전송 제한 시간
+}
+_INVERT_BITS = bytes(255 - i for i in range(256))
+_ZPL_RUN = re.compile(r"(.)\1{2,}")
+
+class RawPrintError(Exception):
+    pass
+
+def zpl_repeat_prefix(count):
+    # ZPL 압축의 반복 횟수 문자: G~Y = 1~19, g~z = 20~400 (여러 글자는 합산)
+    prefix = ""
+    while count > 0:
+        if count >= 20:
+            n = min(count // 20, 20)
+            prefix += chr(ord("g") + n - 1)
+            count -= n * 20
         else:
-            draw_height = printable_height
-            draw_width = int(draw_height * img_aspect)
-        
-        dib = ImageWin.Dib(img)
-        
-        draw_x = (printable_width - draw_width) // 2
-        draw_y = (printable_height - draw_height) // 2
-        
-        dib.draw(hdc.GetHandleOutput(), (draw_x, draw_y, draw_x + draw_width, draw_y + draw_height))
-
-        hdc.EndPage()
-        hdc.EndDoc()
-        print(f"성공: 인쇄 명령을 전송했습니다.")
-
-    except (win32ui.error, pywintypes.error) as e:
-        print(f"오류: 인쇄 중 오류가 발생했습니다. 프린터('{printer_name}') 설정을 확인해주세요.\n{e}")
-    except Exception as e:
-        print(f"오류: 예기치 않은 인쇄 오류가 발생했습니다.\n{e}")
-    finally:
-        if hDC:
-            win32gui.DeleteDC(hDC)
+            prefix += chr(ord("G") + count - 1)
+            count = 0
+    return prefix
 
+def zpl_compress_row(hex_row):
+    # 같은 글자가 3번 이상 이어지면 반복 횟수로 줄이고, 줄 끝의 0(흰색)은 ','로 생략합니다.
+    stripped = hex_row.rstrip("0")
+    if not stripped:
+        return ","
+    body = _ZPL_RUN.sub(lambda m: zpl_repeat_prefix(len(m.group(0))) + m.group(1), stripped)
+    return body + ("," if len(stripped) < len(hex_row) else "")
 
-class LabelPrintHandler(FileSystemEventHandler):
-    def __init__(self, printer_name: str, get_devmode_func):
+def encode_zpl_graphic(raster):
+    # 1비트 래스터 -> ^GFA (PIL은 1 = 흰색, ZPL은 1 = 검은 점). 바로 윗줄과 같은 줄은 ':' 한 글자로 보냅니다.
+    # 라벨은 빈 줄과 같은 줄(바코드 세로선 등)이 대부분이라 처음 보는 줄만 압축합니다.
+    width, height = raster.size
+    row_bytes = (width + 7) // 8
+    data = raster.tobytes().translate(_INVERT_BITS)
+    rows, previous, compressed = [], None, {bytes(row_bytes): ","}
+    for y in range(height):
+        row = data[y * row_bytes:(y + 1) * row_bytes]
+        if row == previous:
+            rows.append(":")
+            continue
+        text = compressed.get(row)
+        if text is None:
+            text = compressed[row] = zpl_compress_row(row.hex().upper())
+        rows.append(text)
+        previous = row
+    total = row_bytes * height
+    return f"^XA^PW{width}^LL{height}^FO0,0^GFA,{total},{total},{row_bytes},{''.join(rows)}^FS^XZ\n".encode("ascii")
+
+def encode_epl_graphic(raster):
+    # 1비트 래스터 -> EPL2 GW (EPL은 0 = 검은 점이라 PIL 비트를 그대로 사용)
+    width, height = raster.size
+    row_bytes = (width + 7) // 8
+    return b"N\n" + f"GW0,0,{row_bytes},{height},".encode("ascii") + raster.tobytes() + b"\nP1\n"
+
+RAW_ENCODERS = {
+    "zpl": encode_zpl_graphic,
+    "epl": encode_epl_graphic,
+}
+
+class RawPrintBackend(PrintBackend):
+    # 프린터 하나에 대한 RAW 인쇄. 래스터 캐시에는 변환된 프린터 명령이 저장되므로 같은 라벨은 다시 변환하지 않습니다.
+    name = "raw"
+    raster_mode = "1"
+    errors = (RawPrintError,) + GdiPrintBackend.errors
+
+    def __init__(self, printer_name, settings):
         self.printer_name = printer_name
-        self.get_devmode_func = get_devmode_func
-        self._last_printed_time = {}
+        self.settings = settings
+        self.payload_format = settings["language"]
+        self.jobs = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()  # 프린터당 한 문서씩 (작업자가 여럿이어도 라벨 순서 유지)
 
-    def on_created(self, event):
-        if event.is_directory or not event.src_path.lower().endswith('.png'):
-            return
-        filepath = event.src_path
-        current_time = time.time()
-        if self._last_printed_time.get(filepath) and current_time - self._last_printed_time.get(filepath, 0) < 2:
-            return
-        self._last_printed_time[filepath] = current_time
-        
-        devmode = self.get_devmode_func()
-        threading.Thread(target=print_label, args=(filepath, self.printer_name, devmode), daemon=True).start()
+    def available(self):
+        return self.settings["transport"] == "tcp" or win32print is not None
 
-class App(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title(f"라벨 자동 출력기 ({CONFIG['APP_VERSION']})")
-        self.geometry("700x700")
-        
-        # ############### [추가됨] 자동 실행 레지스트리 관련 변수 ###############
-        self.app_name = "LabelPrinterWatcher"
-        # pyinstaller로 빌드된 .exe 경로 또는 .py 스크립트 경로를 가져옴
-        self.app_path = sys.executable if getattr(sys, 'frozen', False) else os.path.abspath(__file__)
-        self.reg_key_path = r"Software\Microsoft\Windows\CurrentVersion\Run"
-
-        try:
-            logo_path = resource_path('assets/logo.png')
-            self.logo_image = ImageTk.PhotoImage(file=logo_path)
-            self.iconphoto(True, self.logo_image)
-        except Exception as e:
-            print(f"윈도우 로고 이미지 로드 실패: {e}")
+    def get_printable_size(self, printer_name, devmode=None):
+        return tuple(self.settings["page_dots"])
 
-        self.protocol("WM_DELETE_WINDOW", self.on_closing)
-        
-        self.log_queue = Queue()
-        self.observer = None
-        self.current_watch_date = None
-        self.is_running = True
-        self.restart_monitoring = threading.Event()
-        
-        self.remnant_devmode = None
-        self.defective_devmode = None
-
-        self.create_widgets()
-        self.redirect_stdout()
-        self.monitor_thread = threading.Thread(target=self.monitoring_loop, daemon=True)
-        self.monitor_thread.start()
-        self.after(100, self.process_log_queue)
-        self.setup_tray_icon()
-        threading.Thread(target=threaded_update_check, daemon=True).start()
-
-    def create_widgets(self):
-        self.notebook = ttk.Notebook(self, padding=10)
-        self.notebook.pack(fill=tk.BOTH, expand=True)
-
-        log_frame = ttk.Frame(self.notebook)
-        self.notebook.add(log_frame, text='실행 로그')
-        
-        log_label = tk.Label(log_frame, text="실시간 실행 로그", font=("Malgun Gothic", 10, "bold"))
-        log_label.pack(anchor="w", pady=(0, 5))
-        self.log_text = scrolledtext.ScrolledText(log_frame, wrap=tk.WORD, font=("Consolas", 10), state='disabled')
-        self.log_text.pack(fill=tk.BOTH, expand=True)
-
-        settings_frame = ttk.Frame(self.notebook, padding=10)
-        self.notebook.add(settings_frame, text='인쇄 설정')
-
-        remnant_frame = ttk.LabelFrame(settings_frame, text="잔량 라벨 설정", padding=10)
-        remnant_frame.pack(fill=tk.X, pady=5)
-        
-        tk.Label(remnant_frame, text="프린터 선택:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
-        self.remnant_printer_var = tk.StringVar(value=CONFIG.get("remnant_printer", ""))
-        tk.Entry(remnant_frame, textvariable=self.remnant_printer_var, width=40).grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-        tk.Button(remnant_frame, text="찾아보기", command=lambda: self.select_printer(self.remnant_printer_var)).grid(row=0, column=2, padx=5, pady=5)
-        
-        tk.Button(remnant_frame, text="시스템 프린터 설정", command=lambda: self.open_printer_properties('remnant')).grid(row=0, column=3, padx=5, pady=5)
-
-        tk.Label(remnant_frame, text="감시 폴더:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
-        self.remnant_folder_var = tk.StringVar(value=CONFIG.get("remnant_base_folder", ""))
-        tk.Entry(remnant_frame, textvariable=self.remnant_folder_var, width=40).grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-        tk.Button(remnant_frame, text="찾아보기", command=lambda: self.select_folder(self.remnant_folder_var)).grid(row=1, column=2, padx=5, pady=5)
-        remnant_frame.columnconfigure(1, weight=1)
-
-        defective_frame = ttk.LabelFrame(settings_frame, text="불량 라벨 설정", padding=10)
-        defective_frame.pack(fill=tk.X, pady=5)
-
-        tk.Label(defective_frame, text="프린터 선택:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
-        self.defective_printer_var = tk.StringVar(value=CONFIG.get("defective_printer", ""))
-        tk.Entry(defective_frame, textvariable=self.defective_printer_var, width=40).grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-        tk.Button(defective_frame, text="찾아보기", command=lambda: self.select_printer(self.defective_printer_var)).grid(row=0, column=2, padx=5, pady=5)
-        
-        tk.Button(defective_frame, text="시스템 프린터 설정", command=lambda: self.open_printer_properties('defective')).grid(row=0, column=3, padx=5, pady=5)
-
-        tk.Label(defective_frame, text="감시 폴더:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
-        self.defective_folder_var = tk.StringVar(value=CONFIG.get("defective_base_folder", ""))
-        tk.Entry(defective_frame, textvariable=self.defective_folder_var, width=40).grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-        tk.Button(defective_frame, text="찾아보기", command=lambda: self.select_folder(self.defective_folder_var)).grid(row=1, column=2, padx=5, pady=5)
-        defective_frame.columnconfigure(1, weight=1)
-        
-        # ############### [추가됨] 자동 실행 설정 프레임 ###############
-        startup_frame = ttk.LabelFrame(settings_frame, text="옵션", padding=10)
-        startup_frame.pack(fill=tk.X, pady=(15, 5))
-
-        self.startup_var = tk.BooleanVar()
-        self.startup_checkbutton = ttk.Checkbutton(startup_frame, text="윈도우 시작 시 자동 실행", variable=self.startup_var, command=self.toggle_startup)
-        self.startup_checkbutton.pack(anchor="w")
-        self.startup_var.set(self.check_startup_registry())
-
-        button_frame = tk.Frame(settings_frame)
-        button_frame.pack(fill=tk.X, pady=20)
-
-        tk.Button(button_frame, text="설정 저장", command=self.save_settings, height=2, bg="#4CAF50", fg="white", font=("Malgun Gothic", 10, "bold")).pack(side=tk.LEFT, expand=True, padx=5)
-        tk.Button(button_frame, text="테스트 라벨 생성", command=self.create_test_label, height=2, bg="#2196F3", fg="white", font=("Malgun Gothic", 10, "bold")).pack(side=tk.RIGHT, expand=True, padx=5)
-
-        self.status_var = tk.StringVar(value="초기화 중...")
-        status_bar = tk.Label(self, textvariable=self.status_var, bd=1, relief=tk.SUNKEN, anchor='w', padx=5)
-        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
-    
-    # ############### [추가됨] 자동 실행 레지스트리 관리 함수들 ###############
-    def toggle_startup(self):
-        if self.startup_var.get():
-            self.set_startup_registry()
-        else:
-            self.remove_startup_registry()
+    def encode(self, raster):
+        return RAW_ENCODERS[self.payload_format](raster)
+
+    def submit(self, image, printer_name, devmode=None, doc_name="label", on_acquired=None):
+        self.send([image], doc_name, on_acquired)
 
-    def set_startup_registry(self):
+    def submit_batch(self, pages, printer_name, devmode=None, on_acquired=None):
+        # 묶음은 명령을 이어 붙여 문서(연결) 하나로 보냅니다.
         try:
-            key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.reg_key_path, 0, winreg.KEY_WRITE)
-            winreg.SetValueEx(key, self.app_name, 0, winreg.REG_SZ, self.app_path)
-            winreg.CloseKey(key)
-            print("자동 실행 설정: 레지스트리에 등록되었습니다.")
-        except Exception as e:
-            messagebox.showerror("오류", f"자동 실행 설정에 실패했습니다:\n{e}")
-            print(f"[오류] 자동 실행 레지스트리 등록 실패: {e}")
+            self.send([payload for payload, _ in pages], f"{os.path.basename(pages[0][1])} 외 {len(pages) - 1}건", on_acquired)
+        except self.errors as e:
+            return [e] * len(pages)
+        return [None] * len(pages)
+
+    def send(self, payloads, doc_name, on_acquired=None):
+        data = b"".join(payloads)
+        with self._lock:
+            if on_acquired:
+                on_acquired()
+            if self.settings["transport"] == "tcp":
+                self._send_tcp(data)
+            else:
+                self._send_spooler(data, doc_name)
+            self.jobs += len(payloads)
+            self.bytes_sent += len(data)
 
-    def remove_startup_registry(self):
+    def _send_tcp(self, data):
+        address = (self.settings["host"], int(self.settings["port"]))
         try:
-            key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.reg_key_path, 0, winreg.KEY_WRITE)
-            winreg.DeleteValue(key, self.app_name)
-            winreg.CloseKey(key)
-            print("자동 실행 해제: 레지스트리에서 제거되었습니다.")
-        except FileNotFoundError:
-            # 이미 없는 경우이므로 정상이므로 무시
-            print("자동 실행 해제: 레지스트리에 등록되어 있지 않습니다.")
-            pass
-        except Exception as e:
-            messagebox.showerror("오류", f"자동 실행 해제에 실패했습니다:\n{e}")
-            print(f"[오류] 자동 실행 레지스트리 제거 실패: {e}")
+            with socket.create_connection(address, timeout=float(self.settings["timeout_seconds"])) as sock:
+                sock.sendall(data)
+                sock.shutdown(socket.SHUT_WR)
+        except OSError as e:
+            raise RawPrintError(f"{address[0]}:{address[1]} 전송 실패 ({e})") from e
 
-    def check_startup_registry(self):
+    def _send_spooler(self, data, doc_name):
+        h_printer = win32print.OpenPrinter(self.printer_name)
         try:
-            key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.reg_key_path, 0, winreg.KEY_READ)
-            winreg.QueryValueEx(key, self.app_name)
-            winreg.CloseKey(key)
-            return True
-        except FileNotFoundError:
-            return False
-        except Exception as e:
-            print(f"[오류] 자동 실행 상태 확인 실패: {e}")
-            return False
-            
-    def open_printer_properties(self, printer_type):
-        if not win32print:
-            messagebox.showerror("모듈 오류", "'pywin32'가 설치되지 않았습니다.")
-            return
+            win32print.StartDocPrinter(h_printer, 1, (os.path.basename(doc_name), None, "RAW"))
+            try:
+                win32print.StartPagePrinter(h_printer)
+                win32print.WritePrinter(h_printer, data)
+                win32print.EndPagePrinter(h_printer)
+            finally:
+                win32print.EndDocPrinter(h_printer)
+        finally:
+            win32print.ClosePrinter(h_printer)
+
+    def stats(self):
+        return {"jobs": self.jobs, "bytes_sent": self.bytes_sent}
+
+PRINT_BACKENDS = {
+    "gdi": GdiPrintBackend,
+    "null": NullPrintBackend,
+    "file": FilePrintBackend,
+}
+
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+def create_print_backend(name=None):
+    name = (name or CONFIG.get("print_backend") or "gdi").lower()
+    if name not in PRINT_BACKENDS:
+        log.error(f"오류: 알 수 없는 인쇄 백엔드 '{name}'입니다. 'gdi'를 사용합니다.")
+        name = "gdi"
+    return PRINT_BACKENDS[name]()
+
+def get_print_backend():
+    global _default_backend
+    with _default_backend_lock:
+        if _default_backend is None:
+            _default_backend = create_print_backend()
+        return _default_backend
+
+_raw_backends = {}
+
+def raw_printer_config(printer_name):
+    # raw_printers 설정이 있는 프린터면 기본값을 채운 설정, 아니면 None
+    settings = CONFIG.get("raw_printers", {}).get(printer_name) if printer_name else None
+    if not isinstance(settings, dict):
+        return None
+    merged = dict(RAW_PRINTER_DEFAULTS, **settings)
+    merged["language"] = str(merged["language"]).lower()
+    if merged["language"] not in RAW_ENCODERS or merged["transport"] not in ("spooler", "tcp") or \
+            (merged["transport"] == "tcp" and not merged["host"]):
+        log.error(f"오류: 프린터 '{printer_name}'의 RAW 인쇄 설정이 올바르지 않아 일반 인쇄를 사용합니다: {settings}")
+        return None
+    return merged
+
+def raw_print_backend(printer_name):
+    # RAW 인쇄로 설정된 프린터의 백엔드 (설정이 바뀌면 새로 만듭니다)
+    settings = raw_printer_config(printer_name)
+    if settings is None:
+        return None
+    with _default_backend_lock:
+        backend = _raw_backends.get(printer_name)
+        if backend is None or backend.settings != settings:
+            backend = _raw_backends[printer_name] = RawPrintBackend(printer_name, settings)
+        return backend
+
+# 프린터 상태 감시 (오프라인/용지 걸림/스풀 적체 -> 일시 정지 또는 예비 프린터)
+class PrinterStatus:
+    def __init__(self, healthy=True, reason="", jobs=0, status=0):
+        self.healthy = healthy
+        self.reason = reason
+        self.jobs = jobs
+        self.status = status
+
+    def __eq__(self, other):
+        return isinstance(other, PrinterStatus) and (self.healthy, self.reason, self.jobs, self.status) == (other.healthy, other.reason, other.jobs, other.status)
+
+class PrinterStatusSource:
+    name = "base"
 
-        printer_name = self.remnant_printer_var.get() if printer_type == 'remnant' else self.defective_printer_var.get()
+    def query(self, printer_name):
+        raise NotImplementedError
 
+class Win32PrinterStatusSource(PrinterStatusSource):
+    # GetPrinter(level 2)의 상태 플래그와 스풀 작업 수로 판단합니다. (프린터당 호출 한 번이라 부담이 적음)
+    name = "win32"
+    PRINTER_ATTRIBUTE_WORK_OFFLINE = 0x400
+    UNHEALTHY_STATUS = (
+        (0x00000001, "일시 중지됨"), (0x00000002, "오류"), (0x00000004, "삭제 중"), (0x00000008, "용지 걸림"),
+        (0x00000010, "용지 없음"), (0x00000040, "용지 문제"), (0x00000080, "오프라인"), (0x00001000, "사용할 수 없음"),
+        (0x00040000, "토너/리본 없음"), (0x00100000, "사용자 조치 필요"), (0x00400000, "덮개 열림"),
+    )
+
+    def query(self, printer_name):
+        raw = raw_printer_config(printer_name)
+        if raw and raw["transport"] == "tcp":
+            return PrinterStatus()  # 스풀러를 거치지 않는 프린터 (전송 오류는 재시도 정책으로 처리)
+        h_printer = None
+        try:
+            h_printer = win32print.OpenPrinter(printer_name)
+            info = win32print.GetPrinter(h_printer, 2)
+        except pywintypes.error as e:
+            return PrinterStatus(False, f"프린터를 열 수 없음 ({e.strerror})")
+        finally:
+            if h_printer:
+                win32print.ClosePrinter(h_printer)
+        status, jobs = info["Status"], info["cJobs"]
+        reasons = [text for flag, text in self.UNHEALTHY_STATUS if status & flag]
+        if info["Attributes"] & self.PRINTER_ATTRIBUTE_WORK_OFFLINE:
+            reasons.append("오프라인으로 사용")
+        max_jobs = int(CONFIG.get("printer_max_spool_jobs", 50))
+        if max_jobs and jobs >= max_jobs:
+            reasons.append(f"스풀 대기 {jobs}건")
+        return PrinterStatus(not reasons, ", ".join(reasons), jobs, status)
+
+class StaticPrinterStatusSource(PrinterStatusSource):
+    # 실제 프린터 없이 상태를 직접 정하는 상태 소스 (null/file 백엔드, 예비 프린터 전환 시험용)
+    name = "static"
+
+    def __init__(self, statuses=None):
+        self.statuses = dict(statuses or {})
+
+    def set(self, printer_name, healthy, reason="", jobs=0):
+        self.statuses[printer_name] = PrinterStatus(healthy, reason, jobs)
+
+    def query(self, printer_name):
+        return self.statuses.get(printer_name) or PrinterStatus()
+
+def create_printer_status_source(name=None):
+    name = (name or CONFIG.get("printer_status_source") or "auto").lower()
+    if name == "auto":
+        name = "win32" if win32print and (CONFIG.get("print_backend") or "gdi") == "gdi" else "static"
+    if name == "win32" and win32print:
+        return Win32PrinterStatusSource()
+    return StaticPrinterStatusSource()
+
+class PrinterMonitor:
+    # 사용 중인 프린터의 상태를 주기적으로 확인합니다. 아직 확인하지 않은 프린터는 정상으로 봅니다.
+    # 상태가 바뀌면 wait_for_change()로 기다리던 인쇄 작업자를 깨웁니다.
+    def __init__(self, source=None, interval=None):
+        self.source = source or create_printer_status_source()
+        self.interval = interval if interval is not None else float(CONFIG.get("printer_monitor_interval_seconds", 2))
+        self.statuses = {}
+        self._printers = set()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="printer-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def watch(self, printer_name):
         if not printer_name:
-            messagebox.showwarning("프린터 선택 필요", "먼저 프린터를 선택하고 저장해주세요.")
             return
+        with self._cond:
+            if printer_name not in self._printers:
+                self._printers.add(printer_name)
+                self._cond.notify_all()
 
-        try:
-            PRINTER_DEFAULTS = {"DesiredAccess": win32print.PRINTER_ALL_ACCESS}
-            h_printer = win32print.OpenPrinter(printer_name, PRINTER_DEFAULTS)
-            
-            properties = win32print.GetPrinter(h_printer, 2)
-            p_devmode = properties['pDevMode']
-            
-            result = win32print.DocumentProperties(self.winfo_id(), h_printer, printer_name, p_devmode, p_devmode, win32con.DM_IN_PROMPT | win32con.DM_OUT_BUFFER | win32con.DM_IN_BUFFER)
-            
-            if result == win32con.IDOK:
-                win32print.SetPrinter(h_printer, 2, properties, 0)
-                
-                if printer_type == 'remnant':
-                    self.remnant_devmode = p_devmode
-                elif printer_type == 'defective':
-                    self.defective_devmode = p_devmode
-                
-                print(f"프린터({printer_name})의 시스템 기본 설정이 영구적으로 변경되었습니다.")
-                messagebox.showinfo("설정 완료", f"'{printer_name}' 프린터의 기본 설정이 **영구적으로** 변경되었습니다.")
-            else:
-                print("사용자가 프린터 설정 변경을 취소했습니다.")
-                messagebox.showinfo("취소", "프린터 설정 변경이 취소되었습니다.")
+    def is_healthy(self, printer_name):
+        with self._cond:
+            status = self.statuses.get(printer_name)
+            return status is None or status.healthy
 
-            win32print.ClosePrinter(h_printer)
+    def status(self, printer_name):
+        with self._cond:
+            return self.statuses.get(printer_name)
 
-        except pywintypes.error as e:
-            if e.winerror == 5:
-                 messagebox.showerror("권한 오류", f"프린터 설정을 변경할 권한이 없습니다.\n프로그램을 관리자 권한으로 실행해주세요.")
-                 print(f"[오류] 프린터 설정 변경 권한 부족: {e}")
-            else:
-                messagebox.showerror("설정 오류", f"프린터 속성을 여는 중 오류 발생:\n{e}\n프린터 이름이 올바른지 확인해주세요.")
-                print(f"[오류] 프린터 속성 열기 실패: {e}")
-        except Exception as e:
-            messagebox.showerror("알 수 없는 오류", f"예상치 못한 오류 발생:\n{e}")
-            print(f"[오류] 프린터 속성 열기 중 예외 발생: {e}")
+    def snapshot(self):
+        with self._cond:
+            return dict(self.statuses)
 
-    def get_current_settings(self):
-        return {}
+    def check(self, printer_name):
+        # 인쇄가 실패했을 때 등: 주기를 기다리지 않고 바로 확인합니다.
+        self._poll(printer_name)
+        return self.is_healthy(printer_name)
 
-    def select_folder(self, var):
-        folder_selected = filedialog.askdirectory()
-        if folder_selected:
-            var.set(folder_selected)
+    def wait_for_change(self, timeout):
+        with self._cond:
+            self._cond.wait(timeout)
 
-    def get_printers(self):
-        if not win32print:
-            messagebox.showerror("모듈 오류", "'pywin32' 라이브러리가 설치되지 않았습니다.\n프로그램을 종료하고 'pip install pywin32'를 실행해주세요.")
-            return []
+    def _poll(self, printer_name):
         try:
-            printers = [printer[2] for printer in win32print.EnumPrinters(2)]
-            if not printers:
-                print("[정보] 설치된 프린터를 찾을 수 없습니다.")
-            return printers
+            status = self.source.query(printer_name)
         except Exception as e:
-            print(f"[오류] 프린터 목록을 가져오는 데 실패했습니다: {e}")
-            messagebox.showerror("프린터 조회 실패", f"프린터 목록을 가져오는 중 오류가 발생했습니다.\n{e}")
-            return []
+            status = PrinterStatus(False, f"상태 확인 실패 ({e})")
+        with self._cond:
+            old = self.statuses.get(printer_name)
+            self.statuses[printer_name] = status
+            if old == status:
+                return
+            self._cond.notify_all()
+        if not status.healthy and (old is None or old.healthy):
+            log.warning(f"경고: '{printer_name}' 프린터 이상: {status.reason}")
+        elif status.healthy and old is not None and not old.healthy:
+            log.info(f"'{printer_name}' 프린터가 정상으로 돌아왔습니다.")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                printers = list(self._printers)
+            for printer_name in printers:
+                self._poll(printer_name)
+            with self._cond:
+                if self._running:
+                    self._cond.wait(self.interval)
+
+# #####################################################################
+# 3. 라벨 렌더링 (프린터 해상도 래스터 캐시)
+# #####################################################################
+def flatten_label(image):
+    # 투명 배경 PNG는 흰 바탕 위에 합성합니다. (그대로 흑백 변환하면 투명 영역이 검게 나옴)
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+        return Image.alpha_composite(background, rgba).convert("RGB")
+    return image
+
+def render_label_raster(image, printable_size, mode="L"):
+    # 라벨을 프린터의 인쇄 가능 영역 크기 그대로의 페이지로 미리 그립니다.
+    # 인쇄 시 GDI가 다시 확대/축소할 필요가 없고, 1비트/8비트라 스풀러로 보내는 양도 줄어듭니다.
+    draw_x, draw_y, draw_width, draw_height = compute_draw_rect(image.size, printable_size)
+    label = flatten_label(image).convert("L" if mode in ("1", "L") else mode)
+    if (draw_width, draw_height) != label.size:
+        # 확대할 때는 바코드 경계가 흐려지지 않도록 최근접 보간을 사용합니다.
+        shrinking = draw_width < label.size[0]
+        label = label.resize((draw_width, draw_height), Image.LANCZOS if shrinking else Image.NEAREST)
+    page = Image.new(label.mode, tuple(printable_size), "white")
+    page.paste(label, (draw_x, draw_y))
+    if mode == "1":
+        # 디더링 대신 임계값으로 변환해 바코드/글자 경계를 선명하게 유지합니다.
+        page = page.point(lambda v: 255 if v >= 128 else 0, "1")
+    return page
+
+def raster_size_bytes(image):
+    width, height = image.size
+    if image.mode == "1":
+        return (width + 7) // 8 * height
+    return width * height * len(image.getbands())
+
+class RasterCache:
+    # 파일 내용 해시 + 프린터 해상도를 키로 하는 LRU 캐시 (메모리 상한 있음)
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
 
-    def select_printer(self, var):
-        printers = self.get_printers()
-        if not printers:
-            messagebox.showinfo("프린터 없음", "시스템에 설치된 프린터가 없습니다.")
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def __contains__(self, key):
+        # 적중/실패 통계에 넣지 않고 있는지만 확인합니다.
+        with self._lock:
+            return key in self._items
+
+    def put(self, key, raster):
+        size = len(raster) if isinstance(raster, bytes) else raster_size_bytes(raster)
+        if size > self.max_bytes:
             return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._items[key] = (raster, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._items:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
 
-        win = tk.Toplevel(self)
-        win.title("프린터 선택")
-        win.geometry("350x300")
-        win.transient(self)
-        win.grab_set()
-
-        tk.Label(win, text="설치된 프린터를 선택하세요:", pady=5).pack()
-
-        list_frame = tk.Frame(win)
-        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
-
-        scrollbar = tk.Scrollbar(list_frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        listbox = tk.Listbox(list_frame, yscrollcommand=scrollbar.set)
-        listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        
-        scrollbar.config(command=listbox.yview)
-
-        for printer in printers:
-            listbox.insert(tk.END, printer)
-
-        def on_ok():
-            selected_indices = listbox.curselection()
-            if selected_indices:
-                selected_printer = listbox.get(selected_indices[0])
-                var.set(selected_printer)
-            win.destroy()
-        
-        def on_double_click(event):
-            on_ok()
-
-        listbox.bind("<Double-Button-1>", on_double_click)
-
-        ok_button = tk.Button(win, text="확인", command=on_ok, width=10)
-        ok_button.pack(pady=10)
-
-        current_printer = var.get()
-        if current_printer in printers:
-            idx = printers.index(current_printer)
-            listbox.selection_set(idx)
-            listbox.see(idx)
-
-        win.wait_window()
-
-    def save_settings(self):
-        global CONFIG
-        new_config = self.get_current_settings()
-        new_config["remnant_printer"] = self.remnant_printer_var.get()
-        new_config["remnant_base_folder"] = self.remnant_folder_var.get()
-        new_config["defective_printer"] = self.defective_printer_var.get()
-        new_config["defective_base_folder"] = self.defective_folder_var.get()
-        
-        try:
-            save_config(new_config)
-            CONFIG = load_config()
-            messagebox.showinfo("저장 완료", "설정이 성공적으로 저장되었습니다.\n감시자가 재시작됩니다.")
-            print("\n[설정 저장] 새로운 설정이 적용되었습니다. 감시자를 재시작합니다.")
-            self.restart_monitoring.set()
-        except Exception as e:
-            messagebox.showerror("저장 실패", f"설정 저장 중 오류가 발생했습니다:\n{e}")
-            print(f"[오류] 설정 저장 실패: {e}")
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
 
-    def create_test_label(self):
-        target_folder = self.remnant_folder_var.get()
-        if not target_folder or not os.path.isdir(target_folder):
-            messagebox.showwarning("폴더 오류", "잔량 라벨 감시 폴더가 올바르게 설정되지 않았습니다.\n설정 탭에서 폴더를 지정해주세요.")
+_raster_cache = None
+_raster_cache_lock = threading.Lock()
+
+def get_raster_cache():
+    global _raster_cache
+    with _raster_cache_lock:
+        if _raster_cache is None:
+            _raster_cache = RasterCache(int(float(CONFIG.get("raster_cache_mb", 64)) * 1024 * 1024))
+        return _raster_cache
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def raster_buffer_size(printable_size, mode):
+    # render_label_raster 결과의 tobytes() 크기 (공유 메모리를 미리 잡을 때 사용)
+    width, height = printable_size
+    if mode == "1":
+        return (width + 7) // 8 * height
+    return width * height * Image.getmodebands(mode)
+
+def render_raster_to_shared_memory(data, printable_size, mode, shm_name):
+    # (렌더링 프로세스에서 실행) PNG를 디코딩/렌더링하고, 인쇄 프로세스가 만들어 둔 공유 메모리에 래스터를 씁니다.
+    # 큰 래스터를 pickle로 복사해 돌려보내지 않습니다.
+    from multiprocessing import shared_memory
+    with Image.open(io.BytesIO(data)) as img:
+        img.load()
+        raster = render_label_raster(img, printable_size, mode)
+    payload = raster.tobytes()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        if len(payload) > shm.size:
+            raise ValueError(f"래스터 크기가 예상과 다릅니다. ({len(payload)} > {shm.size})")
+        shm.buf[:len(payload)] = payload
+    finally:
+        shm.close()
+    return raster.mode, raster.size
+
+class RenderPool:
+    # 고해상도 PNG의 디코딩/축소는 GIL 때문에 인쇄 스레드를 늘려도 한 코어만 씁니다.
+    # 대기열의 라벨을 인쇄 차례 전에 프로세스 풀에서 미리 그리고(prerender), 인쇄 스레드는 차례가 되면
+    # 결과를 공유 메모리에서 받아 보냅니다. 인쇄는 여전히 대기열 순서대로 진행됩니다.
+    # 공유 메모리는 인쇄 프로세스가 만들고 지웁니다. (Windows는 만든 쪽이 닫으면 사라지므로 렌더링 프로세스는 쓰기만 함)
+    def __init__(self, processes, lookahead=None, min_bytes=None):
+        from concurrent.futures import ProcessPoolExecutor
+        self.processes = max(1, int(processes))
+        self.lookahead = max(1, int(lookahead if lookahead is not None else CONFIG.get("render_lookahead", 4)))
+        self.min_bytes = int(float(min_bytes if min_bytes is not None else CONFIG.get("render_min_kb", 256)) * 1024)
+        if os.name != "nt":
+            # 렌더링 프로세스들이 공유 메모리 추적기(resource_tracker)를 따로 띄우지 않고 이 프로세스의 것을 쓰도록 먼저 시작합니다.
+            from multiprocessing import resource_tracker
+            resource_tracker.ensure_running()
+        self.executor = ProcessPoolExecutor(self.processes)
+        self.submitted = 0
+        self.used = 0
+        self.discarded = 0
+        self._pending = {}  # Future -> SharedMemory
+        self._lock = threading.Lock()
+
+    def prerender(self, job, backend):
+        # PrinterQueue 준비 단계에서 대기열 순서대로 호출됩니다. 캐시에 있거나 작은 라벨, 템플릿 라벨은 건너뜁니다.
+        from multiprocessing import shared_memory
+        self.release(job)  # 재시도: 지난 시도에서 쓰지 않은 래스터
+        backend = raw_print_backend(job.printer_name) or backend or get_print_backend()
+        mode = backend.raster_mode or CONFIG.get("raster_mode", "L")
+        if not mode or (job.label is not None and getattr(job.label, "data", None) is None):
             return
+        try:
+            if job.label is not None:
+                data = job.label.data
+            else:
+                with open(job.image_path, 'rb') as f:
+                    data = f.read()
+            printable_size = tuple(backend.get_printable_size(job.printer_name, job.devmode))
+        except Exception:
+            return  # 인쇄 스레드에서 다시 시도하고 오류를 기록합니다.
+        if len(data) < self.min_bytes:
+            return
+        key = (content_hash(data), printable_size, mode, backend.payload_format)
+        if key in get_raster_cache():
+            return
+        shm = shared_memory.SharedMemory(create=True, size=raster_buffer_size(printable_size, mode))
+        try:
+            future = self.executor.submit(render_raster_to_shared_memory, data, printable_size, mode, shm.name)
+        except Exception:
+            self._free(shm)
+            raise
+        with self._lock:
+            self.submitted += 1
+            self._pending[future] = shm
+        job.prerender = (key, future)
 
+    def take(self, job, printable_size, mode, payload_format):
+        # 미리 그린 래스터를 돌려줍니다: (캐시 키, 래스터). 예비 프린터로 바뀌어 크기가 다르거나 풀에 문제가 있으면 None
+        # (디코딩 오류는 인쇄 스레드에서 그린 것과 같은 예외로 올라갑니다)
+        from concurrent.futures import BrokenExecutor, CancelledError
+        key, future = job.prerender
+        if key[1:] != (printable_size, mode, payload_format):
+            self.release(job)
+            return None
+        job.prerender = None
+        with self._lock:
+            shm = self._pending.pop(future, None)
+        if shm is None:
+            return None  # 종료 중에 해제됨
         try:
-            today_str = date.today().strftime('%Y-%m-%d')
-            today_folder = os.path.join(target_folder, today_str)
-            os.makedirs(today_folder, exist_ok=True)
+            raster_mode, size = future.result()
+            raster = Image.frombytes(raster_mode, size, shm.buf)
+        except (BrokenExecutor, CancelledError) as e:
+            log.warning(f"경고: 렌더링 프로세스를 사용할 수 없어 인쇄 스레드에서 그립니다. ({e})")
+            return None
+        finally:
+            self._free(shm)
+        with self._lock:
+            self.used += 1
+        return key, raster
 
-            width, height = 400, 200
-            img = Image.new('RGB', (width, height), color = 'white')
-            d = ImageDraw.Draw(img)
+    def release(self, job):
+        # 인쇄하지 않고 버리는 작업의 미리 그린 래스터 해제
+        if job.prerender is None:
+            return
+        (_, future), job.prerender = job.prerender, None
+        with self._lock:
+            shm = self._pending.pop(future, None)
+            self.discarded += 1
+        if shm is not None:
+            future.cancel()
+            self._free(shm)
 
-            try:
-                font = ImageFont.truetype("malgun.ttf", 20)
-            except IOError:
-                font = ImageFont.load_default()
+    @staticmethod
+    def _free(shm):
+        # POSIX는 렌더링 프로세스가 아직 쓰는 중이어도 unlink 후 안전하게 해제됩니다.
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
 
-            text = "테스트 라벨입니다."
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            d.text((20,20), "--- 샘플 인쇄 ---", fill=(0,0,0), font=font)
-            d.text((20,60), text, fill=(0,0,0), font=font)
-            d.text((20,100), f"생성 시간: {timestamp}", fill=(0,0,0), font=font)
-            d.rectangle([(5,5), (width-5, height-5)], outline ="black", width=2)
+    def stats(self):
+        with self._lock:
+            return {"processes": self.processes, "lookahead": self.lookahead, "submitted": self.submitted, "used": self.used,
+                    "discarded": self.discarded, "pending": len(self._pending)}
 
-            filename = f"test_label_{int(time.time())}.png"
-            filepath = os.path.join(today_folder, filename)
-            img.save(filepath)
+    def shutdown(self):
+        with self._lock:
+            pending, self._pending = list(self._pending.items()), {}
+        for future, _ in pending:
+            future.cancel()
+        self.executor.shutdown(wait=True)
+        for _, shm in pending:
+            self._free(shm)
 
-            messagebox.showinfo("생성 완료", f"테스트 라벨이 생성되었습니다.\n경로: {filepath}\n\n잠시 후 설정된 프린터로 자동 인쇄됩니다.")
-            print(f"[테스트] 샘플 라벨 생성 완료: {filepath}")
+_render_pool = None
+_render_pool_lock = threading.Lock()
 
-        except Exception as e:
-            messagebox.showerror("생성 실패", f"테스트 라벨 생성 중 오류가 발생했습니다:\n{e}")
-            print(f"[오류] 테스트 라벨 생성 실패: {e}")
-
-
-    def add_log(self, message):
-        self.log_text.config(state='normal')
-        self.log_text.insert(tk.END, message)
-        self.log_text.see(tk.END)
-        self.log_text.config(state='disabled')
-    
-    def process_log_queue(self):
-        while not self.log_queue.empty():
-            message = self.log_queue.get_nowait()
-            self.add_log(message)
-        self.after(100, self.process_log_queue)
-
-    def redirect_stdout(self):
-        class StdoutRedirector:
-            def __init__(self, queue):
-                self.queue = queue
-            def write(self, str):
-                self.queue.put(str)
-            def flush(self):
-                pass
-        sys.stdout = StdoutRedirector(self.log_queue)
-        sys.stderr = StdoutRedirector(self.log_queue)
+def get_render_pool():
+    # render_processes가 0이면 None (인쇄 스레드에서 렌더링)
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None and int(CONFIG.get("render_processes", 0) or 0) > 0:
+            _render_pool = RenderPool(int(CONFIG["render_processes"]))
+        return _render_pool
 
-    def monitoring_loop(self):
-        print("--- 자동 라벨 출력 프로그램 시작 ---\n")
-        while self.is_running:
-            today = date.today()
-            if today != self.current_watch_date or self.restart_monitoring.is_set():
-                if self.observer and self.observer.is_alive():
-                    print(f"\n감시자를 재시작합니다. (사유: {'설정변경' if self.restart_monitoring.is_set() else '날짜변경'})")
-                    self.observer.stop()
-                    self.observer.join()
-                
-                self.restart_monitoring.clear()
-                self.observer = Observer()
-                self.current_watch_date = today
-                today_str = today.strftime('%Y-%m-%d')
-                
-                print(f"\n[{today_str}] 날짜의 폴더 감시를 설정합니다.")
-                remnant_base, remnant_printer = CONFIG.get("remnant_base_folder"), CONFIG.get("remnant_printer")
-                if remnant_base and remnant_printer and os.path.isdir(remnant_base):
-                    remnant_path_today = os.path.join(remnant_base, today_str)
-                    os.makedirs(remnant_path_today, exist_ok=True)
-                    print(f" - 잔량 폴더 감시 중: {remnant_path_today} -> [{remnant_printer}]")
-                    self.observer.schedule(LabelPrintHandler(remnant_printer, lambda: self.remnant_devmode), remnant_path_today, recursive=False)
-                else:
-                    print(f" - 잔량 폴더 설정이 올바르지 않아 감시를 시작할 수 없습니다.")
-
-                defective_base, defective_printer = CONFIG.get("defective_base_folder"), CONFIG.get("defective_printer")
-                if defective_base and defective_printer and os.path.isdir(defective_base):
-                    defective_path_today = os.path.join(defective_base, today_str)
-                    os.makedirs(defective_path_today, exist_ok=True)
-                    print(f" - 불량 폴더 감시 중: {defective_path_today} -> [{defective_printer}]")
-                    self.observer.schedule(LabelPrintHandler(defective_printer, lambda: self.defective_devmode), defective_path_today, recursive=False)
-                else:
-                    print(f" - 불량 폴더 설정이 올바르지 않아 감시를 시작할 수 없습니다.")
+def shutdown_render_pool():
+    global _render_pool
+    with _render_pool_lock:
+        pool, _render_pool = _render_pool, None
+    if pool is not None:
+        pool.shutdown()
 
-                if self.observer.emitters:
-                    self.observer.start()
-                    self.status_var.set(f"모니터링 중... (감시 날짜: {today_str})")
-                    print("모니터링 시작...\n")
-                else:
-                    self.status_var.set("오류: 감시할 폴더가 설정되지 않았습니다.")
-                    print("\n감시할 폴더가 설정되지 않았습니다. '인쇄 설정' 탭에서 설정을 확인해주세요.")
-            
-            for _ in range(60):
-                if not self.is_running or self.restart_monitoring.is_set():
-                    break
-                time.sleep(1)
+def load_label_raster(image_path, printer_name, devmode, backend, cache=None, job=None):
+    # 라벨 파일을 읽어 프린터용 래스터를 돌려줍니다. 같은 내용의 라벨은 캐시된 래스터를 재사용합니다.
+    # 템플릿 라벨(job.label)은 파일 대신 템플릿과 필드 값으로 그리고, 같은 값의 라벨은 역시 캐시를 사용합니다.
+    # 렌더링 프로세스가 미리 그려 둔 래스터(job.prerender)가 있으면 파일을 다시 읽지 않고 그것을 씁니다.
+    label = job.label if job is not None else None
+    mode = backend.raster_mode or CONFIG.get("raster_mode", "L")
+    pool = get_render_pool() if job is not None and job.prerender is not None else None
+    if mode and pool is not None:
+        printable_size = tuple(backend.get_printable_size(printer_name, devmode))
+        taken = pool.take(job, printable_size, mode, backend.payload_format)
+        if taken is not None:
+            job.mark("decoded")
+            key, raster = taken
+            raster = backend.encode(raster)
+            (cache or get_raster_cache()).put(key, raster)
+            return raster
+    if label is None:
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        source_key = content_hash(data)
+        open_label = lambda: Image.open(io.BytesIO(data))
+    else:
+        source_key, open_label = label.key, label.render
+    if not mode:
+        img = open_label()
+        img.load()
+        if job:
+            job.mark("decoded")
+        return img
+    cache = cache or get_raster_cache()
+    printable_size = tuple(backend.get_printable_size(printer_name, devmode))
+    key = (source_key, printable_size, mode, backend.payload_format)
+    raster = cache.get(key)
+    if raster is None:
+        with open_label() as img:
+            img.load()
+            if job:
+                job.mark("decoded")
+            raster = backend.encode(render_label_raster(img, printable_size, mode))
+        cache.put(key, raster)
+    elif job:
+        # 캐시 적중: 디코딩/렌더링 없이 파일 읽기만 했습니다.
+        job.mark("decoded")
+    return raster
 
-    def setup_tray_icon(self):
-        try:
-            logo_path = resource_path('assets/logo.png')
-            image = Image.open(logo_path)
-        except Exception as e:
-            print(f"트레이 아이콘 로고 로드 실패: {e}")
-            image = Image.new('RGB', (64, 64), 'blue')
-        menu = (pystray.MenuItem('열기', self.show_window, default=True),
-                pystray.MenuItem('종료', self.on_closing))
-        self.tray_icon = pystray.Icon("name", image, "라벨 자동 출력기", menu)
-        threading.Thread(target=self.tray_icon.run, daemon=True).start()
-
-    def show_window(self):
-        self.deiconify()
-        self.lift()
-        self.focus_force()
-
-    def on_closing(self):
-        if messagebox.askyesno("종료 확인", "프로그램을 종료하시겠습니까?"):
-            self.quit_app()
-
-    def quit_app(self):
-        print("프로그램 종료 중...")
-        self.is_running = False
-        if self.observer and self.observer.is_alive():
-            self.observer.stop()
-            self.observer.join()
-        self.tray_icon.stop()
-        self.destroy()
+# 인쇄 오류 종류 (재시도 정책 retry_policies의 키)
+LABEL_READ_ERRORS = (OSError, SyntaxError, Image.DecompressionBombError)
 
-if __name__ == "__main__":
-    app = App()
-    app.mainloop()
\ No newline at end of file
+def set_job_error(job, error_class, error):
+    if job is not None:
+        job.error = (error_class, str(error))
+
+def classify_print_error(error, backend):
+    if isinstance(error, backend.errors):
+        return "printer"
+    if isinstance(error, FileNotFoundError):
+        return "missing"
+    if isinstance(error, LABEL_READ_ERRORS):
+        return "read"
+    return "unexpected"
+
+def print_label(image_path: str, printer_name: str, devmode=None, backend=None, job=None):
+    backend = raw_print_backend(printer_name) or backend or get_print_backend()
+    if not backend.available():
+        log.error("오류: pywin32 모듈이 없어 인쇄할 수 없습니다.")
+        set_job_error(job, "printer", "pywin32 모듈 없음")
+        return False
+    if (job is None or job.label is None) and not os.path.exists(image_path):
+        log.error(f"인쇄 실패: 파일 '{image_path}'를 찾을 수 없습니다.")
+        set_job_error(job, "missing", "파일을 찾을 수 없음")
+        return False
+
+    try:
+        log.info(f"인쇄 시도: '{os.path.basename(image_path)}' -> '{printer_name}'")
+        raster = load_label_raster(image_path, printer_name, devmode, backend, job=job)
+        if job:
+            job.mark("rendered")
+        backend.submit(raster, printer_name, devmode, doc_name=image_path,
+                       on_acquired=functools.partial(job.mark, "dc_acquired") if job else None)
+        log.info("성공: 인쇄 명령을 전송했습니다.")
+        return True
+
+    except backend.errors as e:
+        log.error(f"오류: 인쇄 중 오류가 발생했습니다. 프린터('{printer_name}') 설정을 확인해주세요.\n{e}")
+        set_job_error(job, "printer", e)
+    except LABEL_READ_ERRORS as e:
+        log.error(f"인쇄 실패: '{os.path.basename(image_path)}' 이미지를 열 수 없습니다.\n{e}")
+        set_job_error(job, classify_print_error(e, backend), e)
+    except Exception as e:
+        log.error(f"오류: 예기치 않은 인쇄 오류가 발생했습니다.\n{e}")
+        set_job_error(job, "unexpected", e)
+    return False
+
+def print_label_batch(image_paths, printer_name: str, devmode=None, backend=None, jobs=None):
+    # 여러 라벨을 하나의 인쇄 문서로 묶어 보냅니다. 반환값은 라벨별 성공 여부 목록입니다.
+    backend = raw_print_backend(printer_name) or backend or get_print_backend()
+    results = [False] * len(image_paths)
+    job_at = (lambda i: jobs[i]) if jobs else (lambda i: None)
+    if not backend.available():
+        log.error("오류: pywin32 모듈이 없어 인쇄할 수 없습니다.")
+        for i in range(len(image_paths)):
+            set_job_error(job_at(i), "printer", "pywin32 모듈 없음")
+        return results
+
+    images, indexes = [], []
+    for i, image_path in enumerate(image_paths):
+        if (job_at(i) is None or job_at(i).label is None) and not os.path.exists(image_path):
+            log.error(f"인쇄 실패: 파일 '{image_path}'를 찾을 수 없습니다.")
+            set_job_error(job_at(i), "missing", "파일을 찾을 수 없음")
+            continue
+        try:
+            raster = load_label_raster(image_path, printer_name, devmode, backend, job=job_at(i))
+        except backend.errors as e:
+            log.error(f"오류: 인쇄 중 오류가 발생했습니다. 프린터('{printer_name}') 설정을 확인해주세요.\n{e}")
+            for j in range(len(image_paths)):
+                if not results[j]:
+                    set_job_error(job_at(j), "printer", e)
+            return results
+        except Exception as e:
+            log.error(f"인쇄 실패: '{os.path.basename(image_path)}' 이미지를 열 수 없습니다.\n{e}")
+            set_job_error(job_at(i), classify_print_error(e, backend), e)
+            continue
+        if jobs:
+            jobs[i].mark("rendered")
+        images.append((raster, image_path))
+        indexes.append(i)
+
+    if not images:
+        return results
+    log.info(f"묶음 인쇄 시도: {len(images)}건 -> '{printer_name}'")
+
+    def on_acquired():
+        for i in indexes:
+            jobs[i].mark("dc_acquired")
+
+    try:
+        errors = backend.submit_batch(images, printer_name, devmode, on_acquired=on_acquired if jobs else None)
+    except Exception as e:
+        errors = [e] * len(images)
+    for i, (_, image_path), error in zip(indexes, images, errors):
+        if error is None:
+            results[i] = True
+            log.info(f"성공: '{os.path.basename(image_path)}' 인쇄 명령을 전송했습니다.")
+        elif isinstance(error, backend.errors):
+            log.error(f"오류: '{os.path.basename(image_path)}' 인쇄 중 오류가 발생했습니다. 프린터('{printer_name}') 설정을 확인해주세요.\n{error}")
+            set_job_error(job_at(i), "printer", error)
+        else:
+            log.error(f"오류: '{os.path.basename(image_path)}' 예기치 않은 인쇄 오류가 발생했습니다.\n{error}")
+            set_job_error(job_at(i), classify_print_error(error, backend), error)
+    return results
+
+# 라벨 템플릿: MES가 PNG 대신 작은 .json/.csv 데이터 파일만 쓰면 이 PC에서 라벨을 그립니다.
+class TemplateError(ValueError):
+    pass
+
+@functools.lru_cache(maxsize=64)
+def load_template_font(name, size):
+    try:
+        return ImageFont.truetype(name, size)
+    except OSError:
+        log.warning(f"경고: 글꼴 '{name}'을 찾을 수 없어 기본 글꼴을 사용합니다.")
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        return ImageFont.load_default()  # Pillow 10.1 이전
+
+@functools.lru_cache(maxsize=32)
+def load_template_image(path):
+    with Image.open(path) as img:
+        return flatten_label(img).convert("L")
+
+def template_field_names(element):
+    # 요소의 문자열 값에 들어 있는 자리표시자({필드}) 이름들
+    names = set()
+    for value in element.values():
+        if isinstance(value, str):
+            try:
+                names.update(name for _, name, _, _ in string.Formatter().parse(value) if name)
+            except ValueError as e:
+                raise TemplateError(f"자리표시자 형식 오류: {value!r} ({e})") from e
+    return names
+
+class LabelTemplate:
+    # 템플릿 파일(<template_folder>/<이름>.json) 예:
+    #   {"size": [400, 200], "background": "white",
+    #    "elements": [{"type": "rect", "box": [5, 5, 395, 195], "width": 2},
+    #                 {"type": "image", "path": "logo.png", "xy": [300, 10], "size": [80, 40]},
+    #                 {"type": "text", "xy": [20, 20], "text": "품번: {part_no}", "font": "malgun.ttf", "size": 20},
+    #                 {"type": "line", "points": [10, 60, 390, 60], "width": 1}]}
+    # 자리표시자가 없는 요소(테두리, 고정 문구, 로고)는 정적 레이어에 한 번만 그려 두고, 라벨마다 값이 바뀌는 요소만 그립니다.
+    ELEMENT_TYPES = ("text", "rect", "line", "image")
+
+    def __init__(self, name, spec, base_dir, version=0):
+        self.name = name
+        self.version = version
+        self.base_dir = base_dir
+        size = spec.get("size") if isinstance(spec, dict) else None
+        if not (isinstance(size, list) and len(size) == 2 and all(isinstance(v, int) and v > 0 for v in size)):
+            raise TemplateError(f"템플릿 '{name}'의 size가 올바르지 않습니다: {size!r}")
+        self.size = tuple(size)
+        self.fields = set()
+        self.static_elements, self.variable_elements = [], []
+        for element in spec.get("elements", []):
+            if not isinstance(element, dict) or element.get("type") not in self.ELEMENT_TYPES:
+                raise TemplateError(f"템플릿 '{name}'에 알 수 없는 요소가 있습니다: {element!r}")
+            names = template_field_names(element)
+            (self.variable_elements if names else self.static_elements).append(element)
+            self.fields |= names
+        try:
+            self.static_layer = self._background(spec.get("background", "white"))
+            draw = ImageDraw.Draw(self.static_layer)
+            for element in self.static_elements:
+                self.draw_element(self.static_layer, draw, element, None)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise TemplateError(f"템플릿 '{name}'을 그릴 수 없습니다: {e}") from e
+
+    def resolve(self, path):
+        # 템플릿 폴더 기준 상대 경로 (없으면 그대로: 시스템 글꼴 이름 등)
+        candidate = os.path.join(self.base_dir, path)
+        return candidate if os.path.exists(candidate) else path
+
+    def _background(self, background):
+        if isinstance(background, str) and background.lower().endswith((".png", ".bmp", ".jpg", ".jpeg")):
+            image = load_template_image(self.resolve(background))
+            return image.resize(self.size) if image.size != self.size else image.copy()
+        return Image.new("L", self.size, background)
+
+    def draw_element(self, image, draw, element, fields):
+        def value(key, default=None):
+            v = element.get(key, default)
+            return v.format_map(fields) if fields is not None and isinstance(v, str) else v
+
+        kind = element["type"]
+        if kind == "text":
+            font = load_template_font(self.resolve(element.get("font") or CONFIG.get("template_default_font") or "malgun.ttf"),
+                                      int(element.get("size", 20)))
+            draw.text(tuple(element["xy"]), value("text", ""), fill=element.get("fill", "black"), font=font, anchor=element.get("anchor"))
+        elif kind == "rect":
+            draw.rectangle(element["box"], outline=element.get("outline", "black"), fill=element.get("fill"), width=int(element.get("width", 1)))
+        elif kind == "line":
+            draw.line(element["points"], fill=element.get("fill", "black"), width=int(element.get("width", 1)))
+        elif kind == "image":
+            picture = load_template_image(self.resolve(value("path")))
+            if element.get("size"):
+                picture = picture.resize(tuple(element["size"]))
+            image.paste(picture, tuple(element["xy"]))
+
+    def label(self, fields):
+        missing = self.fields - fields.keys()
+        if missing:
+            raise TemplateError(f"템플릿 '{self.name}'에 필요한 값이 없습니다: {', '.join(sorted(missing))}")
+        return TemplateLabel(self, fields)
+
+    def render(self, fields):
+        image = self.static_layer.copy()
+        draw = ImageDraw.Draw(image)
+        for element in self.variable_elements:
+            self.draw_element(image, draw, element, fields)
+        return image
+
+class TemplateLabel:
+    # 인쇄 작업에 실려 가는 템플릿 라벨. 그리기는 인쇄 작업자에서 하며(render), key는 래스터 캐시 키로 사용됩니다.
+    def __init__(self, template, fields):
+        self.template = template
+        self.fields = fields
+        self.key = content_hash(json.dumps([template.name, template.version, fields], sort_keys=True, ensure_ascii=False).encode("utf-8"))
+
+    def render(self):
+        return self.template.render(self.fields)
+
+class ImageLabel:
+    # 파일 없이 메모리로 받은 라벨 이미지 (수신 API). 파일과 같은 내용 해시를 캐시 키로 사용합니다.
+    def __init__(self, data):
+        self.data = data
+        self.key = content_hash(data)
+
+    def render(self):
+        return Image.open(io.BytesIO(self.data))
+
+class TemplateStore:
+    # 템플릿을 이름으로 읽어 두고, 파일이 바뀌면(수정 시각) 다시 읽습니다.
+    def __init__(self, folder=None):
+        self.folder = folder or CONFIG.get("template_folder") or "label_templates"
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        if not name or os.path.basename(name) != name:
+            raise TemplateError(f"템플릿 이름이 올바르지 않습니다: {name!r}")
+        path = os.path.join(self.folder, name + ".json")
+        try:
+            version = os.stat(path).st_mtime_ns
+        except OSError:
+            raise TemplateError(f"템플릿 '{name}'을 찾을 수 없습니다: {path}") from None
+        with self._lock:
+            template = self._templates.get(name)
+            if template is not None and template.version == version:
+                return template
+        try:
+            with open(path, 'r', encoding='utf-8-sig') as f:
+                spec = json.load(f)
+        except (OSError, ValueError) as e:
+            raise TemplateError(f"템플릿 '{name}'을 읽을 수 없습니다: {e}") from e
+        template = LabelTemplate(name, spec, os.path.dirname(os.path.abspath(path)), version)
+        with self._lock:
+            self._templates[name] = template
+        log.info(f"라벨 템플릿을 읽었습니다: {name} (값 {len(template.fields)}개, 정적 요소 {len(template.static_elements)}개)")
+        return template
+
+def data_record(row, record, default_template):
+    # 데이터 한 건 -> (행 번호, 템플릿 이름, 필드 값, 매수). fields 가 없으면 template/copies 외의 모든 값을 필드로 씁니다.
+    fields = record.get("fields")
+    if not isinstance(fields, dict):
+        fields = {key: value for key, value in record.items() if key not in ("template", "copies") and key is not None}
+    try:
+        copies = int(record.get("copies") or 1)
+    except (TypeError, ValueError):
+        raise ValueError(f"{row}번째 데이터의 copies 값이 올바르지 않습니다: {record.get('copies')!r}") from None
+    return row, record.get("template") or default_template, {str(k): "" if v is None else str(v) for k, v in fields.items()}, max(1, copies)
+
+def iter_data_file(path, default_template=""):
+    # .csv: 첫 줄이 필드 이름 (template, copies 열은 선택). 큰 파일도 한 줄씩 읽습니다.
+    # .json: {"template": ..., "fields": {...}} 한 건, {"template": ..., "labels": [{...}, ...]} 또는 [{...}, ...]
+    encoding = CONFIG.get("data_file_encoding") or "utf-8-sig"
+    if path.lower().endswith(".csv"):
+        with open(path, 'r', newline='', encoding=encoding) as f:
+            for row, record in enumerate(csv.DictReader(f), 1):
+                yield data_record(row, record, default_template)
+        return
+    with open(path, 'r', encoding=encoding) as f:
+        document = json.load(f)
+    if isinstance(document, dict):
+        default_template = document.get("template") or default_template
+        records = document["labels"] if isinstance(document.get("labels"), list) else [document]
+    elif isinstance(document, list):
+        records = document
+    else:
+        raise ValueError("JSON 데이터는 객체나 목록이어야 합니다.")
+    for row, record in enumerate(records, 1):
+        if not isinstance(record, dict):
+            raise ValueError(f"{row}번째 데이터가 객체가 아닙니다: {record!r}")
+        yield data_record(row, record, default_template)
+
+
+# #####################################################################
+# 4. 인쇄 작업 스케줄러 (프린터별 제한된 대기열 + 작업자 스레드)
+# #####################################################################
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+class PrintJob:
+    # 라벨 하나가 거치는 단계. detected(감시 이벤트) -> ready(쓰기 완료) -> queued -> started(작업자 시작)
+    # -> decoded(PNG 디코딩) -> rendered(래스터) -> dc_acquired(프린터 DC 획득) -> spooled(EndDoc 반환) 또는 failed
+    # 재시도하는 작업은 retrying 후 다시 started부터 기록됩니다. (단계 시각은 마지막 시도 기준)
+    STAGE_ORDER = ("detected", "ready", "queued", "started", "decoded", "rendered", "dc_acquired", "spooled", "failed")
+
+    def __init__(self, image_path, printer_name, devmode=None, channel=None, stages=None, backup_printer=None, label=None):
+        self.image_path = image_path
+        self.label = label  # TemplateLabel/ImageLabel (파일 없이 그리는 라벨이면 image_path는 표시용 이름)
+        self.printer_name = printer_name
+        self.backup_printer = backup_printer
+        self.printed_on = None
+        self.attempts = 0
+        self.error = None  # (오류 종류, 메시지) - 마지막 시도의 실패 원인
+        self.prerender = None  # (캐시 키, Future) - 렌더링 프로세스에서 미리 그리는 중인 래스터
+        self.devmode = devmode
+        self.channel = channel or printer_name
+        self.enqueued_at = time.perf_counter()
+        self.started_at = None
+        self.finished_at = None
+        self.success = None
+        self.stages = dict(stages or {})
+        self.listeners = ()
+        self.state = "created"  # 마지막으로 도달한 단계 (수신 API의 작업 상태)
+        self.done = threading.Event()  # spooled/failed/rejected 중 하나에 도달하면 설정
+
+    def mark(self, stage):
+        # 단계(queued/started/rendered/spooled/failed 등)에 도달한 시각을 기록하고 리스너(저널 등)에 알립니다.
+        self.stages[stage] = time.perf_counter()
+        self.state = stage
+        for listener in self.listeners:
+            try:
+                listener(self, stage)
+            except Exception as e:
+                log.error(f"오류: 인쇄 작업 기록 중 예외가 발생했습니다. ({stage})\n{e}")
+        if stage in ("spooled", "failed", "rejected"):
+            self.done.set()
+
+    @property
+    def latency(self):
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.enqueued_at
+
+    @property
+    def end_to_end(self):
+        # 감시 이벤트(없으면 대기열 등록)부터 스풀러 전송 완료까지 걸린 시간
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.stages.get("detected", self.enqueued_at)
+
+    def stage_durations(self):
+        # [(단계, 직전 단계부터 걸린 시간), ...] - 기록되지 않은 단계는 건너뜁니다.
+        durations = []
+        previous = None
+        for stage in self.STAGE_ORDER:
+            at = self.stages.get(stage)
+            if at is None:
+                continue
+            if previous is not None:
+                durations.append((stage, max(0.0, at - previous)))
+            previous = at
+        return durations
+
+class LatencyHistogram:
+    # Prometheus histogram 형식의 누적 버킷 + p50/p95/p99 계산용 최근 표본
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+    SAMPLES = 2000
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=self.SAMPLES)
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.samples.append(seconds)
+
+    def percentiles(self):
+        samples = list(self.samples)
+        return {"count": self.count, "p50": percentile(samples, 50), "p95": percentile(samples, 95), "p99": percentile(samples, 99)}
+
+    def snapshot(self):
+        buckets, total = [], 0
+        for bound, count in zip(self.BUCKETS + (float("inf"),), self.counts):
+            total += count
+            buckets.append((bound, total))
+        return {"buckets": buckets, "sum": self.sum, "count": self.count, **self.percentiles()}
+
+class ChannelStats:
+    # 채널(감시 폴더)별 처리량/지연 통계. 여러 채널이 한 프린터 대기열을 함께 쓸 수 있어 따로 집계합니다.
+    def __init__(self, channel):
+        self.channel = channel
+        self.queued = 0
+        self.spooled = 0
+        self.failed = 0
+        self.rejected = 0
+        self.deduplicated = 0
+        self.retries = 0
+        self.first_queued_at = None
+        self.last_finished_at = None
+        self.latency = LatencyHistogram()
+        self.end_to_end = LatencyHistogram()
+        self.stage_latency = {}
+
+    def on_stage(self, job, stage):
+        if stage == "queued":
+            self.queued += 1
+            if self.first_queued_at is None:
+                self.first_queued_at = job.enqueued_at
+        elif stage == "rejected":
+            self.rejected += 1
+        elif stage == "retrying":
+            self.retries += 1
+        elif stage in ("spooled", "failed"):
+            if stage == "spooled":
+                self.spooled += 1
+            else:
+                self.failed += 1
+            self.last_finished_at = job.finished_at
+            if job.latency is not None:
+                self.latency.observe(job.latency)
+                self.end_to_end.observe(job.end_to_end)
+            for name, seconds in job.stage_durations():
+                histogram = self.stage_latency.get(name)
+                if histogram is None:
+                    histogram = self.stage_latency[name] = LatencyHistogram()
+                histogram.observe(seconds)
+
+    def histograms(self):
+        return {
+            "end_to_end": self.end_to_end.snapshot(),
+            "stages": {name: self.stage_latency[name].snapshot() for name in PrintJob.STAGE_ORDER if name in self.stage_latency},
+        }
+
+    def stats(self):
+        latency = self.latency.percentiles()
+        end_to_end = self.end_to_end.percentiles()
+        done = self.spooled + self.failed
+        elapsed = (self.last_finished_at - self.first_queued_at) if done and self.first_queued_at is not None and self.last_finished_at else 0.0
+        return {
+            "channel": self.channel,
+            "queued": self.queued,
+            "spooled": self.spooled,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "deduplicated": self.deduplicated,
+            "retries": self.retries,
+            "pending": self.queued - done - self.rejected,
+            "jobs_per_sec": done / elapsed if elapsed > 0 else 0.0,
+            "latency_p50": latency["p50"],
+            "latency_p95": latency["p95"],
+            "latency_p99": latency["p99"],
+            "end_to_end_p50": end_to_end["p50"],
+            "end_to_end_p95": end_to_end["p95"],
+            "end_to_end_p99": end_to_end["p99"],
+            "stages": {name: self.stage_latency[name].percentiles() for name in PrintJob.STAGE_ORDER if name in self.stage_latency},
+        }
+
+def retry_policy(error_class):
+    # config.json에 일부 항목만 적어도 나머지는 기본 정책 값을 사용합니다.
+    defaults = DEFAULT_CONFIG["retry_policies"]
+    policy = dict(defaults.get(error_class, defaults["unexpected"]))
+    configured = CONFIG.get("retry_policies", {}).get(error_class)
+    if isinstance(configured, dict):
+        policy.update(configured)
+    return policy
+
+def retry_delay(policy, attempt):
+    # attempt번째 실패 후 기다릴 시간: 2배씩 늘어나는 대기 시간에 ±50% 무작위 값 (여러 라벨이 한꺼번에 재시도하지 않도록)
+    delay = min(float(policy["max_seconds"]), float(policy["base_seconds"]) * (2 ** max(0, attempt - 1)))
+    return delay * random.uniform(0.5, 1.5)
+
+class RetryTimer:
+    # 정해진 시각에 콜백을 실행하는 스레드 하나. 재시도를 기다리는 동안 인쇄 작업자가 막히지 않습니다.
+    def __init__(self):
+        self._heap = []
+        self._sequence = 0
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = None
+
+    def schedule(self, delay, callback):
+        with self._cond:
+            if not self._running:
+                return False
+            self._sequence += 1
+            heapq.heappush(self._heap, (time.monotonic() + delay, self._sequence, callback))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="print-retry", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return True
+
+    def pending(self):
+        with self._cond:
+            return len(self._heap)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._heap.clear()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    self._cond.wait(None if not self._heap else max(0.0, self._heap[0][0] - time.monotonic()))
+                if not self._running:
+                    return
+                _, _, callback = heapq.heappop(self._heap)
+            try:
+                callback()
+            except Exception as e:
+                log.error(f"오류: 인쇄 재시도 중 예외가 발생했습니다.\n{e}")
+
+class PrinterQueue:
+    # 한 프린터에 대한 제한된 대기열과 작업자 스레드 묶음.
+    # 대기열이 가득 차면 put()이 기다리므로 넣는 쪽(데이터 파일/수신 API 스레드)에 역압(backpressure)이 걸립니다.
+    # 여러 프린터가 함께 쓰는 파일 감시 스레드나 멈춘 프린터의 라벨은 기다리지 않고 overflow에 보관했다가
+    # 대기열에 자리가 나면 순서대로 옮깁니다. (overflow도 가득 차면 rejected)
+    LATENCY_SAMPLES = 2000
+    STOP = object()
+
+    FAILOVER_ATTEMPTS = 3
+
+    def __init__(self, printer_name, print_func, maxsize, workers, batch_func=None, batch_window=0.0, batch_max=1, monitor=None,
+                 on_failure=None, render_pool=None, backend=None):
+        self.printer_name = printer_name
+        self.print_func = print_func
+        self.monitor = monitor
+        self.on_failure = on_failure  # on_failure(job) -> True면 재시도 예약됨 (failed로 기록하지 않음)
+        self.paused = False
+        self._stopping = False
+        self.batch_func = batch_func
+        self.batch_window = batch_window
+        self.batch_max = batch_max
+        self.jobs = Queue(maxsize=max(1, maxsize))
+        self.overflow = deque()
+        self.overflow_max = max(1, maxsize)
+        # render_pool: 대기열에서 꺼낸 순서대로 렌더링 프로세스에 미리 맡기고 ready 대기열(lookahead개)로 넘긴 뒤 인쇄합니다.
+        self.render_pool = render_pool
+        self.backend = backend
+        self.ready = Queue(maxsize=render_pool.lookahead) if render_pool is not None else self.jobs
+        self.batches = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.first_enqueued_at = None
+        self.last_finished_at = None
+        self.latencies = deque(maxlen=self.LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+        self._threads = []
+        for i in range(max(1, workers)):
+            t = threading.Thread(target=self._worker, name=f"print-{printer_name}-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        if render_pool is not None:
+            threading.Thread(target=self._prerender_ahead, name=f"prerender-{printer_name}", daemon=True).start()
+
+    def put(self, job, timeout=None, park=False):
+        # park: 대기열이 가득 차도 기다리지 않고 overflow에 보관합니다.
+        # 이미 보관 중인 라벨이 있으면 순서가 바뀌지 않도록 새 라벨도 뒤에 보관합니다.
+        with self._lock:
+            parking = park or bool(self.overflow)
+            if parking and (self.overflow or not self._put_nowait(job)):
+                if len(self.overflow) >= self.overflow_max:
+                    self.rejected += 1
+                    return False
+                if not self.overflow:
+                    log.warning(f"경고: '{self.printer_name}' 인쇄 대기열이 가득 차 라벨을 대기 목록에 보관합니다. "
+                                f"(자리가 나면 순서대로 인쇄)")
+                self.overflow.append(job)
+        if not parking:
+            try:
+                self.jobs.put(job, timeout=timeout)
+            except Full:
+                with self._lock:
+                    self.rejected += 1
+                return False
+        with self._lock:
+            self.submitted += 1
+            if self.first_enqueued_at is None:
+                self.first_enqueued_at = job.enqueued_at
+        return True
+
+    def _put_nowait(self, job):
+        try:
+            self.jobs.put_nowait(job)
+        except Full:
+            return False
+        return True
+
+    def _refill(self):
+        # 대기열에서 작업을 꺼낼 때마다 호출: 자리가 난 만큼 overflow의 라벨을 옮깁니다.
+        with self._lock:
+            while self.overflow and self._put_nowait(self.overflow[0]):
+                self.overflow.popleft()
+
+    def _get(self, source, timeout=None):
+        job = source.get(timeout=timeout)
+        if source is self.jobs:
+            self._refill()
+        return job
+
+    def depth(self):
+        return self.jobs.qsize() + len(self.overflow) + (self.ready.qsize() if self.ready is not self.jobs else 0)
+
+    def _batching(self):
+        return self.batch_func is not None and self.batch_window > 0 and self.batch_max > 1
+
+    def _collect_batch(self, first):
+        # 첫 작업 이후 batch_window 안에 들어온 작업을 batch_max개까지 모읍니다.
+        # DEVMODE가 다른 작업은 같은 문서에 넣을 수 없으므로 다음 묶음으로 넘깁니다.
+        batch = [first]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.batch_max:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                job = self._get(self.ready, timeout=remaining)
+            except Empty:
+                break
+            if job is self.STOP or job.devmode is not first.devmode:
+                return batch, job
+            batch.append(job)
+        return batch, None
+
+    def _route(self, batch):
+        # 인쇄할 프린터를 고릅니다. 프린터가 정상이 아니면 예비 프린터로 보내고, 예비 프린터도 없으면
+        # 정상이 될 때까지 이 대기열을 멈춥니다. (라벨을 버리지 않음) 종료 중이면 None
+        if self.monitor is None:
+            return self.printer_name
+        while not self._stopping:
+            if self.monitor.is_healthy(self.printer_name):
+                break
+            backup = batch[0].backup_printer
+            if backup and backup != self.printer_name and self.monitor.is_healthy(backup):
+                return backup
+            if not self.paused:
+                self.paused = True
+                status = self.monitor.status(self.printer_name)
+                log.warning(f"경고: '{self.printer_name}' 프린터가 복구될 때까지 인쇄를 멈춥니다. ({status.reason if status else ''})")
+            self.monitor.wait_for_change(1.0)
+        if self.paused:
+            self.paused = False
+            log.info(f"'{self.printer_name}' 인쇄를 다시 시작합니다.")
+        return None if self._stopping else self.printer_name
+
+    def _print(self, batch, printer_name):
+        # 예비 프린터에는 원래 프린터용 DEVMODE를 쓰지 않고 예비 프린터의 기본 설정을 사용합니다.
+        devmode = batch[0].devmode if printer_name == self.printer_name else None
+        try:
+            if len(batch) == 1:
+                job = batch[0]
+                return [self.print_func(job.image_path, printer_name, devmode, job=job)]
+            return self.batch_func([job.image_path for job in batch], printer_name, devmode, jobs=batch)
+        except Exception as e:
+            names = ", ".join(os.path.basename(job.image_path) for job in batch)
+            log.error(f"오류: 인쇄 작업 처리 중 예외가 발생했습니다. ({names})\n{e}")
+            for job in batch:
+                set_job_error(job, "unexpected", e)
+            return [False] * len(batch)
+
+    def _run(self, batch):
+        started_at = time.perf_counter()
+        for job in batch:
+            job.started_at = started_at
+            job.attempts += 1
+            job.error = None
+            job.mark("started")
+        outcome = {}
+        pending = batch
+        for _ in range(self.FAILOVER_ATTEMPTS):
+            printer_name = self._route(pending)
+            if printer_name is None:
+                # 종료 중: 인쇄하지 못한 라벨은 저널에 남아 있어 다음 실행 때 다시 인쇄됩니다.
+                return
+            if printer_name != self.printer_name:
+                log.info(f"예비 프린터로 인쇄: '{self.printer_name}' -> '{printer_name}' ({len(pending)}건)")
+            for job, ok in zip(pending, self._print(pending, printer_name)):
+                job.printed_on = printer_name
+                outcome[id(job)] = ok
+            failed = [job for job in pending if not outcome[id(job)]]
+            if not failed or self.monitor is None or self.monitor.check(printer_name):
+                break
+            # 인쇄 중 프린터에 이상이 생긴 경우: 실패한 라벨만 복구/예비 프린터 전환 후 다시 보냅니다.
+            log.warning(f"경고: '{printer_name}' 프린터 이상으로 인쇄하지 못한 라벨 {len(failed)}건을 다시 보냅니다.")
+            pending = failed
+        results = [outcome.get(id(job), False) for job in batch]
+        finished_at = time.perf_counter()
+        with self._lock:
+            if len(batch) > 1:
+                self.batches += 1
+            for job, ok in zip(batch, results):
+                job.success = bool(ok)
+                job.finished_at = finished_at
+                if job.success:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self.latencies.append(job.latency)
+            self.last_finished_at = finished_at
+        for job in batch:
+            if self.render_pool is not None:
+                self.render_pool.release(job)  # 파일이 없어 그리지 않은 경우 등
+            if not job.success and self.on_failure is not None and self.on_failure(job):
+                continue
+            job.mark("spooled" if job.success else "failed")
+
+    def _prerender_ahead(self):
+        # 작업자 스레드 수만큼 STOP을 넘기면 끝납니다. ready 대기열이 차면 여기서 기다리므로 미리 그린 래스터는 lookahead개 정도로 제한됩니다.
+        stops = 0
+        while stops < len(self._threads):
+            job = self._get(self.jobs)
+            if job is self.STOP:
+                stops += 1
+            elif not self._stopping:
+                try:
+                    self.render_pool.prerender(job, self.backend)
+                except Exception as e:
+                    log.error(f"오류: 라벨 미리 그리기 중 예외가 발생했습니다. ({os.path.basename(job.image_path)})\n{e}")
+            self.ready.put(job)
+            self.jobs.task_done()
+
+    def _worker(self):
+        carry = None
+        while True:
+            job, carry = (carry, None) if carry is not None else (self._get(self.ready), None)
+            if job is self.STOP:
+                self.ready.task_done()
+                return
+            batch = [job]
+            if self._batching():
+                batch, carry = self._collect_batch(job)
+            self._run(batch)
+            for _ in batch:
+                self.ready.task_done()
+
+    def stats(self):
+        with self._lock:
+            latencies = list(self.latencies)
+            done = self.completed + self.failed
+            elapsed = (self.last_finished_at - self.first_enqueued_at) if done and self.first_enqueued_at is not None else 0.0
+            return {
+                "printer": self.printer_name,
+                "paused": self.paused,
+                "depth": self.depth(),
+                "overflow": len(self.overflow),
+                "workers": len(self._threads),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "batches": self.batches,
+                "jobs_per_sec": done / elapsed if elapsed > 0 else 0.0,
+                "latency_p50": percentile(latencies, 50),
+                "latency_p95": percentile(latencies, 95),
+                "latency_p99": percentile(latencies, 99),
+            }
+
+    def stop(self, wait=True, timeout=None):
+        # timeout: 대기열이 가득 차 STOP을 넣을 자리를 기다리는 시간과 작업자 종료를 기다리는 시간을 합친 최대값
+        self._stopping = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for _ in self._threads:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                # 시간 안에 자리가 나지 않으면 더 기다리지 않습니다. (작업자는 daemon 스레드, 남은 라벨은 저널에 인쇄 전 상태로 남음)
+                self.jobs.put(self.STOP, block=wait, timeout=remaining)
+            except Full:
+                break
+        if wait:
+            for t in self._threads:
+                t.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+class PrintScheduler:
+    # watchdog 핸들러와 print_label 사이의 작업 스케줄러.
+    # print_func를 바꿔 끼우면 실제 프린터 없이도(리눅스 등) 처리량과 지연 시간을 측정할 수 있습니다.
+    def __init__(self, print_func=None, queue_size=None, workers_per_printer=None, enqueue_timeout=None, backend=None,
+                 batch_func=None, batch_window_ms=None, batch_max_labels=None, listeners=None, monitor=None, render_pool=None):
+        # render_pool: 기본 인쇄 경로(print_label)에서만 사용합니다. (render_processes 설정이 있으면 자동으로 사용)
+        if print_func is None:
+            self.render_pool = render_pool or get_render_pool()
+            print_func = functools.partial(print_label, backend=backend) if backend else print_label
+        else:
+            self.render_pool = render_pool
+        if batch_func is None:
+            batch_func = functools.partial(print_label_batch, backend=backend) if backend else print_label_batch
+        self.print_func = print_func
+        self.batch_func = batch_func
+        self.backend = backend
+        self.batch_window = (batch_window_ms if batch_window_ms is not None else float(CONFIG.get("batch_window_ms", 0))) / 1000.0
+        self.batch_max = batch_max_labels if batch_max_labels is not None else int(CONFIG.get("batch_max_labels", 50))
+        self.queue_size = queue_size if queue_size is not None else int(CONFIG.get("print_queue_size", 1000))
+        self.workers_per_printer = workers_per_printer if workers_per_printer is not None else int(CONFIG.get("print_workers_per_printer", 1))
+        self.enqueue_timeout = enqueue_timeout if enqueue_timeout is not None else float(CONFIG.get("print_enqueue_timeout", 30))
+        self.listeners = [self._update_channel_stats, self._track_in_flight] + list(listeners or [])
+        self.monitor = monitor
+        self.retry_timer = RetryTimer()
+        self._queues = {}
+        self._channels = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        # 대기열/인쇄/재시도 중인 라벨 경로 -> 작업 수 (날짜가 바뀌거나 채널 설정이 바뀌어 backfill이 다시 실행될 때
+        # 아직 저널에 seen으로 남아 있는 이 라벨들을 다시 넣지 않도록)
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+
+    @staticmethod
+    def _path_key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def _track_in_flight(self, job, stage):
+        if stage not in ("queued", "spooled", "failed", "rejected"):
+            return
+        key = self._path_key(job.image_path)
+        with self._in_flight_lock:
+            count = self._in_flight.get(key, 0) + (1 if stage == "queued" else -1)
+            if count > 0:
+                self._in_flight[key] = count
+            else:
+                self._in_flight.pop(key, None)
+
+    def is_in_flight(self, path):
+        with self._in_flight_lock:
+            return self._path_key(path) in self._in_flight
+
+    def _channel(self, name):
+        stats = self._channels.get(name)
+        if stats is None:
+            stats = self._channels[name] = ChannelStats(name)
+        return stats
+
+    def _update_channel_stats(self, job, stage):
+        with self._lock:
+            self._channel(job.channel).on_stage(job, stage)
+
+    def note_deduplicated(self, channel):
+        with self._lock:
+            self._channel(channel).deduplicated += 1
+
+    def channel_stats(self):
+        with self._lock:
+            return {name: stats.stats() for name, stats in self._channels.items()}
+
+    def channel_histograms(self):
+        with self._lock:
+            return {name: stats.histograms() for name, stats in self._channels.items()}
+
+    def add_listener(self, listener):
+        # listener(job, stage): 작업 단계가 바뀔 때마다 호출됩니다. (인쇄 작업자 스레드에서 실행)
+        self.listeners.append(listener)
+
+    def _get_queue(self, printer_name):
+        with self._lock:
+            if self._closed:
+                return None
+            q = self._queues.get(printer_name)
+            if q is None:
+                q = PrinterQueue(printer_name, self.print_func, self.queue_size, self.workers_per_printer,
+                                 self.batch_func, self.batch_window, self.batch_max, self.monitor, self.retry_later,
+                                 self.render_pool, self.backend)
+                self._queues[printer_name] = q
+            return q
+
+    def submit(self, image_path, printer_name, devmode=None, timeout=None, channel=None, stages=None, backup_printer=None,
+               label=None, park=False):
+        # stages: 대기열 등록 전에 측정한 단계 시각 (detected/ready 등, time.perf_counter 기준)
+        # backup_printer: printer_name이 이상일 때 대신 인쇄할 프린터
+        # label: 파일 대신 그릴 템플릿 라벨 (TemplateLabel)
+        # park: 대기열이 가득 차도 기다리지 않음 (파일 감시 스레드처럼 여러 프린터가 함께 쓰는 스레드에서 호출할 때)
+        #       멈춘 프린터의 대기열은 자리가 나지 않으므로 항상 기다리지 않고 보관합니다.
+        q = self._get_queue(printer_name)
+        if q is None:
+            return None
+        if self.monitor is not None:
+            self.monitor.watch(printer_name)
+            self.monitor.watch(backup_printer)
+        job = PrintJob(image_path, printer_name, devmode, channel, stages, backup_printer, label)
+        job.listeners = self.listeners
+        job.mark("queued")
+        if q.put(job, self.enqueue_timeout if timeout is None else timeout, park=park or q.paused):
+            return job
+        log.warning(f"경고: '{printer_name}' 인쇄 대기열이 가득 차 '{os.path.basename(image_path)}' 라벨을 건너뜁니다.")
+        job.mark("rejected")
+        return None
+
+    def retry_later(self, job):
+        # 오류 종류별 정책에 따라 재시도를 예약합니다. 횟수를 다 쓴 경우 False (호출한 쪽에서 failed로 기록)
+        # 종료 중이라 예약할 수 없으면 retrying(저널: seen)으로 남겨 다음 실행의 backfill이 다시 인쇄합니다. (_failed로 옮기지 않음)
+        error_class = job.error[0] if job.error else "unexpected"
+        policy = retry_policy(error_class)
+        if job.attempts >= int(policy["max_attempts"]):
+            return False
+        if self._closed:
+            job.mark("retrying")
+            log.info(f"종료 중이라 '{os.path.basename(job.image_path)}' 라벨은 다음 실행 때 다시 인쇄합니다. ({error_class})")
+            return True
+        delay = retry_delay(policy, job.attempts)
+        log.warning(f"경고: '{os.path.basename(job.image_path)}' 인쇄 실패 ({error_class}) - {delay:.1f}초 후 다시 시도합니다. "
+                    f"({job.attempts}/{policy['max_attempts']})")
+        job.mark("retrying")
+        if not self.retry_timer.schedule(delay, functools.partial(self._resubmit, job)):
+            log.info(f"종료 중이라 '{os.path.basename(job.image_path)}' 라벨은 다음 실행 때 다시 인쇄합니다. ({error_class})")
+        return True
+
+    def _resubmit(self, job):
+        q = self._get_queue(job.printer_name)
+        if q is None:
+            return
+        if not q.put(job, 0, park=True):
+            # 대기 목록까지 가득 찬 경우: 재시도 스레드가 막히지 않도록 잠시 뒤 다시 넣습니다.
+            self.retry_timer.schedule(1.0, functools.partial(self._resubmit, job))
+
+    def queue_depths(self):
+        with self._lock:
+            queues = list(self._queues.values())
+        return {q.printer_name: q.depth() for q in queues}
+
+    def pending(self):
+        return sum(self.queue_depths().values())
+
+    def paused_printers(self):
+        with self._lock:
+            queues = list(self._queues.values())
+        return [q.printer_name for q in queues if q.paused]
+
+    def stats(self):
+        with self._lock:
+            queues = list(self._queues.values())
+        return [q.stats() for q in queues]
+
+    def shutdown(self, wait=True, timeout=None):
+        # 재시도를 기다리던 라벨은 저널에 인쇄 전 상태로 남아 있어 다음 실행 때 다시 인쇄됩니다.
+        self.retry_timer.stop()
+        with self._lock:
+            self._closed = True
+            queues = list(self._queues.values())
+            self._queues.clear()
+        for q in queues:
+            q.stop(wait=wait, timeout=timeout)
+
+
+# #####################################################################
+# 5. 인쇄 저널 (재시작/비정상 종료 후 누락 라벨 복구)
+# #####################################################################
+class PrintJournal:
+    # 라벨 파일별 처리 상태(seen/rendered/spooled/failed)를 SQLite(WAL)에 기록합니다.
+    # 프로그램이 꺼져 있던 동안 들어온 라벨은 backfill_folder()로 다시 인쇄합니다.
+    # rejected(대기열이 가득 차 넣지 못함)는 인쇄되지 않은 것이므로 seen으로 남겨 backfill이 다시 인쇄하게 합니다.
+    STAGE_STATES = {"queued": "seen", "retrying": "seen", "rejected": "seen", "rendered": "rendered", "spooled": "spooled",
+                    "failed": "failed"}
+    DONE_STATES = ("spooled", "failed")
+
+    def __init__(self, path=None):
+        self.path = path or CONFIG.get("journal_path") or "print_journal.db"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS labels (
+            folder TEXT NOT NULL, name TEXT NOT NULL, state TEXT NOT NULL, updated REAL NOT NULL, error TEXT,
+            PRIMARY KEY (folder, name)) WITHOUT ROWID""")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('created', ?)", (str(time.time()),))
+        self.created = float(self._conn.execute("SELECT value FROM meta WHERE key = 'created'").fetchone()[0])
+
+    @staticmethod
+    def split_path(path):
+        folder, name = os.path.split(os.path.abspath(path))
+        return os.path.normcase(folder), name
+
+    def record(self, path, state, error=None):
+        folder, name = self.split_path(path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO labels (folder, name, state, updated, error) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(folder, name) DO UPDATE SET state = excluded.state, updated = excluded.updated, error = excluded.error",
+                (folder, name, state, time.time(), error))
+
+    def on_job_stage(self, job, stage):
+        # PrintScheduler 리스너
+        state = self.STAGE_STATES.get(stage)
+        if state:
+            self.record(job.image_path, state, job.error[1] if state == "failed" and job.error else None)
+
+    def states_for_folder(self, folder):
+        folder = os.path.normcase(os.path.abspath(folder))
+        with self._lock:
+            return dict(self._conn.execute("SELECT name, state FROM labels WHERE folder = ?", (folder,)))
+
+    def prune(self, older_than_days):
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM labels WHERE updated < ?", (time.time() - older_than_days * 86400,))
+            return cur.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def backfill_folder(folder, journal, on_missing, extensions=('.png',), skip=None):
+    # 폴더의 파일 목록(os.scandir)과 저널을 비교해 아직 인쇄되지 않은 라벨을 수정 시각 순서로 다시 요청합니다.
+    # 저널이 처음 만들어지기 전에 있던 파일은 이미 인쇄된 것으로 보고 건너뜁니다.
+    # skip(path)이 True인 파일(지금 대기열에 있거나 인쇄 중인 라벨)도 건너뜁니다.
+    if not os.path.isdir(folder):
+        return 0
+    states = journal.states_for_folder(folder)
+    missing = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.name.lower().endswith(extensions) or states.get(entry.name) in journal.DONE_STATES:
+                continue
+            if skip is not None and skip(entry.path):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            if mtime < journal.created:
+                continue
+            missing.append((mtime, entry.name, entry.path))
+    missing.sort()
+    for _, _, path in missing:
+        on_missing(path)
+    return len(missing)
+
+
+class DeadLetterStore:
+    # 재시도를 모두 실패한 라벨을 날짜 폴더 옆의 _failed 폴더로 옮기고, 실패 원인을 <라벨 파일>.error.json으로 남깁니다.
+    # (예: 기준폴더/2024-05-01/A.png -> 기준폴더/_failed/A.png + A.png.error.json)
+    SIDECAR_SUFFIX = ".error.json"
+
+    def __init__(self, folder_name=None):
+        self.folder_name = folder_name or CONFIG.get("dead_letter_folder") or "_failed"
+        self.moved = 0
+
+    def folder_for(self, image_path):
+        return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(image_path))), self.folder_name)
+
+    @classmethod
+    def unique_path(cls, path):
+        # 실패 기록만 남은 라벨(파일 없음)과도 이름이 겹치지 않게 합니다.
+        root, ext = os.path.splitext(path)
+        n = 1
+        while os.path.exists(path) or os.path.exists(path + cls.SIDECAR_SUFFIX):
+            n += 1
+            path = f"{root} ({n}){ext}"
+        return path
+
+    def on_job_stage(self, job, stage):
+        # PrintScheduler 리스너
+        if stage == "failed":
+            self.move(job)
+
+    def move(self, job):
+        # 파일 없이 받은 라벨(수신 API, 데이터 파일의 행)은 옮길 파일이 없으므로 실패 기록(.error.json)만 남깁니다.
+        in_memory = job.label is not None
+        if not in_memory and not os.path.exists(job.image_path):
+            return None
+        folder = self.folder_for(job.image_path)
+        try:
+            os.makedirs(folder, exist_ok=True)
+            target = self.unique_path(os.path.join(folder, os.path.basename(job.image_path)))
+            if not in_memory:
+                os.replace(job.image_path, target)
+            error_class, message = job.error or ("unexpected", "")
+            with open(target + self.SIDECAR_SUFFIX, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "original_path": os.path.abspath(job.image_path),
+                    "channel": job.channel,
+                    "printer": job.printer_name,
+                    "printed_on": job.printed_on,
+                    "error_class": error_class,
+                    "error": message,
+                    "attempts": job.attempts,
+                    "failed_at": datetime.now().isoformat(timespec="seconds"),
+                }, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            log.error(f"오류: 인쇄 실패 라벨을 '{folder}'로 옮기지 못했습니다.\n{e}")
+            return None
+        self.moved += 1
+        log.warning(f"인쇄 실패 라벨을 {'기록했습니다' if in_memory else '옮겼습니다'}: {target} ({error_class}: {message})")
+        return target
+
+    def entries(self, base_folder):
+        # [(실패 폴더의 라벨 경로, 실패 정보 dict), ...] - 실패한 순서대로
+        folder = os.path.join(base_folder, self.folder_name)
+        result = []
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            return result
+        for name in names:
+            if not name.endswith(self.SIDECAR_SUFFIX):
+                continue
+            image_path = os.path.join(folder, name[:-len(self.SIDECAR_SUFFIX)])
+            try:
+                with open(os.path.join(folder, name), 'r', encoding='utf-8') as f:
+                    info = json.load(f)
+            except (OSError, ValueError):
+                info = {}
+            if os.path.exists(image_path):
+                result.append((image_path, info))
+        result.sort(key=lambda entry: entry[1].get("failed_at", ""))
+        return result
+
+    def restore(self, image_path, info):
+        # 라벨을 원래 날짜 폴더로 되돌리고 실패 기록을 지웁니다. 반환: 되돌린 경로
+        original = info.get("original_path") or os.path.join(os.path.dirname(os.path.dirname(image_path)), os.path.basename(image_path))
+        try:
+            os.makedirs(os.path.dirname(original), exist_ok=True)
+            target = self.unique_path(original)
+            os.replace(image_path, target)
+            os.remove(image_path + self.SIDECAR_SUFFIX)
+        except OSError as e:
+            log.error(f"오류: '{os.path.basename(image_path)}' 라벨을 다시 인쇄하기 위해 옮기지 못했습니다.\n{e}")
+            return None
+        return target
+
+def lower_thread_io_priority():
+    # 현재 스레드의 우선순위를 낮춥니다. Windows는 백그라운드 모드(디스크 I/O와 메모리 우선순위도 낮아짐),
+    # 리눅스는 스레드 nice 19 (I/O 우선순위도 nice 값을 따라 가장 낮은 단계가 됨)
+    try:
+        if os.name == "nt":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            return bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), 0x00010000))  # THREAD_MODE_BACKGROUND_BEGIN
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        return True
+    except (OSError, AttributeError):
+        return False
+
+class DateFolderArchiver:
+    # 지난 날짜 폴더를 <기준 폴더>/_archive/<날짜>.zip 하나로 묶고 원본 파일을 지웁니다. (PNG는 이미 압축되어 있어 그대로 저장,
+    # 데이터 파일은 deflate) 라벨 이름 -> zip 안의 위치/크기/인쇄 상태 색인을 <날짜>.index.json으로 남기므로,
+    # 다시 인쇄할 라벨은 압축을 모두 풀거나 zip 목록 전체를 읽지 않고 바로 읽을 수 있습니다.
+    # 폴더에 파일이 계속 쌓여 목록 조회, 백신 검사, backfill이 느려지는 것을 막습니다. 낮은 I/O 우선순위 스레드에서 실행됩니다.
+    INDEX_SUFFIX = ".index.json"
+    CHECK_INTERVAL = 3600  # 초
+    START_DELAY = 60  # 시작 직후의 backfill과 겹치지 않도록 기다리는 시간(초)
+
+    def __init__(self, journal=None, watched_folders=None, clock=None, folder_name=None):
+        self.journal = journal
+        self.watched_folders = watched_folders or (lambda: [])  # 감시 중인 폴더(오늘, 유예 중인 어제)는 묶지 않습니다.
+        self.clock = clock
+        self.folder_name = folder_name or CONFIG.get("archive_folder") or "_archive"
+        self.archived_folders = 0
+        self.archived_files = 0
+        self.removed_archives = 0
+        self._indexes = {}  # 색인 경로 -> (mtime_ns, 색인)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="archive", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(10)
+
+    def request(self):
+        # 날짜가 바뀐 뒤 등 다음 확인 시각을 기다리지 않고 바로 확인합니다.
+        self._wake.set()
+
+    def _run(self):
+        lower_thread_io_priority()
+        self._wake.wait(self.START_DELAY)
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.run_once()
+            except Exception as e:
+                log.error(f"오류: 날짜 폴더 보관 작업 중 예외가 발생했습니다.\n{e}")
+            self._wake.wait(self.CHECK_INTERVAL)
+
+    def archive_dir(self, base):
+        return os.path.join(base, self.folder_name)
+
+    def run_once(self):
+        after_days = int(CONFIG.get("archive_after_days", 0) or 0)
+        retention_days = int(CONFIG.get("archive_retention_days", 0) or 0)
+        if after_days <= 0 and retention_days <= 0:
+            return
+        today = (self.clock.now() if self.clock else datetime.now()).date()
+        watched = {os.path.normcase(os.path.abspath(folder)) for folder in self.watched_folders()}
+        bases = {}
+        for config in CONFIG.get("channels", []):
+            base = config.get("base_folder")
+            if base and os.path.isdir(base):
+                bases.setdefault(os.path.normcase(os.path.abspath(base)), (base, config.get("folder_format") or DATE_FOLDER_FORMAT))
+        for base, folder_format in bases.values():
+            if after_days > 0:
+                for day, folder in self.closed_folders(base, folder_format, today - timedelta(days=after_days)):
+                    if self._stop.is_set():
+                        return
+                    if os.path.normcase(os.path.abspath(folder)) in watched:
+                        continue
+                    try:
+                        self.archive_folder(base, day, folder)
+                    except OSError as e:
+                        log.error(f"오류: '{folder}' 폴더를 보관하지 못했습니다. 다음 확인 때 다시 시도합니다.\n{e}")
+            if retention_days > 0:
+                self.remove_expired(base, today - timedelta(days=retention_days))
+
+    @staticmethod
+    def closed_folders(base, folder_format, cutoff):
+        # 기준 폴더 바로 아래의 날짜 폴더 중 cutoff 날짜 이전(포함) 폴더: [(날짜, 경로), ...] 오래된 순
+        folders = []
+        with os.scandir(base) as entries:
+            for entry in entries:
+                try:
+                    day = datetime.strptime(entry.name, folder_format).date()
+                except ValueError:
+                    continue
+                if day <= cutoff and entry.is_dir():
+                    folders.append((day, entry.path))
+        folders.sort()
+        return folders
+
+    def archived_sizes(self, archive_dir, day_str):
+        # 이미 보관한 라벨 이름 -> 크기 (보관 후 원본을 지우기 전에 멈춘 경우 다시 묶지 않기 위해)
+        sizes = {}
+        for _, index in self.indexes_in(archive_dir):
+            if index.get("date") == day_str:
+                sizes.update((name, entry["length"]) for name, entry in index.get("labels", {}).items())
+        return sizes
+
+    def next_part(self, archive_dir, day_str):
+        # 같은 날짜를 다시 묶는 경우(늦게 들어온 파일) <날짜>.2, <날짜>.3 ... 색인 없이 남은 zip은 중단된 작업이므로 지웁니다.
+        n = 1
+        while True:
+            part = day_str if n == 1 else f"{day_str}.{n}"
+            zip_path = os.path.join(archive_dir, part + ".zip")
+            if not os.path.exists(os.path.join(archive_dir, part + self.INDEX_SUFFIX)):
+                for leftover in (zip_path, zip_path + ".tmp"):
+                    if os.path.exists(leftover):
+                        os.remove(leftover)
+                return part
+            n += 1
+
+    def archive_folder(self, base, day, folder):
+        archive_dir = self.archive_dir(base)
+        os.makedirs(archive_dir, exist_ok=True)
+        day_str = day.strftime(DATE_FOLDER_FORMAT)
+        files = []
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        files.append((entry.name, entry.path, entry.stat().st_size))
+                except OSError:
+                    continue
+        files.sort()
+        known = self.archived_sizes(archive_dir, day_str)
+        pending = [file for file in files if known.get(file[0]) != file[2]]
+        archived = [path for name, path, size in files if known.get(name) == size]
+        if pending:
+            states = self.journal.states_for_folder(folder) if self.journal is not None else {}
+            part = self.next_part(archive_dir, day_str)
+            zip_path = os.path.join(archive_dir, part + ".zip")
+            labels = {}
+            started_at, written = time.monotonic(), 0
+            with zipfile.ZipFile(zip_path + ".tmp", "w", allowZip64=True) as zf:
+                for name, path, size in pending:
+                    method = zipfile.ZIP_STORED if name.lower().endswith(".png") else zipfile.ZIP_DEFLATED
+                    try:
+                        zf.write(path, name, compress_type=method)
+                    except OSError as e:
+                        log.warning(f"경고: '{name}' 파일을 보관하지 못해 건너뜁니다. ({e})")
+                        continue
+                    archived.append(path)
+                    written += size
+                    self.throttle(started_at, written)
+                    if self._stop.is_set():
+                        break
+                for info in zf.infolist():
+                    labels[info.filename] = {"offset": info.header_offset, "size": info.compress_size, "length": info.file_size,
+                                             "method": info.compress_type, "crc": info.CRC,
+                                             "status": states.get(info.filename, "unknown")}
+            if self._stop.is_set():
+                os.remove(zip_path + ".tmp")  # 종료 중: 다음 실행 때 처음부터 다시 묶습니다.
+                return
+            # 원본을 지우기 전에 색인의 위치로 모든 파일을 다시 읽어 크기와 CRC를 확인합니다.
+            try:
+                self.verify(zip_path + ".tmp", labels)
+            except (OSError, zipfile.BadZipFile) as e:
+                os.remove(zip_path + ".tmp")
+                log.error(f"오류: '{folder}' 보관 파일을 확인하지 못해 원본을 지우지 않습니다. 다음 확인 때 다시 시도합니다.\n{e}")
+                return
+            os.replace(zip_path + ".tmp", zip_path)
+            # 색인이 마지막에 만들어지므로, 색인이 있는 zip만 완성된 보관 파일입니다.
+            index_path = os.path.join(archive_dir, part + self.INDEX_SUFFIX)
+            with open(index_path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump({"version": 1, "date": day_str, "folder": os.path.basename(folder), "archive": part + ".zip",
+                           "created": datetime.now().isoformat(timespec="seconds"), "labels": labels}, f, ensure_ascii=False)
+            os.replace(index_path + ".tmp", index_path)
+        for path in archived:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        try:
+            os.rmdir(folder)
+        except OSError:
+            pass  # 그 사이 새 파일이 들어온 경우 다음 확인 때 함께 묶습니다.
+        with self._lock:
+            self.archived_folders += 1
+            self.archived_files += len(pending)
+        log.info(f"날짜 폴더 보관: '{folder}' -> '{self.folder_name}' (라벨 {len(pending)}건)")
+
+    def throttle(self, started_at, written):
+        limit = float(CONFIG.get("archive_io_mb_per_sec", 0) or 0) * 1024 * 1024
+        if limit > 0:
+            ahead = written / limit - (time.monotonic() - started_at)
+            if ahead > 0:
+                self._stop.wait(ahead)
+
+    def remove_expired(self, base, cutoff):
+        archive_dir = self.archive_dir(base)
+        if not os.path.isdir(archive_dir):
+            return
+        for name in os.listdir(archive_dir):
+            if not name.endswith(self.INDEX_SUFFIX):
+                continue
+            try:
+                day = datetime.strptime(name[:10], DATE_FOLDER_FORMAT).date()
+            except ValueError:
+                continue
+            if day >= cutoff:
+                continue
+            part = name[:-len(self.INDEX_SUFFIX)]
+            try:
+                os.remove(os.path.join(archive_dir, name))  # 색인을 먼저 지워 반쯤 지운 보관 파일을 찾지 않도록 합니다.
+                os.remove(os.path.join(archive_dir, part + ".zip"))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                log.warning(f"경고: 보관 기간이 지난 '{part}.zip'을 지우지 못했습니다. ({e})")
+                continue
+            with self._lock:
+                self.removed_archives += 1
+            log.info(f"보관 기간이 지난 라벨 보관 파일을 지웠습니다: {part}.zip")
+
+    def indexes_in(self, archive_dir):
+        # [(색인 경로, 색인), ...] 최근 날짜 먼저. 바뀌지 않은 색인은 읽어 둔 것을 씁니다.
+        try:
+            names = sorted((name for name in os.listdir(archive_dir) if name.endswith(self.INDEX_SUFFIX)), reverse=True)
+        except OSError:
+            return []
+        result = []
+        for name in names:
+            path = os.path.join(archive_dir, name)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            with self._lock:
+                cached = self._indexes.get(path)
+            if cached is None or cached[0] != mtime:
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        cached = (mtime, json.load(f))
+                except (OSError, ValueError) as e:
+                    log.warning(f"경고: 보관 색인 '{name}'을 읽을 수 없습니다. ({e})")
+                    continue
+                with self._lock:
+                    self._indexes[path] = cached
+            result.append((path, cached[1]))
+        return result
+
+    def find(self, base, name, day=None):
+        # 라벨 이름으로 보관 파일을 찾습니다. 반환: (zip 경로, 색인 항목, 색인) 또는 None (같은 이름이면 최근 날짜 우선)
+        for path, index in self.indexes_in(self.archive_dir(base)):
+            if day and index.get("date") != day:
+                continue
+            entry = index.get("labels", {}).get(name)
+            if entry is not None:
+                return os.path.join(os.path.dirname(path), index["archive"]), entry, index
+        return None
+
+    @staticmethod
+    def read_entry(zip_path, entry):
+        # 색인의 위치로 zip 안의 파일 하나만 읽습니다. (zip 전체 목록(중앙 디렉터리)을 읽지 않음)
+        import zlib
+        with open(zip_path, 'rb') as f:
+            f.seek(entry["offset"])
+            header = f.read(30)
+            if len(header) < 30 or header[:4] != b"PK\x03\x04":
+                raise zipfile.BadZipFile(f"보관 파일의 위치가 색인과 맞지 않습니다: {os.path.basename(zip_path)}")
+            f.seek(int.from_bytes(header[26:28], "little") + int.from_bytes(header[28:30], "little"), os.SEEK_CUR)
+            data = f.read(entry["size"])
+        try:
+            if entry["method"] == zipfile.ZIP_DEFLATED:
+                data = zlib.decompress(data, -15)
+        except zlib.error as e:
+            raise zipfile.BadZipFile(str(e)) from e
+        if zlib.crc32(data) != entry["crc"]:
+            raise zipfile.BadZipFile(f"보관된 라벨의 CRC가 맞지 않습니다: {os.path.basename(zip_path)}")
+        return data
+
+    @classmethod
+    def verify(cls, zip_path, labels):
+        for name, entry in labels.items():
+            if len(cls.read_entry(zip_path, entry)) != entry["length"]:
+                raise zipfile.BadZipFile(f"보관된 라벨의 크기가 맞지 않습니다: {name}")
+
+    def stats(self):
+        with self._lock:
+            return {"archived_folders": self.archived_folders, "archived_files": self.archived_files,
+                    "removed_archives": self.removed_archives}
+
+
+# #####################################################################
+# 6. 파일 쓰기 완료 감지 + 폴더 감시 핸들러
+# #####################################################################
+PNG_TRAILER = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+def png_complete(path):
+    # PNG 파일은 항상 IEND 청크로 끝나므로, 끝 12바이트로 쓰기가 끝났는지 바로 알 수 있습니다.
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() < len(PNG_TRAILER) + 8:
+            return False
+        f.seek(-len(PNG_TRAILER), os.SEEK_END)
+        return f.read() == PNG_TRAILER
+
+class FileReadinessTracker:
+    # 파일이 다 쓰였을 때만 콜백을 호출합니다.
+    # PNG 끝(IEND)이 확인되면 즉시, 아니면 크기/수정 시각이 안정될 때까지 간격을 점점 늘려가며 확인합니다.
+    def __init__(self, min_delay=None, max_delay=None, stable_time=None, timeout=None):
+        self.min_delay = min_delay if min_delay is not None else float(CONFIG.get("ready_min_delay_ms", 50)) / 1000.0
+        self.max_delay = max_delay if max_delay is not None else float(CONFIG.get("ready_max_delay_ms", 1000)) / 1000.0
+        self.stable_time = stable_time if stable_time is not None else float(CONFIG.get("ready_stable_ms", 1000)) / 1000.0
+        self.timeout = timeout if timeout is not None else float(CONFIG.get("ready_timeout_seconds", 120))
+        self.ready_count = 0
+        self.timeout_count = 0
+        self._pending = {}
+        self._heap = []
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="file-readiness", daemon=True)
+        self._thread.start()
+
+    def track(self, path, callback):
+        # callback(path, detected_at): 파일이 다 쓰이면 호출됩니다. detected_at은 첫 이벤트 시각(time.perf_counter)
+        now = time.monotonic()
+        with self._cond:
+            state = self._pending.get(path)
+            if state is None:
+                state = {"callback": callback, "first_seen": now, "detected_at": time.perf_counter(),
+                         "signature": None, "stable_since": None, "delay": self.min_delay}
+                self._pending[path] = state
+                heapq.heappush(self._heap, (now, path))
+            else:
+                # 쓰는 중에 들어온 추가 이벤트: 안정 구간을 다시 시작하고 확인 간격을 줄입니다.
+                state["callback"] = callback
+                state["signature"] = None
+                state["stable_since"] = None
+                state["delay"] = self.min_delay
+            self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._pending.clear()
+            self._cond.notify()
+
+    def _check(self, path, state, now):
+        # 반환값: True(준비됨), False(계속 대기), None(추적 중단)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        except OSError:
+            return False
+        if path.lower().endswith('.png'):
+            try:
+                if png_complete(path):
+                    return True
+            except OSError:
+                # 다른 프로세스가 쓰는 중이라 열 수 없는 경우
+                return False
+        signature = (st.st_size, st.st_mtime_ns)
+        if signature != state["signature"] or st.st_size == 0:
+            state["signature"] = signature
+            state["stable_since"] = now
+            return False
+        return now - state["stable_since"] >= self.stable_time
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    self._cond.wait(None if not self._heap else max(0.0, self._heap[0][0] - time.monotonic()))
+                if not self._running:
+                    return
+                _, path = heapq.heappop(self._heap)
+                state = self._pending.get(path)
+            if state is None:
+                continue
+            now = time.monotonic()
+            result = self._check(path, state, now)
+            callback = None
+            with self._cond:
+                if self._pending.get(path) is not state:
+                    continue
+                if result is None:
+                    del self._pending[path]
+                elif result:
+                    del self._pending[path]
+                    self.ready_count += 1
+                    callback = state["callback"]
+                    detected_at = state["detected_at"]
+                elif now - state["first_seen"] > self.timeout:
+                    del self._pending[path]
+                    self.timeout_count += 1
+                    log.warning(f"경고: '{os.path.basename(path)}' 파일 쓰기가 {self.timeout:.0f}초 안에 끝나지 않아 인쇄하지 않습니다.")
+                else:
+                    heapq.heappush(self._heap, (now + state["delay"], path))
+                    state["delay"] = min(self.max_delay, state["delay"] * 2)
+            if callback is not None:
+                try:
+                    callback(path, detected_at)
+                except Exception as e:
+                    log.error(f"오류: '{os.path.basename(path)}' 인쇄 요청 중 예외가 발생했습니다.\n{e}")
+
+def file_signature(path):
+    # (크기, 수정 시각 ns) - 파일을 읽을 수 없으면 None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+class DedupIndex:
+    # 최근 인쇄한 라벨(경로, 선택적으로 파일 내용 해시)을 TTL과 최대 개수로 제한해 기억합니다.
+    # OrderedDict의 앞쪽이 항상 가장 오래된 항목이므로 만료/제거가 이벤트당 O(1)입니다.
+    # 인쇄한 파일의 (크기, 수정 시각)은 TTL과 상관없이 기억해, 백신 검사/속성 변경처럼 내용이 그대로인 파일에
+    # 나중에 들어온 수정/닫힘 이벤트로는 다시 인쇄하지 않습니다. (내용이 실제로 바뀐 경우에만 다시 인쇄)
+    def __init__(self, ttl=None, max_entries=None, by_content=None):
+        self.ttl = ttl if ttl is not None else float(CONFIG.get("dedup_ttl_seconds", 10))
+        self.max_entries = max_entries if max_entries is not None else int(CONFIG.get("dedup_max_entries", 20000))
+        self.by_content = by_content if by_content is not None else bool(CONFIG.get("dedup_by_content", False))
+        self.accepted = 0
+        self.suppressed_by_path = 0
+        self.suppressed_by_content = 0
+        self.evicted = 0
+        self._entries = OrderedDict()
+        self._signatures = OrderedDict()  # 경로 키 -> 인쇄했을 때의 (크기, 수정 시각)
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._entries:
+            key, seen_at = next(iter(self._entries.items()))
+            if now - seen_at < self.ttl:
+                break
+            self._entries.popitem(last=False)
+
+    def check_and_add(self, path, namespace="", now=None, signature=None):
+        # 처음 보는 라벨이면 기록하고 True, TTL 안의 중복이거나 인쇄한 뒤 바뀌지 않은 파일이면 False를 돌려줍니다.
+        # signature: 파일의 (크기, 수정 시각) - file_signature()
+        now = time.monotonic() if now is None else now
+        path_key = (namespace, "path", os.path.normcase(os.path.abspath(path)))
+        content_key = None
+        with self._lock:
+            self._expire(now)
+            if path_key in self._entries or (signature is not None and self._signatures.get(path_key) == signature):
+                self.suppressed_by_path += 1
+                return False
+        if self.by_content:
+            try:
+                with open(path, 'rb') as f:
+                    content_key = (namespace, "content", content_hash(f.read()))
+            except OSError:
+                content_key = None
+        with self._lock:
+            if path_key in self._entries:
+                self.suppressed_by_path += 1
+                return False
+            if content_key is not None and content_key in self._entries:
+                self.suppressed_by_content += 1
+                return False
+            for key in (path_key, content_key):
+                if key is not None:
+                    self._entries[key] = now
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+            if signature is not None:
+                self._signatures[path_key] = signature
+                self._signatures.move_to_end(path_key)
+                while len(self._signatures) > self.max_entries:
+                    self._signatures.popitem(last=False)
+            self.accepted += 1
+            return True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "accepted": self.accepted,
+                "suppressed_by_path": self.suppressed_by_path,
+                "suppressed_by_content": self.suppressed_by_content,
+                "evicted": self.evicted,
+            }
+
+LABEL_EXTENSIONS = ('.png',)
+DATA_FILE_EXTENSIONS = ('.json', '.csv')
+
+class DataFileExpander:
+    # .json/.csv 데이터 파일의 각 행을 템플릿 라벨 인쇄 작업으로 만듭니다.
+    # 파일마다 스레드 하나가 한 줄씩 읽어 대기열에 자리가 나는 만큼 넣으므로(스트리밍) 수천 줄 CSV도 메모리를 거의 쓰지 않습니다.
+    # 각 행은 저널에 "<파일>#<행>" 이름으로 기록되어, 도중에 프로그램이 꺼져도 다음 실행 때 남은 행부터 이어서 인쇄합니다.
+    ENQUEUE_TIMEOUT = 3600  # 프린터가 오래 멈춰 대기열이 비지 않으면 남은 행은 다음 실행(backfill)으로 미룹니다.
+
+    def __init__(self, scheduler, templates=None, journal=None):
+        self.scheduler = scheduler
+        self.templates = templates or TemplateStore()
+        self.journal = journal
+        self.expanded_files = 0
+        self.labels = 0
+        self._expanding = set()  # 지금 읽는 중인 데이터 파일 (backfill이 다시 실행되어도 같은 파일을 두 번 읽지 않도록)
+        self._lock = threading.Lock()
+
+    def expand(self, path, printer_name, devmode=None, channel=None, backup_printer=None, stages=None):
+        key = os.path.normcase(os.path.abspath(path))
+        with self._lock:
+            if key in self._expanding:
+                return None
+            self._expanding.add(key)
+        thread = threading.Thread(target=self._expand, args=(path, printer_name, devmode, channel, backup_printer, stages),
+                                  name=f"data-file-{os.path.basename(path)}", daemon=True)
+        thread.start()
+        return thread
+
+    def _expand(self, path, printer_name, devmode, channel, backup_printer, stages):
+        try:
+            self._expand_rows(path, printer_name, devmode, channel, backup_printer, stages)
+        finally:
+            with self._lock:
+                self._expanding.discard(os.path.normcase(os.path.abspath(path)))
+
+    def _expand_rows(self, path, printer_name, devmode, channel, backup_printer, stages):
+        name = os.path.basename(path)
+        done = self.journal.states_for_folder(os.path.dirname(path)) if self.journal else {}
+        templates = {}  # 이 파일에서 쓴 템플릿 (행마다 파일을 확인하지 않도록)
+        submitted = skipped = in_flight = invalid = 0
+        try:
+            for row, template_name, fields, copies in iter_data_file(path, CONFIG.get("template_default", "")):
+                for copy in range(1, copies + 1):
+                    label_name = f"{name}#{row}" + (f".{copy}" if copies > 1 else "")
+                    label_path = os.path.join(os.path.dirname(path), label_name)
+                    if done.get(label_name) in PrintJournal.DONE_STATES:
+                        skipped += 1
+                        continue
+                    if self.scheduler.is_in_flight(label_path):
+                        in_flight += 1  # 이전에 요청해 아직 대기열/인쇄 중인 행
+                        continue
+                    try:
+                        if template_name not in templates:
+                            templates[template_name] = self.templates.get(template_name)
+                        label = templates[template_name].label(fields)
+                    except TemplateError as e:
+                        invalid += 1
+                        log.error(f"인쇄 실패: '{label_name}' {e}")
+                        if self.journal:
+                            self.journal.record(label_path, "failed", str(e))
+                        break
+                    job = self.scheduler.submit(label_path, printer_name, devmode, timeout=self.ENQUEUE_TIMEOUT, channel=channel,
+                                                stages=dict(stages or {}), backup_printer=backup_printer, label=label)
+                    if job is None:
+                        log.warning(f"경고: '{name}' 데이터 파일의 나머지 행은 다음 실행 때 인쇄합니다.")
+                        return
+                    submitted += 1
+        except (OSError, ValueError, csv.Error) as e:
+            log.error(f"오류: 데이터 파일 '{name}'을 읽을 수 없습니다. ({submitted}건 요청 후 중단)\n{e}")
+            if self.journal:
+                self.journal.record(path, "failed", str(e))
+            return
+        self.expanded_files += 1
+        self.labels += submitted
+        if self.journal:
+            # 요청할 행이 하나도 남지 않았으면 파일 자체를 완료로 기록해 다음 backfill에서 다시 읽지 않습니다.
+            self.journal.record(path, "seen" if submitted or in_flight else "spooled")
+        log.info(f"데이터 파일 '{name}': 라벨 {submitted}건 요청" + (f", 이미 인쇄 {skipped}건" if skipped else "") +
+                 (f", 인쇄 중 {in_flight}건" if in_flight else "") + (f", 오류 {invalid}건" if invalid else ""))
+
+class LabelPrintHandler(FileSystemEventHandler):
+    def __init__(self, printer_name: str, get_devmode_func, scheduler, readiness=None, dedup=None, channel=None, backup_printer=None,
+                 expander=None):
+        self.printer_name = printer_name
+        self.backup_printer = backup_printer or None
+        self.channel = channel
+        self.get_devmode_func = get_devmode_func
+        self.scheduler = scheduler
+        self.readiness = readiness or FileReadinessTracker()
+        self.dedup = dedup or DedupIndex()
+        self.expander = expander  # DataFileExpander (있으면 .json/.csv 데이터 파일도 처리)
+
+    def data_files_enabled(self):
+        # template_drop_files는 설정 파일을 고치면 다시 시작하지 않아도 바로 적용됩니다.
+        return self.expander is not None and CONFIG.get("template_drop_files", True)
+
+    @property
+    def extensions(self):
+        return LABEL_EXTENSIONS + (DATA_FILE_EXTENSIONS if self.data_files_enabled() else ())
+
+    def _track(self, path, is_directory=False):
+        if is_directory or not path.lower().endswith(self.extensions):
+            return
+        self.readiness.track(path, self.on_file_ready)
+
+    def on_created(self, event):
+        self._track(event.src_path, event.is_directory)
+
+    def on_modified(self, event):
+        self._track(event.src_path, event.is_directory)
+
+    def on_closed(self, event):
+        self._track(event.src_path, event.is_directory)
+
+    def on_moved(self, event):
+        # 임시 이름으로 쓴 뒤 .png로 이름을 바꾸는(atomic rename) 경우
+        self._track(event.dest_path, event.is_directory)
+
+    def backfill(self, folder, journal):
+        # 감시 시작 전에 들어온(놓친) 라벨을 일반 이벤트와 같은 경로(쓰기 완료 확인 -> 중복 확인 -> 대기열)로 보냅니다.
+        count = backfill_folder(folder, journal, self._track, self.extensions, skip=self.scheduler.is_in_flight)
+        if count:
+            log.info(f" - 프로그램이 꺼져 있던 동안 들어온 라벨 {count}건을 인쇄합니다: {folder}")
+        return count
+
+    def on_file_ready(self, filepath, detected_at=None):
+        stages = {"ready": time.perf_counter()}
+        if detected_at is not None:
+            stages["detected"] = detected_at
+        suppressed_by_content = self.dedup.suppressed_by_content
+        if not self.dedup.check_and_add(filepath, namespace=self.printer_name, signature=file_signature(filepath)):
+            self.scheduler.note_deduplicated(self.channel or self.printer_name)
+            if self.dedup.suppressed_by_content != suppressed_by_content:
+                log.info(f"중복 라벨 건너뜀: '{os.path.basename(filepath)}' (최근 인쇄한 라벨과 내용이 같습니다)")
+            return
+
+        devmode = self.get_devmode_func()
+        if filepath.lower().endswith(DATA_FILE_EXTENSIONS):
+            if self.data_files_enabled():
+                self.expander.expand(filepath, self.printer_name, devmode, channel=self.channel, backup_printer=self.backup_printer,
+                                     stages=stages)
+            return
+        # 파일 감시(readiness) 스레드는 모든 채널이 함께 쓰므로 대기열이 가득 차도 기다리지 않습니다.
+        self.scheduler.submit(filepath, self.printer_name, devmode, channel=self.channel, stages=stages,
+                              backup_printer=self.backup_printer, park=True)
+
+# #####################################################################
+# 7. 감시 폴더 관리 (Observer를 다시 만들지 않는 날짜 전환)
+# #####################################################################
+DATE_FOLDER_FORMAT = '%Y-%m-%d'
+
+class SystemClock:
+    def now(self):
+        return datetime.now()
+
+class WatchChannel:
+    # 기준 폴더 하나와 그 폴더의 라벨을 인쇄할 프린터/핸들러 묶음
+    def __init__(self, name, title, base_folder, printer_name, handler, folder_format=DATE_FOLDER_FORMAT, backup_printer="",
+                 watch_engine="native"):
+        self.name = name
+        self.title = title
+        self.base_folder = base_folder
+        self.printer_name = printer_name
+        self.handler = handler
+        self.folder_format = folder_format or DATE_FOLDER_FORMAT
+        self.backup_printer = backup_printer or ""
+        self.watch_engine = watch_engine or "native"
+
+    def signature(self):
+        return (os.path.normcase(os.path.abspath(self.base_folder)), self.printer_name, self.folder_format, self.backup_printer,
+                self.watch_engine)
+
+    def folder_for(self, day):
+        return os.path.join(self.base_folder, day.strftime(self.folder_format))
+
+class PolledWatch:
+    # PollingObserver가 확인하는 폴더 하나 (watchdog의 ObservedWatch 역할)
+    def __init__(self, path, interval):
+        self.path = path
+        self.handlers = []
+        self.snapshot = {}  # 파일 이름 -> (수정 시각 ns, 크기)
+        self.interval = interval
+        self.next_scan_at = 0.0
+        self.failing = False
+
+class PollingObserver:
+    # 네트워크 공유 폴더(SMB)용 감시기. 네이티브 이벤트가 빠지거나 연결이 잠시 끊긴 뒤 감시가 조용히 멈추는 경우를 피합니다.
+    # 감시 중인 날짜 폴더만 os.scandir로 훑어 이전 스냅숏(이름 -> 수정 시각/크기)과 비교하고, 바뀐 파일만 watchdog 이벤트로 만들어
+    # 기존 핸들러에 보냅니다. (Windows에서는 scandir 결과에 크기/수정 시각이 들어 있어 파일마다 따로 stat 하지 않습니다)
+    # 파일이 들어오는 동안에는 짧은 간격으로, 조용하면 간격을 점점 늘려 확인합니다.
+    # 폴더를 읽지 못하면(OSError) 최대 간격으로 계속 다시 시도하고, 복구되면 그동안 들어온 파일을 이어서 알려줍니다.
+    # WatchManager가 쓰는 watchdog Observer의 메서드(schedule/unschedule/remove_handler_for_watch/start/stop/join)만 제공합니다.
+    def __init__(self, min_interval=None, max_interval=None):
+        self.min_interval = min_interval if min_interval is not None else float(CONFIG.get("polling_min_interval_ms", 250)) / 1000.0
+        self.max_interval = max(self.min_interval,
+                                max_interval if max_interval is not None else float(CONFIG.get("polling_max_interval_seconds", 5)))
+        self.scans = 0
+        self.scan_seconds = 0.0
+        self.errors = 0
+        self._watches = {}  # 정규화한 경로 -> PolledWatch
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    @staticmethod
+    def scan(path):
+        entries = {}
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        entries[entry.name] = (stat.st_mtime_ns, stat.st_size)
+                except OSError:
+                    continue  # 훑는 사이에 지워진 파일
+        return entries
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="polling-observer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def schedule(self, event_handler, path, recursive=False):
+        # 처음 감시하는 폴더는 현재 파일 목록을 기준 스냅숏으로 삼습니다. (이미 있던 파일은 backfill이 처리)
+        key = self._key(path)
+        with self._cond:
+            watch = self._watches.get(key)
+        if watch is None:
+            snapshot = self.scan(path)
+            with self._cond:
+                watch = self._watches.get(key)
+                if watch is None:
+                    watch = self._watches[key] = PolledWatch(path, self.min_interval)
+                    watch.snapshot = snapshot
+        with self._cond:
+            if event_handler not in watch.handlers:
+                watch.handlers.append(event_handler)
+            watch.next_scan_at = time.monotonic() + watch.interval
+            self._cond.notify()
+        return watch
+
+    def remove_handler_for_watch(self, event_handler, watch):
+        with self._cond:
+            if event_handler in watch.handlers:
+                watch.handlers.remove(event_handler)
+
+    def unschedule(self, watch):
+        with self._cond:
+            key = self._key(watch.path)
+            if self._watches.get(key) is not watch:
+                raise KeyError(watch.path)
+            del self._watches[key]
+            watch.handlers = []
+
+    def stats(self):
+        with self._cond:
+            return {
+                "folders": len(self._watches),
+                "failing": sum(1 for watch in self._watches.values() if watch.failing),
+                "scans": self.scans,
+                "scan_ms_avg": round(self.scan_seconds / self.scans * 1000, 3) if self.scans else 0.0,
+                "errors": self.errors,
+            }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    now = time.monotonic()
+                    due = [watch for watch in self._watches.values() if watch.next_scan_at <= now]
+                    if due:
+                        break
+                    next_at = min((watch.next_scan_at for watch in self._watches.values()), default=now + self.max_interval)
+                    self._cond.wait(next_at - now)
+                if not self._running:
+                    return
+            for watch in due:
+                try:
+                    self._poll(watch)
+                except Exception as e:
+                    log.error(f"오류: 폴더 확인 중 예외가 발생했습니다: {watch.path}\n{e}")
+                    watch.next_scan_at = time.monotonic() + self.max_interval
+
+    def _poll(self, watch):
+        started = time.perf_counter()
+        try:
+            current = self.scan(watch.path)
+        except OSError as e:
+            self.errors += 1
+            if not watch.failing:
+                watch.failing = True
+                log.warning(f"경고: 감시 폴더를 읽을 수 없습니다. 연결이 복구되면 자동으로 다시 감시합니다: {watch.path}\n{e}")
+            watch.interval = self.max_interval
+            watch.next_scan_at = time.monotonic() + watch.interval
+            return
+        finally:
+            self.scans += 1
+            self.scan_seconds += time.perf_counter() - started
+        if watch.failing:
+            watch.failing = False
+            log.info(f"감시 폴더 연결이 복구되었습니다: {watch.path}")
+
+        events = []
+        previous = watch.snapshot
+        for name, signature in current.items():
+            old = previous.get(name)
+            if old is None:
+                events.append(FileCreatedEvent(os.path.join(watch.path, name)))
+            elif old != signature:
+                events.append(FileModifiedEvent(os.path.join(watch.path, name)))
+        for name in previous.keys() - current.keys():
+            events.append(FileDeletedEvent(os.path.join(watch.path, name)))
+        watch.snapshot = current
+        # 변화가 있으면 다음 확인을 앞당기고(쓰는 중인 파일의 완료도 빨리 확인), 없으면 2배씩 늘립니다.
+        watch.interval = self.min_interval if events else min(self.max_interval, watch.interval * 2)
+        watch.next_scan_at = time.monotonic() + watch.interval
+
+        with self._cond:
+            handlers = list(watch.handlers)
+        for event in events:
+            for handler in handlers:
+                try:
+                    handler.dispatch(event)
+                except Exception as e:
+                    log.error(f"오류: '{os.path.basename(event.src_path)}' 파일 이벤트 처리 중 예외가 발생했습니다.\n{e}")
+
+class WatchManager:
+    # 하나의 Observer에 날짜 폴더를 미리 추가하고(prepare_ahead), 지난 날짜 폴더는 유예 시간(grace) 뒤에 제거합니다.
+    # 설정 변경 시에도 바뀐 채널만 교체하므로 감시가 끊기는 구간이 없습니다. clock을 바꿔 끼워 날짜 전환을 시험할 수 있습니다.
+    def __init__(self, observer=None, clock=None, prepare_ahead=None, grace=None, on_folder_added=None, polling_observer=None):
+        self.observer = observer or Observer()
+        self.polling_observer = polling_observer  # watch_engine=polling 채널이 있을 때 만듭니다.
+        self.clock = clock or SystemClock()
+        self.prepare_ahead = prepare_ahead if prepare_ahead is not None else timedelta(minutes=float(CONFIG.get("rollover_prepare_minutes", 5)))
+        self.grace = grace if grace is not None else timedelta(minutes=float(CONFIG.get("rollover_grace_minutes", 10)))
+        self.on_folder_added = on_folder_added
+        self.channels = {}
+        self._watches = {}  # (채널 이름, 폴더) -> (채널, ObservedWatch, 감시기)
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        self._started = True
+        for observer in (self.observer, self.polling_observer):
+            if observer is not None and not observer.is_alive():
+                observer.start()
+
+    def stop(self):
+        self._started = False
+        for observer in (self.observer, self.polling_observer):
+            if observer is not None and observer.is_alive():
+                observer.stop()
+                observer.join()
+
+    def observer_for(self, channel):
+        if channel.watch_engine != "polling":
+            return self.observer
+        if self.polling_observer is None:
+            self.polling_observer = PollingObserver()
+        if self._started and not self.polling_observer.is_alive():
+            self.polling_observer.start()
+        return self.polling_observer
+
+    def polling_stats(self):
+        return self.polling_observer.stats() if self.polling_observer is not None else None
+
+    def set_channels(self, channels):
+        # 설정이 같은 채널은 기존 핸들러를 그대로 유지합니다.
+        with self._lock:
+            current = {}
+            for channel in channels:
+                old = self.channels.get(channel.name)
+                current[channel.name] = old if old is not None and old.signature() == channel.signature() else channel
+            self.channels = current
+
+    def active_dates(self, now):
+        today = now.date()
+        start_of_day = datetime.combine(today, datetime.min.time())
+        dates = [today]
+        if now - start_of_day < self.grace:
+            dates.insert(0, today - timedelta(days=1))
+        if start_of_day + timedelta(days=1) - now <= self.prepare_ahead:
+            dates.append(today + timedelta(days=1))
+        return dates
+
+    def next_transition(self, now):
+        start_of_day = datetime.combine(now.date(), datetime.min.time())
+        midnight = start_of_day + timedelta(days=1)
+        candidates = (start_of_day + self.grace, midnight - self.prepare_ahead, midnight, midnight + self.grace)
+        return min(t for t in candidates if t > now)
+
+    def seconds_until_next_transition(self):
+        now = self.clock.now()
+        return max(0.0, (self.next_transition(now) - now).total_seconds())
+
+    def _watch_in_use(self, watch):
+        return any(w is watch for _, w, _ in self._watches.values())
+
+    def _release(self, channel, watch, observer):
+        if self._watch_in_use(watch):
+            observer.remove_handler_for_watch(channel.handler, watch)
+        else:
+            try:
+                observer.unschedule(watch)
+            except KeyError:
+                pass
+
+    def refresh(self):
+        # 현재 시각 기준으로 감시해야 할 (채널, 날짜 폴더) 목록을 만들고, 차이만 Observer에 반영합니다.
+        now = self.clock.now()
+        added, removed = [], []
+        with self._lock:
+            desired = {}
+            for channel in self.channels.values():
+                for day in self.active_dates(now):
+                    desired[(channel.name, channel.folder_for(day))] = channel
+
+            for key, channel in desired.items():
+                existing = self._watches.get(key)
+                if existing is not None and existing[0] is channel:
+                    continue
+                folder = key[1]
+                observer = self.observer_for(channel)
+                try:
+                    os.makedirs(folder, exist_ok=True)
+                    # 같은 폴더를 새 핸들러로 먼저 감시한 뒤 이전 핸들러를 떼어내 이벤트가 빠지지 않게 합니다.
+                    watch = observer.schedule(channel.handler, folder, recursive=False)
+                except OSError as e:
+                    log.error(f" - [{channel.title}] 폴더 감시를 시작할 수 없습니다: {folder}\n{e}")
+                    continue
+                self._watches[key] = (channel, watch, observer)
+                if existing is not None:
+                    if existing[2] is observer:
+                        observer.remove_handler_for_watch(existing[0].handler, existing[1])
+                    else:
+                        self._release(*existing)  # 감시 방식이 바뀐 경우
+                added.append((channel, folder))
+
+            for key in [key for key in self._watches if key not in desired]:
+                channel, watch, observer = self._watches.pop(key)
+                self._release(channel, watch, observer)
+                removed.append((channel, key[1]))
+
+        for channel, folder in removed:
+            log.info(f" - [{channel.title}] 폴더 감시 종료: {folder}")
+        for channel, folder in added:
+            log.info(f" - [{channel.title}] 폴더 감시 중: {folder} -> [{channel.printer_name}]")
+            if self.on_folder_added:
+                self.on_folder_added(channel, folder)
+        return added, removed
+
+    def watched_folders(self):
+        with self._lock:
+            return [folder for _, folder in self._watches]
+
+
+# #####################################################################
+# 8. 모니터링 지표 (Prometheus /metrics)
+# #####################################################################
+METRICS_PREFIX = "label_printer"
+
+def metric_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def metric_labels(**labels):
+    return "{" + ",".join(f'{key}="{metric_label(value)}"' for key, value in labels.items()) + "}"
+
+def format_metric_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render_metrics(service):
+    # 서비스 상태를 Prometheus 텍스트 형식(0.0.4)으로 만듭니다.
+    lines = []
+
+    def family(name, metric_type, help_text):
+        lines.append(f"# HELP {METRICS_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {METRICS_PREFIX}_{name} {metric_type}")
+
+    def sample(name, value, **labels):
+        lines.append(f"{METRICS_PREFIX}_{name}{metric_labels(**labels) if labels else ''} {format_metric_value(value)}")
+
+    def histogram(name, snapshot, **labels):
+        for bound, count in snapshot["buckets"]:
+            sample(f"{name}_bucket", count, **labels, le=format_metric_value(bound))
+        sample(f"{name}_sum", snapshot["sum"], **labels)
+        sample(f"{name}_count", snapshot["count"], **labels)
+
+    stats = service.scheduler.channel_stats()
+    histograms = service.scheduler.channel_histograms()
+
+    family("info", "gauge", "Program version.")
+    sample("info", 1, version=CONFIG.get("APP_VERSION", ""))
+
+    family("labels_total", "counter", "Labels by result (printed, failed, deduplicated, rejected, retried).")
+    for channel, channel_stats in stats.items():
+        for result, key in (("printed", "spooled"), ("failed", "failed"), ("deduplicated", "deduplicated"), ("rejected", "rejected"),
+                            ("retried", "retries")):
+            sample("labels_total", channel_stats[key], channel=channel, result=result)
+
+    family("labels_pending", "gauge", "Labels queued but not yet spooled.")
+    for channel, channel_stats in stats.items():
+        sample("labels_pending", channel_stats["pending"], channel=channel)
+
+    family("label_latency_seconds", "histogram", "Time from file event to spooler EndDoc.")
+    for channel, channel_histograms in histograms.items():
+        histogram("label_latency_seconds", channel_histograms["end_to_end"], channel=channel)
+
+    family("label_latency_quantile_seconds", "gauge", "p50/p95/p99 of recent end-to-end latencies.")
+    for channel, channel_histograms in histograms.items():
+        for key, quantile in (("p50", "0.5"), ("p95", "0.95"), ("p99", "0.99")):
+            sample("label_latency_quantile_seconds", channel_histograms["end_to_end"][key], channel=channel, quantile=quantile)
+
+    family("stage_seconds", "histogram", "Time spent reaching each stage from the previous one.")
+    for channel, channel_histograms in histograms.items():
+        for stage, snapshot in channel_histograms["stages"].items():
+            histogram("stage_seconds", snapshot, channel=channel, stage=stage)
+
+    family("queue_depth", "gauge", "Jobs waiting in each printer queue.")
+    for printer, depth in service.scheduler.queue_depths().items():
+        sample("queue_depth", depth, printer=printer)
+
+    family("printer_healthy", "gauge", "1 if the printer is usable, 0 if offline/jammed/backed up.")
+    statuses = service.printer_monitor.snapshot()
+    for printer, status in statuses.items():
+        sample("printer_healthy", int(status.healthy), printer=printer)
+    family("printer_spool_jobs", "gauge", "Jobs in the Windows spooler queue.")
+    for printer, status in statuses.items():
+        sample("printer_spool_jobs", status.jobs, printer=printer)
+    family("printer_paused", "gauge", "1 while a printer queue is paused waiting for the printer.")
+    paused = set(service.scheduler.paused_printers())
+    for printer in service.scheduler.queue_depths():
+        sample("printer_paused", int(printer in paused), printer=printer)
+
+    polling = service.watch_manager.polling_stats()
+    if polling is not None:
+        family("watch_poll_scans_total", "counter", "Folder scans by the polling watch engine.")
+        sample("watch_poll_scans_total", polling["scans"])
+        family("watch_poll_errors_total", "counter", "Folder scans that failed (share unreachable).")
+        sample("watch_poll_errors_total", polling["errors"])
+        family("watch_poll_failing_folders", "gauge", "Polled folders currently unreachable.")
+        sample("watch_poll_failing_folders", polling["failing"])
+
+    family("readiness_pending", "gauge", "Files waiting for their writer to finish.")
+    sample("readiness_pending", service.readiness.pending())
+    family("readiness_timeouts_total", "counter", "Files that never finished writing.")
+    sample("readiness_timeouts_total", service.readiness.timeout_count)
+
+    cache = get_raster_cache().stats()
+    family("raster_cache_requests_total", "counter", "Raster cache lookups.")
+    sample("raster_cache_requests_total", cache["hits"], result="hit")
+    sample("raster_cache_requests_total", cache["misses"], result="miss")
+    family("raster_cache_bytes", "gauge", "Memory used by cached rasters.")
+    sample("raster_cache_bytes", cache["bytes"])
+
+    sessions = get_print_backend().stats().get("session_cache")
+    if sessions is not None:
+        family("printer_session_requests_total", "counter", "Printer DC session cache lookups.")
+        sample("printer_session_requests_total", sessions["hits"], result="hit")
+        sample("printer_session_requests_total", sessions["misses"], result="miss")
+        family("printer_session_evictions_total", "counter", "Printer DC sessions dropped after a settings change or error.")
+        sample("printer_session_evictions_total", sessions["invalidations"])
+        family("printer_sessions", "gauge", "Open printer DC sessions.")
+        sample("printer_sessions", sessions["sessions"])
+
+    archive = service.archiver.stats()
+    family("archived_labels_total", "counter", "Labels packed from past date folders into archives.")
+    sample("archived_labels_total", archive["archived_files"])
+    family("archive_removed_total", "counter", "Archives deleted after the retention period.")
+    sample("archive_removed_total", archive["removed_archives"])
+
+    pool = service.scheduler.render_pool
+    if pool is not None:
+        render = pool.stats()
+        family("render_pool_labels_total", "counter", "Labels decoded and rendered in the render process pool.")
+        sample("render_pool_labels_total", render["used"], result="used")
+        sample("render_pool_labels_total", render["discarded"], result="discarded")
+        family("render_pool_pending", "gauge", "Labels rendered ahead and not yet printed.")
+        sample("render_pool_pending", render["pending"])
+    return "\n".join(lines) + "\n"
+
+class MetricsServer:
+    # 공장 모니터링(Prometheus)이 각 PC를 수집할 수 있도록 /metrics 를 HTTP로 제공합니다.
+    def __init__(self, render, port, bind="0.0.0.0"):
+        self.render = render
+        self.port = port
+        self.bind = bind
+        self.httpd = None
+        self._thread = None
+
+    def start(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        render = self.render
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                try:
+                    body = render().encode("utf-8")
+                except Exception as e:
+                    log.error(f"오류: 모니터링 지표를 만드는 중 예외가 발생했습니다.\n{e}")
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self.httpd = ThreadingHTTPServer((self.bind, self.port), Handler)
+        except OSError as e:
+            log.error(f"[오류] 모니터링 지표 포트({self.bind}:{self.port})를 열 수 없습니다: {e}")
+            return False
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True)
+        self._thread.start()
+        log.info(f"모니터링 지표 제공: http://{self.bind}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+# #####################################################################
+# 9. 라벨 수신 API (폴더 대신 HTTP로 바로 인쇄 대기열에 넣기)
+# #####################################################################
+class IngestError(Exception):
+    def __init__(self, status, message, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details  # 응답 JSON에 "error"와 함께 넣을 값
+
+class IngestServer:
+    # asyncio HTTP/1.1 서버. 파일을 쓰고 감시 이벤트를 기다리는 대신 요청 본문을 메모리에서 바로 채널의 인쇄 대기열에 넣습니다.
+    #   POST /v1/channels/<채널>/labels   본문: PNG(image/png) 또는 JSON 한 건 ({"template": ..., "fields": {...}, "copies": n})
+    #   POST /v1/channels/<채널>/batch    본문: JSON {"labels": [...]} / 목록, 또는 CSV (text/csv, 첫 줄이 필드 이름)
+    #   POST /v1/channels/<채널>/stream   본문: 한 줄에 JSON 한 건(NDJSON). 받는 대로 한 줄씩 대기열에 넣습니다. (chunked 가능)
+    #   GET  /v1/jobs/<작업 ID>[?wait=초]  작업 상태 (wait: 인쇄가 끝날 때까지 최대 몇 초 기다림)
+    #   GET  /v1/health
+    # JSON 한 건은 템플릿 라벨이거나 {"png_base64": "..."} 이미지이며, "name"으로 로그/저널에 쓸 이름을 줄 수 있습니다.
+    # ?name=<이름>: 라벨 이름 (batch/stream 은 데이터 파일처럼 "<이름>#<행>"). 없으면 작업 ID를 이름으로 씁니다.
+    # batch는 모든 행을 검사한 뒤에 대기열에 넣습니다. 대기열에 넣는 중(또는 stream 도중) 멈추면 그때까지 접수한 작업과
+    # 멈춘 행을 207로 알려 줍니다: {"jobs": [...], "error": ..., "rejected_row": n, "rejected_status": 503}
+    # submit(channel, label, name, stages) -> PrintJob (대기열이 가득 차면 None, 없는 채널이면 KeyError)
+    MAX_JOBS = 10000  # 상태를 조회할 수 있는 최근 작업 수
+
+    def __init__(self, submit, templates, port, bind="127.0.0.1", token="", max_body_mb=None):
+        self.submit = submit
+        self.templates = templates
+        self.port = port
+        self.bind = bind
+        self.token = token
+        self.max_body = int(float(max_body_mb if max_body_mb is not None else CONFIG.get("ingest_max_body_mb", 20)) * 1024 * 1024)
+        self.received = 0
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.loop = None
+        self.server = None
+        self._thread = None
+
+    def start(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="ingest", daemon=True)
+        self._thread.start()
+        ready.wait(10)
+        return self.server is not None
+
+    def _run(self, ready):
+        import asyncio
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(asyncio.start_server(self._handle, self.bind, self.port))
+        except OSError as e:
+            log.error(f"[오류] 라벨 수신 API 포트({self.bind}:{self.port})를 열 수 없습니다: {e}")
+            self.loop.close()
+            ready.set()
+            return
+        self.port = self.server.sockets[0].getsockname()[1]
+        log.info(f"라벨 수신 API: http://{self.bind}:{self.port}/v1/")
+        ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            # 열려 있는 연결(keep-alive)을 정리한 뒤 루프를 닫습니다.
+            self.server.close()
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+    def stop(self):
+        if self.loop is not None and self.server is not None and self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(5)
+
+    def job_info(self, job_id, job):
+        info = {"id": job_id, "name": os.path.basename(job.image_path), "channel": job.channel, "status": job.state,
+                "attempts": job.attempts}
+        if job.printed_on:
+            info["printer"] = job.printed_on
+        if job.error:
+            info["error"] = job.error[1]
+        if job.finished_at is not None:
+            info["latency_ms"] = round(job.end_to_end * 1000, 3)
+        return info
+
+    # -- 요청 처리 --
+    async def _handle(self, reader, writer):
+        import asyncio
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    status, result = await self._dispatch(method, target, headers, reader, writer)
+                except IngestError as e:
+                    status, result = e.status, dict(e.details, error=str(e))
+                    keep_alive = False  # 읽지 않은 본문이 남아 있을 수 있습니다.
+                body = json.dumps(result, ensure_ascii=False).encode("utf-8")
+                writer.write(f"HTTP/1.1 {status} {self.REASONS.get(status, '')}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                             f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                             .encode("latin-1") + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, asyncio.CancelledError):
+            pass  # 연결 끊김/잘못된 요청/서버 종료
+        except Exception as e:
+            log.error(f"오류: 라벨 수신 요청 처리 중 예외가 발생했습니다.\n{e}")
+        finally:
+            writer.close()
+
+    REASONS = {200: "OK", 202: "Accepted", 207: "Multi-Status", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed",
+               411: "Length Required", 413: "Payload Too Large", 415: "Unsupported Media Type", 503: "Service Unavailable"}
+
+    async def _dispatch(self, method, target, headers, reader, writer):
+        path, _, query = target.partition("?")
+        parts = [part for part in path.split("/") if part]
+        if self.token and headers.get("authorization") != f"Bearer {self.token}":
+            raise IngestError(401, "인증 토큰이 올바르지 않습니다.")
+        if parts == ["v1", "health"]:
+            return 200, {"status": "ok", "version": CONFIG.get("APP_VERSION"), "received": self.received}
+        if len(parts) == 3 and parts[:2] == ["v1", "jobs"] and method == "GET":
+            return await self._job_status(parts[2], query)
+        if len(parts) == 4 and parts[:2] == ["v1", "channels"] and parts[3] in ("labels", "batch", "stream"):
+            from urllib.parse import parse_qs
+            if method != "POST":
+                raise IngestError(405, "POST만 사용할 수 있습니다.")
+            if headers.get("expect", "").lower() == "100-continue":
+                writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            channel, kind = parts[2], parts[3]
+            prefix = os.path.basename(parse_qs(query).get("name", [""])[0].replace("\\", "/"))
+            detected_at = time.perf_counter()
+            content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+            if kind == "stream":
+                jobs = await self._stream(channel, headers, reader, prefix)
+            else:
+                body = b"".join([chunk async for chunk in self._body(headers, reader, self.max_body)])
+                items = self._parse_body(kind, content_type, body)
+                # 잘못된 행이 하나라도 있으면 아무것도 넣지 않도록 모든 행을 먼저 라벨로 만듭니다.
+                prepared = [self._prepare_item(item, row, (prefix if kind == "labels" else f"{prefix}#{row}") if prefix else None)
+                            for row, item in enumerate(items, 1)]
+                jobs = []
+                for row, item in enumerate(prepared, 1):
+                    try:
+                        await self._enqueue(channel, item, detected_at, jobs)
+                    except IngestError as e:
+                        if not jobs:
+                            raise
+                        raise self._partial(e, jobs, row) from e
+            return 202, {"jobs": jobs}
+        raise IngestError(404, f"알 수 없는 경로입니다: {path}")
+
+    async def _body(self, headers, reader, limit):
+        # 요청 본문을 받는 대로 조각(bytes)으로 돌려줍니다. Content-Length 또는 chunked 전송.
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            total = 0
+            while True:
+                line = (await reader.readline()).split(b";")[0].strip()
+                try:
+                    size = int(line or b"0", 16)
+                except ValueError:
+                    raise IngestError(400, f"chunk 크기 값이 올바르지 않습니다: {line[:20]!r}") from None
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    return
+                total += size
+                if limit and total > limit:
+                    raise IngestError(413, "요청 본문이 너무 큽니다.")
+                chunk = await reader.readexactly(size)
+                await reader.readexactly(2)
+                yield chunk
+        if "content-length" not in headers:
+            raise IngestError(411, "Content-Length가 필요합니다.")
+        try:
+            remaining = int(headers["content-length"])
+        except ValueError:
+            raise IngestError(400, f"Content-Length 값이 올바르지 않습니다: {headers['content-length']!r}") from None
+        if remaining < 0:
+            raise IngestError(400, f"Content-Length 값이 올바르지 않습니다: {remaining}")
+        if limit and remaining > limit:
+            raise IngestError(413, "요청 본문이 너무 큽니다.")
+        while remaining > 0:
+            chunk = await reader.read(min(remaining, 65536))
+            if not chunk:
+                raise ConnectionError("본문을 다 받기 전에 연결이 끊어졌습니다.")
+            remaining -= len(chunk)
+            yield chunk
+
+    def _parse_body(self, kind, content_type, body):
+        if content_type == "image/png":
+            return [{"png": body}]
+        if content_type == "text/csv":
+            try:
+                text = body.decode(CONFIG.get("data_file_encoding") or "utf-8-sig")
+                return list(csv.DictReader(io.StringIO(text, newline="")))
+            except (UnicodeDecodeError, csv.Error) as e:
+                raise IngestError(400, f"CSV 형식이 올바르지 않습니다: {e}") from e
+        try:
+            document = json.loads(body.decode("utf-8-sig"))
+        except ValueError as e:
+            raise IngestError(400, f"JSON 형식이 올바르지 않습니다: {e}") from e
+        if kind == "batch" and isinstance(document, dict) and isinstance(document.get("labels"), list):
+            template = document.get("template")
+            return [dict(item, template=item.get("template") or template) if template and isinstance(item, dict) else item
+                    for item in document["labels"]]
+        if kind == "batch" and isinstance(document, list):
+            return document
+        if kind == "labels" and isinstance(document, dict):
+            return [document]
+        raise IngestError(400, "요청 본문 형식이 올바르지 않습니다.")
+
+    async def _stream(self, channel, headers, reader, prefix):
+        # NDJSON: 줄이 끝나는 대로 인쇄 대기열에 넣으므로 업로드가 끝나기 전에 인쇄가 시작됩니다.
+        jobs, pending, row = [], b"", 0
+        try:
+            async for chunk in self._body(headers, reader, 0):
+                pending += chunk
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    if line.strip():
+                        row += 1
+                        await self._stream_line(channel, line, row, prefix, jobs)
+                if len(pending) > self.max_body:
+                    row += 1
+                    raise IngestError(413, f"{row}번째 줄이 너무 깁니다.")
+            if pending.strip():
+                row += 1
+                await self._stream_line(channel, pending, row, prefix, jobs)
+        except IngestError as e:
+            if not jobs:
+                raise
+            raise self._partial(e, jobs, row) from e
+        return jobs
+
+    async def _stream_line(self, channel, line, row, prefix, jobs):
+        item = self._prepare_item(self._parse_line(line, row), row, f"{prefix}#{row}" if prefix else None)
+        await self._enqueue(channel, item, time.perf_counter(), jobs)
+
+    @staticmethod
+    def _partial(error, jobs, row):
+        # 이미 접수한 작업 번호와 멈춘 행을 알려 클라이언트가 그 행부터 다시 보내게 합니다. (중복 인쇄 방지)
+        return IngestError(207, str(error), jobs=jobs, rejected_row=row, rejected_status=error.status)
+
+    @staticmethod
+    def _parse_line(line, row):
+        try:
+            item = json.loads(line.decode("utf-8-sig"))
+        except ValueError as e:
+            raise IngestError(400, f"{row}번째 줄의 JSON 형식이 올바르지 않습니다: {e}") from e
+        return item
+
+    @staticmethod
+    def _label_name(name, row):
+        # 라벨 이름은 저널/실패 기록의 파일 이름으로 쓰이므로 폴더 경로("../2024-05-01/A.png" 등)는 받지 않습니다.
+        if not isinstance(name, str) or name in (".", "..") or os.path.basename(name.replace("\\", "/")) != name:
+            raise IngestError(400, f"{row}번째 라벨 이름이 올바르지 않습니다: {name!r}")
+        return name
+
+    def _prepare_item(self, item, row, name=None):
+        # 데이터 한 건을 검사해 라벨로 만듭니다. 반환: (라벨 목록, 이름)
+        import base64
+        if not isinstance(item, dict):
+            raise IngestError(400, f"{row}번째 데이터가 객체가 아닙니다.")
+        if item.get("name"):
+            name = self._label_name(item["name"], row)
+        if "png" in item or "png_base64" in item:
+            try:
+                data = item["png"] if "png" in item else base64.b64decode(item["png_base64"], validate=True)
+            except (ValueError, TypeError) as e:
+                raise IngestError(400, f"{row}번째 png_base64 값이 올바르지 않습니다: {e}") from e
+            if not data.startswith(b"\x89PNG\r\n\x1a\n"):
+                raise IngestError(415, f"{row}번째 데이터가 PNG 이미지가 아닙니다.")
+            labels = [ImageLabel(data)]
+        else:
+            try:
+                _, template_name, fields, copies = data_record(row, {k: v for k, v in item.items() if k != "name"},
+                                                                CONFIG.get("template_default", ""))
+                labels = [self.templates.get(template_name).label(fields)] * copies
+            except (TemplateError, ValueError) as e:
+                raise IngestError(400, str(e)) from e
+        return labels, name
+
+    async def _enqueue(self, channel, item, detected_at, jobs):
+        # _prepare_item으로 만든 라벨을 대기열에 넣고 접수한 작업을 jobs에 더합니다. (도중에 멈춰도 접수한 작업은 jobs에 남음)
+        import asyncio
+        labels, name = item
+        loop = asyncio.get_running_loop()
+        for copy, label in enumerate(labels, 1):
+            job_id = os.urandom(8).hex()
+            label_name = name or f"{job_id}.png"
+            if len(labels) > 1:
+                label_name += f".{copy}"
+            # 대기열이 가득 차면 자리가 날 때까지(print_enqueue_timeout) 기다리므로 이벤트 루프 밖에서 넣습니다.
+            try:
+                job = await loop.run_in_executor(None, self.submit, channel, label, label_name, {"detected": detected_at})
+            except KeyError:
+                raise IngestError(404, f"채널 '{channel}'을 찾을 수 없거나 사용하지 않는 채널입니다.") from None
+            if job is None:
+                raise IngestError(503, "인쇄 대기열이 가득 찼습니다.")
+            with self._lock:
+                self.received += 1
+                self.jobs[job_id] = job
+                while len(self.jobs) > self.MAX_JOBS:
+                    self.jobs.popitem(last=False)
+            jobs.append(self.job_info(job_id, job))
+
+    async def _job_status(self, job_id, query):
+        import asyncio
+        from urllib.parse import parse_qs
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            raise IngestError(404, f"작업 '{job_id}'을 찾을 수 없습니다.")
+        try:
+            wait = min(60.0, float(parse_qs(query).get("wait", ["0"])[0]))
+        except ValueError:
+            raise IngestError(400, "wait 값이 올바르지 않습니다.") from None
+        if wait > 0 and not job.done.is_set():
+            await asyncio.get_running_loop().run_in_executor(None, job.done.wait, wait)
+        return 200, self.job_info(job_id, job)
+
+
+# #####################################################################
+# 10. 감시 서비스 (GUI 없이 감시 -> 인쇄 전체를 실행)
+# #####################################################################
+class WatcherService:
+    # 인쇄 대기열, 저널, 쓰기 완료 감지, 중복 확인, 폴더 감시를 묶은 본체입니다.
+    # App(GUI)은 이 서비스를 화면에 보여주기만 하며, --headless 모드에서는 서비스만 단독으로 실행됩니다.
+    def __init__(self, backend=None, clock=None, observer=None):
+        self.devmodes = {}  # 채널 이름 -> 시스템 프린터 설정(DEVMODE)
+        self.journal = PrintJournal()
+        self.journal.prune(int(CONFIG.get("journal_retention_days", 7)))
+        self.printer_monitor = PrinterMonitor()
+        self.dead_letters = DeadLetterStore()
+        self.scheduler = PrintScheduler(listeners=[self.journal.on_job_stage, self.dead_letters.on_job_stage], backend=backend,
+                                        monitor=self.printer_monitor)
+        self.readiness = FileReadinessTracker()
+        self.dedup = DedupIndex()
+        self.data_files = DataFileExpander(self.scheduler, TemplateStore(), self.journal)
+        self.watch_manager = WatchManager(observer=observer, clock=clock, on_folder_added=self.on_watch_folder_added)
+        self.archiver = DateFolderArchiver(self.journal, self.watch_manager.watched_folders, self.watch_manager.clock)
+        self.metrics = None
+        self.ingest = None
+        self.config_watcher = ConfigFileWatcher(self.apply_config)
+        self.config_version = 0  # 설정이 바뀔 때마다 증가 (GUI가 채널 목록을 다시 읽는 기준)
+        self.status_message = "초기화 중..."
+        self.is_running = False
+        self.reload_requested = threading.Event()
+        self.stopped = threading.Event()
+        self._thread = None
+
+    def set_status(self, message):
+        self.status_message = message
+
+    def build_channels(self):
+        channels = []
+        for config in CONFIG.get("channels", []):
+            name, title = config["name"], config["title"]
+            if not config.get("enabled", True):
+                continue
+            base, printer = config.get("base_folder"), config.get("printer")
+            if base and printer and os.path.isdir(base):
+                backup = config.get("backup_printer", "")
+                handler = LabelPrintHandler(printer, functools.partial(self.devmodes.get, name), self.scheduler,
+                                            self.readiness, self.dedup, channel=name, backup_printer=backup,
+                                            expander=self.data_files)
+                channels.append(WatchChannel(name, title, base, printer, handler, config.get("folder_format"), backup,
+                                             config.get("watch_engine", "native")))
+                self.printer_monitor.watch(printer)
+                self.printer_monitor.watch(backup)
+            else:
+                log.warning(f" - {title} 폴더 설정이 올바르지 않아 감시를 시작할 수 없습니다.")
+        return channels
+
+    def submit_label(self, channel_name, label, name, stages=None):
+        # 수신 API: 파일 없이 받은 라벨을 채널의 인쇄 대기열에 넣습니다. (이름은 "<기준 폴더>/http/<이름>"으로 저널에 기록)
+        config = next((c for c in CONFIG.get("channels", []) if c["name"] == channel_name and c.get("enabled", True)), None)
+        if config is None or not config.get("printer"):
+            raise KeyError(channel_name)
+        path = os.path.join(config.get("base_folder") or "", "http", os.path.basename(name.replace("\\", "/")))
+        return self.scheduler.submit(path, config["printer"], self.devmodes.get(channel_name), channel=channel_name,
+                                     stages=stages, backup_printer=config.get("backup_printer") or None, label=label)
+
+    def reprint_failed(self):
+        # 모든 채널의 _failed 폴더에 있는 라벨을 원래 날짜 폴더로 되돌리고 같은 인쇄 대기열로 다시 보냅니다.
+        count = 0
+        for config in CONFIG.get("channels", []):
+            base, printer = config.get("base_folder"), config.get("printer")
+            if not config.get("enabled", True) or not base or not printer:
+                continue
+            for image_path, info in self.dead_letters.entries(base):
+                path = self.dead_letters.restore(image_path, info)
+                if path is None:
+                    continue
+                # 되돌린 파일의 폴더 감시 이벤트로 한 번 더 인쇄되지 않도록 먼저 중복 목록에 넣습니다.
+                self.dedup.check_and_add(path, namespace=printer)
+                self.scheduler.submit(path, printer, self.devmodes.get(config["name"]), channel=config["name"],
+                                      backup_printer=config.get("backup_printer") or None)
+                count += 1
+        log.info(f"실패 라벨 {count}건을 다시 인쇄합니다.")
+        return count
+
+    def reprint_archived(self, name, channel_name=None, day=None):
+        # 보관(zip)된 라벨을 이름으로 찾아 압축을 풀지 않고 바로 다시 인쇄합니다. 반환: PrintJob 또는 None
+        name = os.path.basename(name.strip())
+        if not name.lower().endswith(LABEL_EXTENSIONS):
+            log.error(f"오류: 다시 인쇄할 수 있는 것은 라벨 이미지({', '.join(LABEL_EXTENSIONS)})뿐입니다: '{name}'")
+            return None
+        for config in CONFIG.get("channels", []):
+            base, printer = config.get("base_folder"), config.get("printer")
+            if not config.get("enabled", True) or not base or not printer or channel_name not in (None, config["name"]):
+                continue
+            found = self.archiver.find(base, name, day)
+            if found is None:
+                continue
+            zip_path, entry, index = found
+            try:
+                data = self.archiver.read_entry(zip_path, entry)
+            except (OSError, zipfile.BadZipFile) as e:
+                log.error(f"오류: 보관 파일에서 '{name}' 라벨을 읽을 수 없습니다.\n{e}")
+                return None
+            log.info(f"보관 라벨 다시 인쇄: '{name}' ({index.get('date')}, 인쇄 상태: {entry.get('status')}) -> '{printer}'")
+            return self.scheduler.submit(os.path.join(base, index.get("folder") or index.get("date", ""), name), printer,
+                                         self.devmodes.get(config["name"]), channel=config["name"],
+                                         backup_printer=config.get("backup_printer") or None, label=ImageLabel(data))
+        log.error(f"오류: 보관된 라벨 중 '{name}'을 찾을 수 없습니다.")
+        return None
+
+    def on_watch_folder_added(self, channel, folder):
+        channel.handler.backfill(folder, self.journal)
+
+    def start(self):
+        self.is_running = True
+        self.printer_monitor.start()
+        metrics_port = int(CONFIG.get("metrics_port", 0) or 0)
+        if metrics_port:
+            self.metrics = MetricsServer(functools.partial(render_metrics, self), metrics_port, CONFIG.get("metrics_bind", "0.0.0.0"))
+            self.metrics.start()
+        ingest_port = int(CONFIG.get("ingest_port", 0) or 0)
+        if ingest_port:
+            self.ingest = IngestServer(self.submit_label, self.data_files.templates, ingest_port,
+                                       CONFIG.get("ingest_bind", "127.0.0.1"), CONFIG.get("ingest_token", ""))
+            self.ingest.start()
+        self.archiver.start()
+        self._thread = threading.Thread(target=self.monitoring_loop, name="monitoring", daemon=True)
+        self._thread.start()
+
+    def reload(self):
+        # 설정이 바뀌었을 때 호출: 바뀐 채널만 다시 설정합니다.
+        self.reload_requested.set()
+
+    # 프로그램을 다시 시작하지 않고 바로 적용되는 설정
+    # - apply_config가 실행 중인 객체에 다시 넣어 주거나 채널을 다시 만들어 적용하는 설정
+    APPLIED_CONFIG_KEYS = ("channels", "log_level", "dedup_ttl_seconds", "dedup_max_entries", "dedup_by_content",
+                           "ready_min_delay_ms", "ready_max_delay_ms", "ready_stable_ms", "ready_timeout_seconds")
+    # - 쓸 때마다 CONFIG에서 읽는 설정
+    #   (archive_*: DateFolderArchiver.run_once/throttle, raster_mode: load_label_raster/RenderPool.prerender,
+    #    raw_printers: raw_printer_config, printer_max_spool_jobs: Win32PrinterStatusSource.query,
+    #    retry_policies: retry_policy, template_drop_files: LabelPrintHandler,
+    #    template_default/data_file_encoding: 데이터 파일/수신 API, template_default_font: LabelTemplate.draw_element)
+    LIVE_CONFIG_KEYS = ("archive_after_days", "archive_retention_days", "archive_io_mb_per_sec", "raster_mode",
+                        "raw_printers", "printer_max_spool_jobs", "retry_policies", "template_drop_files",
+                        "template_default", "template_default_font", "data_file_encoding")
+    HOT_CONFIG_KEYS = APPLIED_CONFIG_KEYS + LIVE_CONFIG_KEYS
+
+    def apply_config(self, new_config):
+        # 새 설정과 현재 CONFIG를 비교해 바뀐 항목만 적용합니다. 채널은 바뀐 채널만 다시 감시합니다.
+        new_config = with_cli_overrides(new_config)
+        changed = sorted(key for key in set(new_config) | set(CONFIG) if new_config.get(key) != CONFIG.get(key))
+        if not changed:
+            return changed
+        old_channels = {c["name"]: c for c in CONFIG.get("channels", [])}
+        replace_config(new_config)
+        self.config_version += 1
+        apply_log_level()
+        self.dedup.ttl = float(CONFIG["dedup_ttl_seconds"])
+        self.dedup.max_entries = int(CONFIG["dedup_max_entries"])
+        self.dedup.by_content = bool(CONFIG["dedup_by_content"])
+        self.readiness.min_delay = float(CONFIG["ready_min_delay_ms"]) / 1000.0
+        self.readiness.max_delay = float(CONFIG["ready_max_delay_ms"]) / 1000.0
+        self.readiness.stable_time = float(CONFIG["ready_stable_ms"]) / 1000.0
+        self.readiness.timeout = float(CONFIG["ready_timeout_seconds"])
+        if "channels" in changed:
+            new_channels = {c["name"]: c for c in CONFIG["channels"]}
+            names = sorted(name for name in set(old_channels) | set(new_channels) if old_channels.get(name) != new_channels.get(name))
+            log.info(f"[설정 변경] 바뀐 채널만 다시 설정합니다: {', '.join(names)}")
+            self.reload()
+        restart_keys = [key for key in changed if key not in self.HOT_CONFIG_KEYS]
+        if restart_keys:
+            log.info(f"[설정 변경] 다음 설정은 프로그램을 다시 시작하면 적용됩니다: {', '.join(restart_keys)}")
+        return changed
+
+    def monitoring_loop(self):
+        log.info("--- 자동 라벨 출력 프로그램 시작 ---")
+        self.watch_manager.set_channels(self.build_channels())
+        self.watch_manager.start()
+        try:
+            self.config_watcher.schedule(self.watch_manager.observer)
+        except OSError as e:
+            log.warning(f"경고: '{CONFIG_FILE}' 변경 감시를 시작할 수 없습니다. ({e})")
+        first = True
+        while self.is_running:
+            if self.reload_requested.is_set():
+                self.reload_requested.clear()
+                log.info("[설정 변경] 감시 폴더 설정을 다시 적용합니다.")
+                self.watch_manager.set_channels(self.build_channels())
+
+            self.watch_manager.refresh()
+            self.archiver.request()  # 날짜가 바뀌어 감시가 끝난 폴더가 있으면 보관
+            today_str = self.watch_manager.clock.now().strftime(DATE_FOLDER_FORMAT)
+            if self.watch_manager.watched_folders():
+                self.set_status(f"모니터링 중... (감시 날짜: {today_str})")
+            else:
+                self.set_status("오류: 감시할 폴더가 설정되지 않았습니다.")
+                log.warning("감시할 폴더가 설정되지 않았습니다. '인쇄 설정' 탭에서 설정을 확인해주세요.")
+            if first:
+                first = False
+                now = time.perf_counter()
+                log.info(f"시작 소요 시간: {(now - PROCESS_STARTED_AT) * 1000:.0f} ms "
+                      f"(모듈 로딩 {(MODULE_LOADED_AT - PROCESS_STARTED_AT) * 1000:.0f} ms)")
+
+            # 다음 날짜 전환 시각(자정 전 준비/자정/유예 종료)까지 기다립니다. 설정이 바뀌면 바로 깨어납니다.
+            # 시스템 시각 변경이나 절전 복귀에 대비해 최대 5분마다 다시 확인합니다.
+            self.reload_requested.wait(min(self.watch_manager.seconds_until_next_transition() + 0.5, 300))
+
+    def stop(self):
+        if self.stopped.is_set():
+            return
+        log.info("프로그램 종료 중...")
+        self.is_running = False
+        self.reload_requested.set()
+        self.watch_manager.stop()
+        self.config_watcher.stop()
+        self.printer_monitor.stop()
+        if self.metrics:
+            self.metrics.stop()
+        if self.ingest:
+            self.ingest.stop()
+        self.archiver.stop()
+        self.readiness.stop()
+        # 대기열에 남은 라벨은 저널에 기록되어 있으므로 다음 실행 때 다시 인쇄됩니다.
+        self.scheduler.shutdown(wait=False)
+        shutdown_render_pool()
+        get_print_backend().close()
+        self.journal.close()
+        self.stopped.set()
+
+    def run_forever(self):
+        # 헤드리스 실행: 종료 신호(Ctrl+C, SIGTERM, Windows 콘솔 종료 등)를 받으면 정리 후 끝냅니다.
+        def handle_signal(signum, frame):
+            log.info(f"종료 신호를 받았습니다. ({signum})")
+            self.is_running = False
+            self.reload_requested.set()
+        for name in ("SIGINT", "SIGTERM", "SIGBREAK"):
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), handle_signal)
+        self.start()
+        # Windows에서는 메인 스레드가 잠들어 있으면 신호 처리가 늦어지므로 짧게 나눠 기다립니다.
+        while self.is_running:
+            time.sleep(0.5)
+        self.stop()
+
+def run_headless():
+    global HEADLESS
+    HEADLESS = True
+    setup_logging(console=True)
+    service = WatcherService()
+    auto_update = bool(CONFIG.get("headless_auto_update", False))
+    threading.Thread(target=threaded_update_check, args=(lambda new_version: auto_update,), daemon=True).start()
+    service.run_forever()
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="라벨 자동 출력기")
+    parser.add_argument("--headless", action="store_true", help="GUI/트레이 아이콘 없이 감시와 인쇄만 실행합니다.")
+    parser.add_argument("--backend", choices=sorted(PRINT_BACKENDS), help="인쇄 백엔드를 지정합니다. (config.json의 print_backend 대신 사용)")
+    args = parser.parse_args(argv)
+    quarantine_broken_config()
+    save_config(CONFIG)
+    if args.backend:
+        override_config("print_backend", args.backend)
+    if args.headless:
+        return run_headless()
+    # GUI(tkinter)는 여기서만 불러옵니다. python label_printer_watcher.py 로 실행하면 이 모듈은 __main__이므로
+    # GUI 모듈이 이 파일을 한 번 더 실행하지 않도록(CONFIG 등이 둘로 나뉨) 같은 모듈로 등록해 둡니다.
+    sys.modules.setdefault("label_printer_watcher", sys.modules[__name__])
+    try:
+        from label_printer_gui import App
+    except ImportError as e:
+        log.error(f"오류: tkinter를 사용할 수 없어 GUI를 실행할 수 없습니다. --headless 옵션으로 실행해주세요. ({e})")
+        return 1
+    app = App()
+    app.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()  # exe(PyInstaller)로 배포할 때 렌더링 프로세스(render_processes) 실행에 필요
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,72 @@
+# 날짜 폴더 보관: 지난 날짜 폴더를 zip + 색인(index.json)으로 묶고, 색인 위치로 라벨 하나를 그대로 읽어 냅니다.
+# 원본 폴더는 보관 파일을 다시 읽어 확인한 뒤에만 지웁니다.
+import os
+import zipfile
+from datetime import date
+
+import pytest
+
+import label_printer_watcher as lpw
+
+DAY = date(2024, 5, 1)
+
+
+@pytest.fixture
+def day_folder(tmp_path):
+    folder = tmp_path / "2024-05-01"
+    folder.mkdir()
+    files = {"A.png": b"\x89PNG\r\n\x1a\n" + os.urandom(4096), "B.png": b"\x89PNG\r\n\x1a\n" + os.urandom(100),
+             "rows.csv": b"name,qty\n" + b"A,1\n" * 500}
+    for name, data in files.items():
+        (folder / name).write_bytes(data)
+    return tmp_path, folder, files
+
+
+def test_archived_label_is_read_back_by_index(day_folder, monkeypatch):
+    base, folder, files = day_folder
+    archiver = lpw.DateFolderArchiver()
+    verified = []
+    read_entry = lpw.DateFolderArchiver.read_entry
+
+    def checking_read_entry(zip_path, entry):
+        verified.append(all((folder / name).exists() for name in files))
+        return read_entry(zip_path, entry)
+
+    monkeypatch.setattr(lpw.DateFolderArchiver, "read_entry", staticmethod(checking_read_entry))
+    archiver.archive_folder(str(base), DAY, str(folder))
+
+    # 확인(색인으로 모든 파일 다시 읽기)하는 동안에는 원본이 남아 있고, 끝난 뒤에 폴더가 지워집니다.
+    assert verified == [True] * len(files)
+    assert not folder.exists()
+    archive_dir = base / "_archive"
+    assert sorted(os.listdir(archive_dir)) == ["2024-05-01.index.json", "2024-05-01.zip"]
+
+    monkeypatch.setattr(lpw.DateFolderArchiver, "read_entry", staticmethod(read_entry))
+    zip_path, entry, index = archiver.find(str(base), "A.png")
+    assert zip_path == str(archive_dir / "2024-05-01.zip") and index["date"] == "2024-05-01"
+    assert entry["method"] == zipfile.ZIP_STORED and entry["status"] == "unknown"
+    assert archiver.read_entry(zip_path, entry) == files["A.png"]
+    _, entry, _ = archiver.find(str(base), "rows.csv", day="2024-05-01")
+    assert entry["method"] == zipfile.ZIP_DEFLATED and entry["size"] < entry["length"]
+    assert archiver.read_entry(zip_path, entry) == files["rows.csv"]
+    assert archiver.stats()["archived_files"] == 3
+
+
+def test_folder_is_kept_when_archive_cannot_be_verified(day_folder, monkeypatch):
+    base, folder, files = day_folder
+    archiver = lpw.DateFolderArchiver()
+
+    def corrupt_read_entry(zip_path, entry):
+        raise zipfile.BadZipFile("CRC가 맞지 않습니다")
+
+    monkeypatch.setattr(lpw.DateFolderArchiver, "read_entry", staticmethod(corrupt_read_entry))
+    archiver.archive_folder(str(base), DAY, str(folder))
+    assert sorted(os.listdir(folder)) == sorted(files)
+    assert os.listdir(base / "_archive") == []
+    assert archiver.stats()["archived_folders"] == 0
+
+    # 다음 확인 때 처음부터 다시 묶습니다.
+    monkeypatch.undo()
+    archiver.archive_folder(str(base), DAY, str(folder))
+    assert not folder.exists()
+    assert sorted(os.listdir(base / "_archive")) == ["2024-05-01.index.json", "2024-05-01.zip"]
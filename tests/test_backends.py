@@ -0,0 +1,33 @@
+# 인쇄 백엔드: 프린터 없이 print_label을 그대로 거쳐 file 백엔드는 인쇄할 페이지를 PNG로 남기고, null 백엔드는 개수만 셉니다.
+import os
+
+from PIL import Image
+
+import label_printer_watcher as lpw
+
+
+def make_label(path, size=(200, 50)):
+    Image.new("L", size, 0).save(path)
+    return str(path)
+
+
+def test_file_backend_saves_page_with_label_centered(tmp_path):
+    backend = lpw.FilePrintBackend(str(tmp_path / "out"), page_size=(400, 200))
+    assert lpw.print_label(make_label(tmp_path / "A.png"), "P", backend=backend)
+
+    assert os.listdir(tmp_path / "out") == ["000001_A.png"]
+    with Image.open(tmp_path / "out" / "000001_A.png") as page:
+        assert page.size == (400, 200)
+        # 4:1 라벨은 비율을 유지해 400x100으로 늘리고 세로 가운데(50~149)에 놓습니다.
+        assert page.getpixel((200, 100)) == (0, 0, 0)
+        assert page.getpixel((200, 40)) == page.getpixel((200, 160)) == (255, 255, 255)
+    assert backend.submitted == 1
+
+
+def test_null_backend_counts_pages_and_reports_missing_files(tmp_path):
+    backend = lpw.NullPrintBackend(page_size=(400, 200))
+    paths = [make_label(tmp_path / "A.png"), str(tmp_path / "missing.png"), make_label(tmp_path / "B.png", (50, 50))]
+    jobs = [lpw.PrintJob(path, "P") for path in paths]
+    assert lpw.print_label_batch(paths, "P", backend=backend, jobs=jobs) == [True, False, True]
+    assert backend.submitted == 2
+    assert jobs[1].error[0] == "missing"
@@ -0,0 +1,84 @@
+# 설정: 잘못된 채널 항목이나 값이 있어도 프로그램이 멈추지 않고 기본값으로 실행합니다.
+# 예전 잔량/불량 설정은 채널 목록으로 옮기고, 채널 이름이 겹치면 서로 다른 이름으로 바꿉니다.
+import os
+import subprocess
+import sys
+
+import label_printer_watcher as lpw
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_non_dict_channel_entries_use_defaults():
+    config = lpw.build_config({"channels": ["line1", {"name": "line2", "printer": "P"}]})
+    assert [channel["name"] for channel in config["channels"]] == ["channel1", "line2"]
+    assert config["channels"][0]["base_folder"] == ""
+    assert config["channels"][1]["printer"] == "P"
+
+
+def test_legacy_remnant_and_defective_settings_become_channels():
+    config = lpw.build_config({"remnant_base_folder": "C:/labels/remnant", "remnant_printer": "P1",
+                               "defective_base_folder": "C:/labels/defective", "defective_printer": "P2"})
+    assert [(c["name"], c["title"], c["base_folder"], c["printer"]) for c in config["channels"]] == [
+        ("remnant", "잔량", "C:/labels/remnant", "P1"), ("defective", "불량", "C:/labels/defective", "P2")]
+    assert "remnant_printer" not in config and "defective_base_folder" not in config
+
+
+def test_channels_get_unique_names_and_valid_values():
+    config = lpw.build_config({"channels": [
+        {"name": "line", "printer": "P1"}, {"name": "line", "printer": "P2", "watch_engine": "inotify"},
+        {"printer": "P3", "folder_format": "", "enabled": "yes"}]})
+    channels = config["channels"]
+    assert [c["name"] for c in channels] == ["line", "line_", "channel3"]
+    assert [c["printer"] for c in channels] == ["P1", "P2", "P3"]
+    assert channels[1]["watch_engine"] == "native"
+    assert channels[2]["folder_format"] == "%Y-%m-%d" and channels[2]["enabled"] is True
+
+
+def test_hot_config_keys_are_known_settings():
+    assert set(lpw.WatcherService.HOT_CONFIG_KEYS) <= set(lpw.DEFAULT_CONFIG) | {"channels"}
+
+
+def test_live_settings_do_not_ask_for_restart(tmp_path, monkeypatch, caplog):
+    monkeypatch.setitem(lpw.CONFIG, "journal_path", str(tmp_path / "journal.db"))
+    service = lpw.WatcherService()
+    new_config = dict(lpw.CONFIG, raster_mode="1", printer_max_spool_jobs=5,
+                      retry_policies={"printer": {"max_attempts": 9, "base_seconds": 1, "max_seconds": 5}})
+    try:
+        with caplog.at_level("INFO", logger=lpw.log.name):
+            changed = service.apply_config(new_config)
+        assert changed == ["printer_max_spool_jobs", "raster_mode", "retry_policies"]
+        assert lpw.retry_policy("printer")["max_attempts"] == 9
+        assert "다시 시작하면" not in caplog.text
+    finally:
+        service.journal.close()
+        lpw.replace_config(lpw.build_config({}))
+
+
+def test_cli_override_survives_reload_and_is_not_saved(monkeypatch):
+    monkeypatch.setattr(lpw, "CLI_OVERRIDES", {})
+    monkeypatch.setattr(lpw, "CLI_FILE_VALUES", {})
+    monkeypatch.setitem(lpw.CONFIG, "print_backend", "gdi")
+    lpw.override_config("print_backend", "null")
+    assert lpw.CONFIG["print_backend"] == "null"
+
+    reloaded = lpw.with_cli_overrides(lpw.build_config({"print_backend": "file"}))
+    assert reloaded["print_backend"] == "null"
+    assert lpw.without_cli_overrides(reloaded)["print_backend"] == "file"
+
+
+def test_broken_config_is_left_alone_on_import_and_quarantined_by_main(tmp_path, monkeypatch):
+    (tmp_path / "config.json").write_text("{ broken", encoding="utf-8")
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    code = "import label_printer_watcher as lpw; print(lpw.CONFIG['print_backend'])"
+    result = subprocess.run([sys.executable, "-c", code], cwd=str(tmp_path), env=env, capture_output=True, text=True,
+                            timeout=60)
+    assert result.stdout.strip() == lpw.DEFAULT_CONFIG["print_backend"]
+    assert (tmp_path / "config.json").read_text(encoding="utf-8") == "{ broken"
+    assert not (tmp_path / "config.json.broken").exists()
+
+    monkeypatch.chdir(tmp_path)
+    assert lpw.quarantine_broken_config()
+    assert (tmp_path / "config.json.broken").read_text(encoding="utf-8") == "{ broken"
+    assert not (tmp_path / "config.json").exists()
+    assert not lpw.quarantine_broken_config()  # 파일이 없으면 옮길 것도 없음
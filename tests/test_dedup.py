@@ -0,0 +1,48 @@
+# 중복 인쇄 방지: 같은 라벨은 TTL 동안 프린터(namespace)별로 한 번만 인쇄하고, 기억하는 항목 수는 max_entries로 제한합니다.
+# 인쇄한 뒤 내용이 바뀌지 않은 파일에 늦게 들어온 이벤트는 TTL이 지나도 다시 인쇄하지 않습니다.
+import os
+
+import label_printer_watcher as lpw
+
+
+def test_unchanged_file_is_not_reprinted_after_ttl(tmp_path):
+    label = tmp_path / "A.png"
+    label.write_bytes(b"label-1")
+    dedup = lpw.DedupIndex(ttl=10, max_entries=100, by_content=False)
+    assert dedup.check_and_add(str(label), "P", now=0, signature=lpw.file_signature(str(label)))
+
+    # 백신 검사/속성 변경 등으로 TTL이 지난 뒤 이벤트가 다시 들어온 경우
+    assert not dedup.check_and_add(str(label), "P", now=60, signature=lpw.file_signature(str(label)))
+
+    # 내용이 실제로 바뀐 경우에는 다시 인쇄합니다.
+    label.write_bytes(b"label-2-longer")
+    stat = os.stat(label)
+    os.utime(label, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert dedup.check_and_add(str(label), "P", now=61, signature=lpw.file_signature(str(label)))
+
+
+def test_path_is_forgotten_after_ttl_and_kept_per_printer():
+    dedup = lpw.DedupIndex(ttl=10, max_entries=100, by_content=False)
+    assert dedup.check_and_add("A.png", "P1", now=0)
+    assert not dedup.check_and_add("A.png", "P1", now=9.9)
+    assert dedup.check_and_add("A.png", "P2", now=9.9)  # 다른 프린터는 따로 셉니다.
+    assert dedup.check_and_add("A.png", "P1", now=10)
+    assert len(dedup) == 2
+    stats = dedup.stats()
+    assert (stats["accepted"], stats["suppressed_by_path"]) == (3, 1)
+
+
+def test_same_content_under_another_name_and_entry_limit(tmp_path):
+    for name in ("A.png", "copy of A.png"):
+        (tmp_path / name).write_bytes(b"label-1")
+    dedup = lpw.DedupIndex(ttl=10, max_entries=4, by_content=True)
+    assert dedup.check_and_add(str(tmp_path / "A.png"), "P", now=0)
+    assert not dedup.check_and_add(str(tmp_path / "copy of A.png"), "P", now=1)
+    assert dedup.stats()["suppressed_by_content"] == 1
+
+    # 항목(경로 + 내용)이 max_entries를 넘으면 가장 오래된 것부터 잊습니다.
+    for n in range(3):
+        (tmp_path / f"{n}.png").write_bytes(b"label-%d" % (n + 2))
+        assert dedup.check_and_add(str(tmp_path / f"{n}.png"), "P", now=2)
+    assert len(dedup) == 4 and dedup.stats()["evicted"] == 4
+    assert dedup.check_and_add(str(tmp_path / "copy of A.png"), "P", now=3)
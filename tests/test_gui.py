@@ -0,0 +1,24 @@
+# GUI 분리: label_printer_watcher만 import(--headless 포함)하면 tkinter를 읽지 않고, App은 GUI 모듈에서 가져옵니다.
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_watcher_does_not_load_tkinter(tmp_path):
+    code = "import sys, label_printer_watcher; print('tkinter' in sys.modules)"
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, "-c", code], cwd=str(tmp_path), env=env, capture_output=True, text=True,
+                            timeout=60)
+    assert result.stdout.strip() == "False"
+
+
+def test_app_is_a_module_level_tk_class():
+    tk = pytest.importorskip("tkinter")
+    import label_printer_gui
+    import label_printer_watcher as lpw
+    assert issubclass(label_printer_gui.App, tk.Tk)
+    assert label_printer_gui.CONFIG is lpw.CONFIG
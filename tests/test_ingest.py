@@ -0,0 +1,137 @@
+# 라벨 수신 API: 읽을 수 없는 CSV 본문은 서버 오류(500)가 아니라 400과 원인으로 응답합니다.
+# 폴더 경로가 들어간 라벨 이름은 받지 않고, 파일 없이 받은 라벨이 실패하면 실패 기록만 남깁니다.
+# batch는 모든 행을 검사한 뒤에 넣고, 도중에 멈추면 이미 접수한 작업을 207로 알려 다시 보낼 때 중복 인쇄되지 않게 합니다.
+import http.client
+import json
+import os
+import socket
+
+import pytest
+
+import label_printer_watcher as lpw
+
+
+PNG_BASE64 = "iVBORw0KGgoAAAA="  # PNG 시그니처로 시작하는 데이터
+
+
+@pytest.fixture
+def server():
+    submitted = []
+    server = lpw.IngestServer(lambda *args: submitted.append(args), lpw.TemplateStore(), 0)
+    assert server.start()
+    yield server, submitted
+    server.stop()
+
+
+@pytest.fixture
+def accepting_server():
+    # 처음 accept건만 접수하고 그 뒤로는 대기열이 가득 찬 것처럼 None을 돌려줍니다.
+    submitted = []
+
+    def submit(channel, label, name, stages):
+        if len(submitted) >= server.accept:
+            return None
+        submitted.append(name)
+        return lpw.PrintJob(name, "P", channel=channel, label=label)
+
+    server = lpw.IngestServer(submit, lpw.TemplateStore(), 0)
+    server.accept = 100
+    assert server.start()
+    yield server, submitted
+    server.stop()
+
+
+def post(server, path, body, content_type):
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    try:
+        conn.request("POST", path, body=body, headers={"Content-Type": content_type})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def post_csv(server, body):
+    return post(server, "/v1/channels/line1/batch", body, "text/csv")
+
+
+@pytest.mark.parametrize("body", [
+    b"name,qty\n\xff\xfe,1\n",                     # UTF-8이 아닌 바이트
+    b"name\n\"" + b"x" * (200 * 1024) + b"\"\n",  # 필드 크기 제한(csv.field_size_limit) 초과
+])
+def test_unreadable_csv_body_is_bad_request(server, body):
+    server, submitted = server
+    status, result = post_csv(server, body)
+    assert status == 400
+    assert result["error"].startswith("CSV 형식이 올바르지 않습니다")
+    assert submitted == []
+
+
+@pytest.mark.parametrize("name", ["../2024-05-01/A.png", "..\\2024-05-01\\A.png", "..", "/tmp/A.png"])
+def test_label_name_with_folder_is_rejected(server, name):
+    server, submitted = server
+    body = json.dumps({"name": name, "png_base64": PNG_BASE64}).encode()
+    status, result = post(server, "/v1/channels/line1/labels", body, "application/json")
+    assert status == 400
+    assert "라벨 이름" in result["error"]
+    assert submitted == []
+
+
+def test_failed_in_memory_label_only_leaves_sidecar(tmp_path):
+    # 이름이 날짜 폴더의 파일과 같아도 파일 없이 받은 라벨이 실패했다고 그 파일을 _failed로 옮기지 않습니다.
+    folder = tmp_path / "2024-05-01"
+    folder.mkdir()
+    label = folder / "A.png"
+    label.write_bytes(b"png")
+    dead_letters = lpw.DeadLetterStore()
+    job = lpw.PrintJob(str(label), "P", label=lpw.ImageLabel(b"png"))
+    job.error = ("printer", "StartDoc 실패")
+
+    target = dead_letters.move(job)
+    assert label.read_bytes() == b"png"
+    assert target == str(tmp_path / "_failed" / "A.png") and not os.path.exists(target)
+    with open(target + dead_letters.SIDECAR_SUFFIX, encoding="utf-8") as f:
+        assert json.load(f)["error_class"] == "printer"
+    # 같은 이름이 다시 실패하면 기록을 덮어쓰지 않고 새 이름으로 남깁니다.
+    assert dead_letters.move(job) == str(tmp_path / "_failed" / "A (2).png")
+    assert dead_letters.moved == 2
+
+
+def test_batch_with_invalid_row_submits_nothing(accepting_server):
+    server, submitted = accepting_server
+    body = json.dumps([{"png_base64": PNG_BASE64}, {"png_base64": "not base64!"}, {"png_base64": PNG_BASE64}]).encode()
+    status, result = post(server, "/v1/channels/line1/batch", body, "application/json")
+    assert status == 400 and "2번째" in result["error"]
+    assert submitted == []
+
+
+def test_batch_stopped_midway_reports_accepted_jobs(accepting_server):
+    server, submitted = accepting_server
+    server.accept = 2
+    body = json.dumps([{"png_base64": PNG_BASE64, "name": f"{n}.png"} for n in range(1, 5)]).encode()
+    status, result = post(server, "/v1/channels/line1/batch", body, "application/json")
+    assert status == 207
+    assert [job["name"] for job in result["jobs"]] == ["1.png", "2.png"] == submitted
+    assert result["rejected_row"] == 3 and result["rejected_status"] == 503
+
+
+def test_stream_stopped_midway_reports_accepted_jobs(accepting_server):
+    server, submitted = accepting_server
+    body = f'{{"png_base64": "{PNG_BASE64}"}}\n{{"png_base64": "{PNG_BASE64}"}}\n{{broken\n'.encode()
+    status, result = post(server, "/v1/channels/line1/stream?name=A", body, "application/x-ndjson")
+    assert status == 207
+    assert [job["name"] for job in result["jobs"]] == ["A#1", "A#2"] == submitted
+    assert result["rejected_row"] == 3 and result["rejected_status"] == 400
+
+
+@pytest.mark.parametrize("length", ["abc", "-1"])
+def test_invalid_content_length_is_bad_request(server, length):
+    server, submitted = server
+    with socket.create_connection(("127.0.0.1", server.port), timeout=5) as sock:
+        sock.sendall(f"POST /v1/channels/line1/labels HTTP/1.1\r\nHost: x\r\nContent-Length: {length}\r\n\r\n".encode())
+        response = b""
+        while chunk := sock.recv(65536):
+            response += chunk
+    assert response.startswith(b"HTTP/1.1 400 ")
+    assert "Content-Length" in json.loads(response.split(b"\r\n\r\n", 1)[1])["error"]
+    assert submitted == []
@@ -0,0 +1,90 @@
+# 인쇄 저널: 대기열이 가득 차 넣지 못한 라벨(rejected)은 인쇄가 끝난 것으로 보지 않고 backfill로 다시 인쇄합니다.
+# 종료 중이라 재시도를 예약하지 못한 라벨도 같은 방법으로 다음 실행 때 다시 인쇄합니다.
+import os
+import threading
+
+import pytest
+
+import label_printer_watcher as lpw
+
+
+def make_job(path, stage):
+    job = lpw.PrintJob(path, "P")
+    job.mark(stage)
+    return job
+
+
+def test_rejected_label_is_recovered_by_backfill(tmp_path):
+    journal = lpw.PrintJournal(str(tmp_path / "journal.db"))
+    journal.created = 0  # 저널보다 먼저 만든 파일도 대상으로
+    folder = tmp_path / "2024-05-01"
+    folder.mkdir()
+    for name in ("1.png", "2.png", "3.png"):
+        (folder / name).write_bytes(b"png")
+    for name, stage in (("1.png", "spooled"), ("2.png", "failed"), ("3.png", "rejected")):
+        journal.on_job_stage(make_job(str(folder / name), "queued"), "queued")
+        journal.on_job_stage(make_job(str(folder / name), stage), stage)
+
+    recovered = []
+    assert lpw.backfill_folder(str(folder), journal, recovered.append) == 1
+    assert [os.path.basename(path) for path in recovered] == ["3.png"]
+    journal.close()
+
+
+@pytest.mark.parametrize("stop", ["shutdown", "timer"])
+def test_failure_during_shutdown_is_left_for_backfill(tmp_path, stop):
+    # 종료 중(스케줄러 닫힘 또는 재시도 타이머 정지)에 실패한 라벨은 failed/_failed가 아니라 seen으로 남습니다.
+    journal = lpw.PrintJournal(str(tmp_path / "journal.db"))
+    journal.created = 0
+    dead_letters = lpw.DeadLetterStore()
+    folder = tmp_path / "2024-05-01"
+    folder.mkdir()
+    label = folder / "1.png"
+    label.write_bytes(b"png")
+    scheduler = lpw.PrintScheduler(print_func=lambda *args, **kwargs: False)
+    job = lpw.PrintJob(str(label), "P")
+    job.listeners = [journal.on_job_stage, dead_letters.on_job_stage]
+    job.mark("queued")
+    job.attempts = 1
+    job.error = ("printer", "StartDoc 실패")
+    if stop == "shutdown":
+        scheduler.shutdown()
+    else:
+        scheduler.retry_timer.stop()
+
+    assert scheduler.retry_later(job)
+    assert label.exists() and dead_letters.moved == 0
+    assert journal.states_for_folder(str(folder)) == {"1.png": "seen"}
+    recovered = []
+    assert lpw.backfill_folder(str(folder), journal, recovered.append) == 1
+    journal.close()
+
+
+def test_backfill_again_skips_labels_still_queued(tmp_path):
+    # 날짜가 바뀌거나 채널 설정이 바뀌어 backfill이 다시 실행되어도 대기열/인쇄 중인 라벨은 다시 넣지 않습니다.
+    journal = lpw.PrintJournal(str(tmp_path / "journal.db"))
+    journal.created = 0
+    folder = tmp_path / "2024-05-01"
+    folder.mkdir()
+    for name in ("1.png", "2.png"):
+        (folder / name).write_bytes(b"png")
+    release = threading.Event()
+    scheduler = lpw.PrintScheduler(print_func=lambda *args, **kwargs: release.wait(10), listeners=[journal.on_job_stage])
+    readiness = lpw.FileReadinessTracker()
+    handler = lpw.LabelPrintHandler("P", lambda: None, scheduler, readiness, lpw.DedupIndex(ttl=0))
+    try:
+        job = scheduler.submit(str(folder / "1.png"), "P")
+        assert journal.states_for_folder(str(folder)) == {"1.png": "seen"}
+        tracked = []
+        handler._track = lambda path, is_directory=False: tracked.append(os.path.basename(path))
+        assert handler.backfill(str(folder), journal) == 1
+        assert tracked == ["2.png"]
+
+        release.set()
+        assert job.done.wait(5)
+        assert not scheduler.is_in_flight(str(folder / "1.png"))
+    finally:
+        release.set()
+        readiness.stop()
+        scheduler.shutdown()
+        journal.close()
@@ -0,0 +1,76 @@
+# 모니터링 지표: /metrics 는 Prometheus 텍스트 형식(0.0.4)으로 채널별 인쇄 결과와 누적 지연 히스토그램을 제공합니다.
+import re
+import urllib.error
+import urllib.request
+
+import pytest
+from PIL import Image
+
+import label_printer_watcher as lpw
+
+SAMPLE = re.compile(r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>[^}]*)\})? (?P<value>\S+)$')
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setitem(lpw.CONFIG, "journal_path", str(tmp_path / "journal.db"))
+    service = lpw.WatcherService(backend=lpw.NullPrintBackend(page_size=(400, 200)))
+    yield service
+    service.scheduler.shutdown()
+    service.journal.close()
+
+
+@pytest.fixture
+def metrics_url(service):
+    server = lpw.MetricsServer(lambda: lpw.render_metrics(service), 0, bind="127.0.0.1")
+    assert server.start()
+    yield f"http://127.0.0.1:{server.port}"
+    server.stop()
+
+
+def parse(text):
+    # {(이름, 레이블 문자열): 값}, {지표 이름: 형식}
+    samples, types = {}, {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, metric_type = line.split(" ")
+            types[name] = metric_type
+        elif line and not line.startswith("#"):
+            match = SAMPLE.match(line)
+            assert match, f"형식이 잘못된 줄: {line!r}"
+            samples[(match["name"], match["labels"] or "")] = float(match["value"])
+    return samples, types
+
+
+def test_metrics_exposition_format(service, metrics_url, tmp_path):
+    label = tmp_path / "A.png"
+    Image.new("L", (200, 100), 0).save(label)
+    job = service.scheduler.submit(str(label), "P", channel='line"1')
+    assert job.done.wait(10) and job.success
+
+    with urllib.request.urlopen(metrics_url + "/metrics", timeout=5) as response:
+        assert response.headers["Content-Type"] == "text/plain; version=0.0.4; charset=utf-8"
+        text = response.read().decode("utf-8")
+    assert text.endswith("\n")
+    samples, types = parse(text)
+
+    # 모든 표본은 앞에서 # TYPE 으로 선언한 지표에 속합니다. (히스토그램은 _bucket/_sum/_count)
+    for name, _ in samples:
+        family = re.sub(r"_(bucket|sum|count)$", "", name) if name not in types else name
+        assert family in types, name
+    channel = 'channel="line\\"1"'  # 레이블 값의 따옴표는 이스케이프합니다.
+    assert samples[("label_printer_labels_total", f'{channel},result="printed"')] == 1
+    assert samples[("label_printer_labels_pending", channel)] == 0
+    assert types["label_printer_label_latency_seconds"] == "histogram"
+
+    buckets = [(labels, value) for (name, labels), value in samples.items()
+               if name == "label_printer_label_latency_seconds_bucket" and labels.startswith(channel)]
+    counts = [value for _, value in buckets]
+    assert counts == sorted(counts) and buckets[-1][0].endswith('le="+Inf"')
+    assert counts[-1] == samples[("label_printer_label_latency_seconds_count", channel)] == 1
+
+
+def test_other_paths_are_not_found(metrics_url):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(metrics_url + "/", timeout=5)
+    assert error.value.code == 404
@@ -0,0 +1,86 @@
+# 프린터 상태 감시: 이상이면 예비 프린터로 보내고, 예비 프린터가 없으면 멈췄다가 복구되면 이어서 인쇄합니다.
+# 멈춘 동안 대기열이 가득 차도 라벨을 넣는 쪽은 기다리지 않고, 넘친 라벨은 순서대로 보관했다가 인쇄합니다.
+import threading
+import time
+
+import pytest
+
+import label_printer_watcher as lpw
+
+
+class Recorder:
+    def __init__(self):
+        self.printed = []
+        self.lock = threading.Lock()
+
+    def __call__(self, image_path, printer_name, devmode, job=None):
+        with self.lock:
+            self.printed.append((image_path, printer_name))
+        return True
+
+
+@pytest.fixture
+def printers():
+    source = lpw.StaticPrinterStatusSource()
+    monitor = lpw.PrinterMonitor(source, interval=0.02)
+    recorder = Recorder()
+    scheduler = lpw.PrintScheduler(print_func=recorder, queue_size=2, workers_per_printer=1, enqueue_timeout=5,
+                                   monitor=monitor)
+    monitor.start()
+    yield source, monitor, recorder, scheduler
+    scheduler.shutdown(wait=False)
+    monitor.stop()
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_unhealthy_printer_fails_over_to_backup(printers):
+    source, monitor, recorder, scheduler = printers
+    source.set("P", False, "용지 걸림")
+    monitor.check("P")
+    job = scheduler.submit("1.png", "P", backup_printer="B")
+    assert job.done.wait(5)
+    assert job.success and job.printed_on == "B"
+    assert recorder.printed == [("1.png", "B")]
+
+
+def test_paused_printer_resumes_after_recovery(printers):
+    source, monitor, recorder, scheduler = printers
+    source.set("P", False, "오프라인")
+    monitor.check("P")
+    job = scheduler.submit("1.png", "P")
+    assert wait_until(lambda: scheduler.paused_printers() == ["P"])
+    assert not job.done.is_set() and recorder.printed == []
+
+    source.set("P", True)
+    assert job.done.wait(5)
+    assert recorder.printed == [("1.png", "P")]
+    assert scheduler.paused_printers() == []
+
+
+def test_overflow_while_paused_does_not_block_and_keeps_order(printers):
+    source, monitor, recorder, scheduler = printers
+    source.set("P", False, "용지 없음")
+    monitor.check("P")
+    first = scheduler.submit("0.png", "P")
+    assert wait_until(lambda: scheduler.paused_printers() == ["P"])
+
+    # 작업자가 든 1건 + 대기열 2건 + 대기 목록 2건까지 받고, 그 다음은 기다리지 않고 rejected
+    started = time.monotonic()
+    jobs = [first] + [scheduler.submit(f"{i}.png", "P") for i in range(1, 6)]
+    assert time.monotonic() - started < 1.0
+    assert [job is not None for job in jobs] == [True] * 5 + [False]
+    stats = scheduler.stats()[0]
+    assert stats["overflow"] == 2 and stats["rejected"] == 1
+
+    source.set("P", True)
+    assert all(job.done.wait(5) for job in jobs[:5])
+    assert [path for path, _ in recorder.printed] == [f"{i}.png" for i in range(5)]
+    assert scheduler.stats()[0]["overflow"] == 0
@@ -0,0 +1,35 @@
+# 래스터 캐시: 메모리 상한을 넘으면 가장 오래 쓰지 않은 래스터부터 버리고, 같은 내용의 라벨은 파일 이름이 달라도 다시 그리지 않습니다.
+from PIL import Image
+
+import label_printer_watcher as lpw
+
+
+def test_least_recently_used_raster_is_evicted_first():
+    cache = lpw.RasterCache(300)
+    for key in "abc":
+        cache.put(key, bytes(100))
+    assert cache.get("a") is not None  # a를 최근에 쓴 것으로 옮김
+    cache.put("d", bytes(100))
+
+    assert "b" not in cache and all(key in cache for key in "acd")
+    assert cache.get("b") is None
+    cache.put("big", bytes(301))  # 상한보다 큰 래스터는 넣지 않음
+    assert "big" not in cache
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (3, 300, 1)
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_same_content_is_rendered_once_per_page_size(tmp_path):
+    image = Image.new("L", (200, 100), 0)
+    for name in ("A.png", "B.png"):
+        image.save(tmp_path / name)
+    cache = lpw.RasterCache(10 * 1024 * 1024)
+    small, large = lpw.NullPrintBackend(page_size=(400, 200)), lpw.NullPrintBackend(page_size=(800, 400))
+
+    first = lpw.load_label_raster(str(tmp_path / "A.png"), "P", None, small, cache=cache)
+    assert lpw.load_label_raster(str(tmp_path / "B.png"), "P", None, small, cache=cache) is first
+    assert first.size == (400, 200)
+    assert lpw.load_label_raster(str(tmp_path / "A.png"), "P", None, large, cache=cache).size == (800, 400)
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (2, 1, 2)
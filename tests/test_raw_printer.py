@@ -0,0 +1,84 @@
+# RAW 인쇄: 9100 포트 대역(로컬 소켓)으로 ZPL을 직접 보내 문서 틀(^XA ... ^XZ), 인쇄 영역 크기, 보낸 바이트 수를 확인합니다.
+import re
+import socket
+import threading
+import time
+
+import pytest
+from PIL import Image, ImageDraw
+
+import label_printer_watcher as lpw
+
+
+class RawPrinter:
+    # 연결 하나를 문서 하나로 보고 받은 바이트를 모아 둡니다.
+    def __init__(self):
+        self.documents = []
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen(4)
+        self.port = self._server.getsockname()[1]
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            with conn:
+                data = b""
+                while chunk := conn.recv(65536):
+                    data += chunk
+            self.documents.append(data)
+
+    def stop(self):
+        self._server.close()
+
+
+@pytest.fixture
+def printer(monkeypatch):
+    printer = RawPrinter()
+    monkeypatch.setitem(lpw.CONFIG, "raw_printers", {"ZD421": {
+        "language": "zpl", "transport": "tcp", "host": "127.0.0.1", "port": printer.port, "page_dots": [200, 100]}})
+    yield printer
+    printer.stop()
+
+
+def make_label(path, box):
+    image = Image.new("L", (400, 200), 255)
+    ImageDraw.Draw(image).rectangle(box, fill=0)
+    image.save(path)
+    return str(path)
+
+
+def wait_for_documents(printer, count):
+    for _ in range(200):
+        if len(printer.documents) >= count:
+            return printer.documents
+        time.sleep(0.01)
+    raise AssertionError(f"문서 {count}건을 받지 못했습니다: {len(printer.documents)}건")
+
+
+def test_label_is_sent_as_one_zpl_document(printer, tmp_path):
+    path = make_label(tmp_path / "A.png", (40, 40, 200, 120))
+    assert lpw.print_label(path, "ZD421")
+    data, = wait_for_documents(printer, 1)
+
+    assert data.startswith(b"^XA^PW200^LL100^FO0,0^GFA,") and data.endswith(b"^XZ\n")
+    assert data.count(b"^XA") == data.count(b"^XZ") == 1
+    total, _, row_bytes = map(int, re.match(rb"\^XA\^PW\d+\^LL\d+\^FO0,0\^GFA,(\d+),(\d+),(\d+),", data).groups())
+    assert (row_bytes, total) == (25, 25 * 100)  # 200 x 100 도트, 한 줄 25바이트
+    assert lpw.raw_print_backend("ZD421").stats() == {"jobs": 1, "bytes_sent": len(data)}
+
+
+def test_batch_is_sent_as_concatenated_documents_on_one_connection(printer, tmp_path):
+    paths = [make_label(tmp_path / "A.png", (40, 40, 200, 120)), make_label(tmp_path / "B.png", (0, 0, 100, 199))]
+    assert lpw.print_label_batch(paths, "ZD421") == [True, True]
+    data, = wait_for_documents(printer, 1)
+
+    documents = re.findall(rb"\^XA.*?\^XZ\n", data, re.S)
+    assert len(documents) == 2 and b"".join(documents) == data
+    assert all(document.startswith(b"^XA^PW200^LL100") for document in documents)
+    assert lpw.raw_print_backend("ZD421").stats() == {"jobs": 2, "bytes_sent": len(data)}
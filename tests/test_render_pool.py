@@ -0,0 +1,60 @@
+# 렌더링 프로세스 풀: 대기열의 라벨을 인쇄 차례 전에 다른 프로세스에서 그려 공유 메모리로 넘기며,
+# 결과는 인쇄 스레드에서 그린 래스터와 같습니다. 프린터가 바뀌어 크기가 다르면 미리 그린 래스터를 버리고 다시 그립니다.
+import os
+
+import pytest
+from PIL import Image
+
+import label_printer_watcher as lpw
+
+PAGE = (400, 200)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setitem(lpw.CONFIG, "raster_mode", "L")
+    pool = lpw.RenderPool(1, lookahead=2, min_bytes=0)
+    yield pool
+    pool.shutdown()
+
+
+def make_label(path):
+    # 내용이 매번 달라 래스터 캐시에 없는 라벨
+    Image.frombytes("L", (300, 150), os.urandom(300 * 150)).save(path)
+    return str(path)
+
+
+def test_prerendered_raster_matches_thread_render(pool, tmp_path):
+    path = make_label(tmp_path / "A.png")
+    job = lpw.PrintJob(path, "P")
+    pool.prerender(job, lpw.NullPrintBackend(page_size=PAGE))
+    assert job.prerender is not None and pool.stats()["pending"] == 1
+
+    key, raster = pool.take(job, PAGE, "L", None)
+    with Image.open(path) as image:
+        expected = lpw.render_label_raster(image, PAGE, "L")
+    assert (raster.mode, raster.size) == ("L", PAGE) and raster.tobytes() == expected.tobytes()
+    assert key[1:] == (PAGE, "L", None) and job.prerender is None
+    assert pool.stats() == {"processes": 1, "lookahead": 2, "submitted": 1, "used": 1, "discarded": 0, "pending": 0}
+
+
+def test_raster_for_another_page_size_is_discarded(pool, tmp_path):
+    job = lpw.PrintJob(make_label(tmp_path / "A.png"), "P")
+    pool.prerender(job, lpw.NullPrintBackend(page_size=PAGE))
+    assert pool.take(job, (800, 400), "L", None) is None  # 예비 프린터의 인쇄 영역이 다른 경우
+    stats = pool.stats()
+    assert (stats["used"], stats["discarded"], stats["pending"]) == (0, 1, 0)
+
+
+def test_scheduler_prints_labels_rendered_by_the_pool(pool, tmp_path, monkeypatch):
+    monkeypatch.setattr(lpw, "_render_pool", pool)
+    backend = lpw.FilePrintBackend(str(tmp_path / "out"), page_size=PAGE)
+    scheduler = lpw.PrintScheduler(backend=backend, workers_per_printer=1)
+    try:
+        assert scheduler.render_pool is pool
+        jobs = [scheduler.submit(make_label(tmp_path / f"{n}.png"), "P") for n in range(3)]
+        assert all(job.done.wait(30) and job.success for job in jobs)
+    finally:
+        scheduler.shutdown()
+    assert pool.stats()["used"] == 3 and pool.stats()["pending"] == 0
+    assert sorted(os.listdir(tmp_path / "out")) == ["000001_0.png", "000002_1.png", "000003_2.png"]
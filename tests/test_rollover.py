@@ -0,0 +1,84 @@
+# 날짜 전환: 가짜 시계로 23:55(다음 날 폴더 미리 감시) -> 00:00 -> 유예 종료(전날 폴더 감시 해제)를 확인합니다.
+import os
+from datetime import datetime, timedelta
+
+import label_printer_watcher as lpw
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.current = now
+
+    def now(self):
+        return self.current
+
+
+class FakeObserver:
+    def __init__(self):
+        self.watches = {}
+
+    def schedule(self, handler, path, recursive=False):
+        watch = self.watches.setdefault(path, object())
+        return watch
+
+    def unschedule(self, watch):
+        for path, known in list(self.watches.items()):
+            if known is watch:
+                del self.watches[path]
+
+    def remove_handler_for_watch(self, handler, watch):
+        pass
+
+    def is_alive(self):
+        return False
+
+
+def make_manager(tmp_path, now):
+    clock = FakeClock(now)
+    manager = lpw.WatchManager(observer=FakeObserver(), clock=clock, prepare_ahead=timedelta(minutes=5),
+                               grace=timedelta(minutes=10))
+    manager.set_channels([lpw.WatchChannel("line1", "라인1", str(tmp_path), "P", handler=object())])
+    return manager, clock
+
+
+def watched_dates(manager):
+    return sorted(os.path.basename(folder) for folder in manager.watched_folders())
+
+
+def test_midnight_rollover_prepare_and_grace(tmp_path):
+    manager, clock = make_manager(tmp_path, datetime(2024, 5, 1, 23, 50))
+    manager.refresh()
+    assert watched_dates(manager) == ["2024-05-01"]
+    # 다음 전환은 자정 5분 전 (prepare_ahead)
+    assert manager.seconds_until_next_transition() == 5 * 60
+
+    clock.current = datetime(2024, 5, 1, 23, 55)
+    added, removed = manager.refresh()
+    assert [os.path.basename(folder) for _, folder in added] == ["2024-05-02"]
+    assert removed == []
+    assert (tmp_path / "2024-05-02").is_dir()  # 라벨이 들어오기 전에 미리 만들어 둠
+    assert watched_dates(manager) == ["2024-05-01", "2024-05-02"]
+
+    clock.current = datetime(2024, 5, 2, 0, 0)
+    added, removed = manager.refresh()
+    assert added == [] and removed == []  # 자정에는 아무것도 바뀌지 않음 (전날 폴더는 유예 중)
+    assert manager.seconds_until_next_transition() == 10 * 60
+
+    clock.current = datetime(2024, 5, 2, 0, 9, 59)
+    manager.refresh()
+    assert watched_dates(manager) == ["2024-05-01", "2024-05-02"]
+
+    clock.current = datetime(2024, 5, 2, 0, 10)
+    added, removed = manager.refresh()
+    assert added == []
+    assert [os.path.basename(folder) for _, folder in removed] == ["2024-05-01"]
+    assert watched_dates(manager) == ["2024-05-02"]
+    # 다음 전환은 그날 23:55
+    assert manager.seconds_until_next_transition() == (datetime(2024, 5, 2, 23, 55) - clock.current).total_seconds()
+
+
+def test_start_inside_grace_window_watches_yesterday(tmp_path):
+    # 자정 직후에 시작하면 전날 폴더도 감시해 늦게 쓰인 라벨을 놓치지 않습니다.
+    manager, _ = make_manager(tmp_path, datetime(2024, 5, 2, 0, 3))
+    manager.refresh()
+    assert watched_dates(manager) == ["2024-05-01", "2024-05-02"]
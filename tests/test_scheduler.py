@@ -0,0 +1,25 @@
+# 인쇄 스케줄러: 대기열이 가득 차 있어도 종료는 정해진 시간 안에 끝납니다.
+import threading
+import time
+
+import label_printer_watcher as lpw
+
+
+def test_shutdown_honours_timeout_with_full_queue():
+    release = threading.Event()
+
+    def slow_print(image_path, printer_name, devmode, job=None):
+        release.wait(10)
+        return True
+
+    scheduler = lpw.PrintScheduler(print_func=slow_print, queue_size=2, workers_per_printer=1, enqueue_timeout=0)
+    try:
+        first = scheduler.submit("0.png", "P")
+        while first.state != "started":
+            time.sleep(0.01)
+        assert scheduler.submit("1.png", "P") and scheduler.submit("2.png", "P")  # 작업자 1건 + 대기열 2건 (가득 참)
+        started = time.monotonic()
+        scheduler.shutdown(wait=True, timeout=0.5)
+        assert time.monotonic() - started < 2.0
+    finally:
+        release.set()
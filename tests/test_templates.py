@@ -0,0 +1,74 @@
+# 템플릿 라벨: 고정 요소는 한 번만 그리고 값이 바뀌는 요소만 라벨마다 그립니다.
+# 날짜 폴더의 CSV 데이터 파일은 행마다(매수만큼) 템플릿 라벨로 인쇄하고, 인쇄를 마친 행은 다시 읽어도 인쇄하지 않습니다.
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import label_printer_watcher as lpw
+
+TEMPLATE = {"size": [200, 100], "elements": [
+    {"type": "rect", "box": [0, 0, 199, 99], "width": 4},
+    {"type": "text", "xy": [20, 40], "text": "품번: {part_no}", "size": 16}]}
+
+
+@pytest.fixture
+def templates(tmp_path):
+    folder = tmp_path / "templates"
+    folder.mkdir()
+    (folder / "box.json").write_text(json.dumps(TEMPLATE), encoding="utf-8")
+    return lpw.TemplateStore(str(folder))
+
+
+def test_template_separates_static_and_variable_elements(templates):
+    template = templates.get("box")
+    assert template is templates.get("box")  # 파일이 바뀌지 않으면 다시 읽지 않습니다.
+    assert template.fields == {"part_no"}
+    assert len(template.static_elements) == len(template.variable_elements) == 1
+
+    a1, b2 = template.label({"part_no": "A1"}), template.label({"part_no": "B2"})
+    assert a1.key == template.label({"part_no": "A1"}).key != b2.key
+    image = a1.render()
+    assert image.size == (200, 100) and image.getpixel((1, 1)) == 0  # 정적 레이어의 테두리
+    assert image.tobytes() != b2.render().tobytes()
+    assert template.static_layer.getpixel((25, 45)) == 255  # 값은 정적 레이어에 그리지 않습니다.
+    with pytest.raises(lpw.TemplateError, match="part_no"):
+        template.label({})
+    with pytest.raises(lpw.TemplateError):
+        templates.get("../box")
+
+
+def test_csv_drop_file_prints_each_row_once(templates, tmp_path):
+    folder = tmp_path / "2024-05-01"
+    folder.mkdir()
+    data_file = folder / "rows.csv"
+    data_file.write_text("template,part_no,copies\nbox,A1,2\nbox,B2,\n", encoding="utf-8")
+    journal = lpw.PrintJournal(str(tmp_path / "journal.db"))
+    printed, lock = [], threading.Lock()
+
+    def print_func(image_path, printer_name, devmode, job=None):
+        assert job.label.render().size == (200, 100)
+        with lock:
+            printed.append((os.path.basename(image_path), job.label.fields["part_no"]))
+        return True
+
+    scheduler = lpw.PrintScheduler(print_func=print_func, listeners=[journal.on_job_stage])
+    expander = lpw.DataFileExpander(scheduler, templates, journal)
+    try:
+        expander.expand(str(data_file), "P").join(5)
+        rows = ("rows.csv#1.1", "rows.csv#1.2", "rows.csv#2")
+        deadline = time.monotonic() + 5
+        while [journal.states_for_folder(str(folder)).get(row) for row in rows] != ["spooled"] * 3:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert sorted(printed) == [("rows.csv#1.1", "A1"), ("rows.csv#1.2", "A1"), ("rows.csv#2", "B2")]
+
+        # 모든 행을 인쇄한 데이터 파일은 다시 읽어도(backfill 등) 인쇄하지 않고 파일을 완료로 기록합니다.
+        expander.expand(str(data_file), "P").join(5)
+        assert len(printed) == 3
+        assert journal.states_for_folder(str(folder))["rows.csv"] == "spooled"
+    finally:
+        scheduler.shutdown()
+        journal.close()
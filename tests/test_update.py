@@ -0,0 +1,181 @@
+# 업데이트: 실제 HTTP 서버(http.server)로 이어받기(Range), 체크섬 불일치, ETag/304, 요청 제한 시 재시도 대기를 확인합니다.
+import hashlib
+import io
+import json
+import os
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import label_printer_watcher as lpw
+
+
+def make_zip():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("Label_Printer_Watcher/Label_Printer_Watcher.exe", os.urandom(4 * lpw.UPDATE_CHUNK_SIZE))
+    return buffer.getvalue()
+
+
+class UpdateServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), UpdateHandler)
+        self.payload = make_zip()
+        self.checksum = hashlib.sha256(self.payload).hexdigest()
+        self.drop_first = False  # 첫 다운로드를 절반만 보내고 연결을 끊음
+        self.release_status = 200
+        self.release_headers = {}
+        self.etag = '"v2"'
+        self.requests = []  # [(경로, 헤더 dict), ...]
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+
+class UpdateHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, dict(self.headers)))
+        if self.path == "/releases/latest":
+            if server.release_status != 200:
+                return self.send(server.release_status, b"{}", server.release_headers)
+            if self.headers.get("If-None-Match") == server.etag:
+                return self.send(304, headers={"ETag": server.etag})
+            release = {"tag_name": "v9.9.9", "assets": [
+                {"name": "update.zip", "browser_download_url": server.url("/update.zip")},
+                {"name": "update.zip.sha256", "browser_download_url": server.url("/update.zip.sha256")}]}
+            return self.send(200, json.dumps(release).encode(), {"ETag": server.etag})
+        if self.path == "/update.zip.sha256":
+            return self.send(200, f"{server.checksum}  update.zip\n".encode())
+        if self.path == "/update.zip":
+            payload = server.payload
+            start = int(self.headers["Range"].split("=")[1].rstrip("-")) if self.headers.get("Range") else 0
+            if start:
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{len(payload) - 1}/{len(payload)}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Length", str(len(payload) - start))
+            self.end_headers()
+            if server.drop_first and not start:
+                server.drop_first = False
+                self.wfile.write(payload[:len(payload) // 2])
+                self.wfile.flush()
+                self.close_connection = True
+                return
+            self.wfile.write(payload[start:])
+            return
+        self.send(404)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(lpw.time, "sleep", lambda seconds: None)  # 이어받기 전 대기 생략
+    server = UpdateServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_resumes_with_range_after_disconnect(server, tmp_path):
+    server.drop_first = True
+    dest = str(tmp_path / "update.zip")
+    lpw.download_file(server.url("/update.zip"), dest, retries=3)
+    with open(dest, "rb") as f:
+        assert f.read() == server.payload
+    # 두 번째 요청은 끊기기 전에 파일에 쓴 위치(청크 단위)부터 이어받습니다.
+    ranges = [headers.get("Range") for path, headers in server.requests if path == "/update.zip"]
+    assert len(ranges) == 2 and ranges[0] is None
+    offset = int(ranges[1].split("=")[1].rstrip("-"))
+    assert 0 < offset <= len(server.payload) // 2 and offset % lpw.UPDATE_CHUNK_SIZE == 0
+    assert not os.path.exists(dest + ".part")
+
+
+def test_fetch_update_verifies_checksum(server, tmp_path):
+    temp_update_folder, program_folder = lpw.fetch_update(server.url("/update.zip"), server.url("/update.zip.sha256"),
+                                                          str(tmp_path))
+    assert os.path.basename(program_folder) == "Label_Printer_Watcher"
+    assert os.listdir(program_folder) == ["Label_Printer_Watcher.exe"]
+    assert not os.path.exists(tmp_path / "update.zip")
+
+
+def test_fetch_update_rejects_checksum_mismatch(server, tmp_path):
+    server.checksum = "0" * 64
+    with pytest.raises(lpw.UpdateError, match="SHA-256"):
+        lpw.fetch_update(server.url("/update.zip"), server.url("/update.zip.sha256"), str(tmp_path))
+    # 검증하지 못한 파일은 풀지 않고 지웁니다.
+    assert not os.path.exists(tmp_path / "update.zip")
+    assert not os.path.exists(tmp_path / "temp_update")
+
+
+def test_release_check_sends_etag_and_uses_cache_on_304(server, tmp_path):
+    cache_path = str(tmp_path / "update_cache.json")
+    url = server.url("/releases/latest")
+    first = lpw.fetch_latest_release(url, cache_path, now=1000.0)
+    assert first["tag_name"] == "v9.9.9"
+
+    # 확인 간격(update_check_interval_minutes) 안에서는 요청하지 않습니다.
+    assert lpw.fetch_latest_release(url, cache_path, now=1060.0) == first
+    assert len(server.requests) == 1
+
+    interval = float(lpw.CONFIG["update_check_interval_minutes"]) * 60
+    assert lpw.fetch_latest_release(url, cache_path, now=1000.0 + interval + 1) == first
+    assert len(server.requests) == 2
+    assert server.requests[1][1].get("If-None-Match") == server.etag
+    with open(cache_path, encoding="utf-8") as f:
+        assert json.load(f)["checked_at"] == 1000.0 + interval + 1
+
+
+def test_rate_limited_release_check_waits_for_retry_after(server, tmp_path):
+    cache_path = str(tmp_path / "update_cache.json")
+    url = server.url("/releases/latest")
+    server.release_status = 429
+    server.release_headers = {"Retry-After": "7200"}
+    assert lpw.fetch_latest_release(url, cache_path, now=1000.0) is None
+    with open(cache_path, encoding="utf-8") as f:
+        cache = json.load(f)
+    assert cache["failures"] == 1 and cache["next_attempt_at"] >= 1000.0 + 7200
+
+    # 재시도 시각 전에는 서버에 다시 요청하지 않습니다.
+    assert lpw.fetch_latest_release(url, cache_path, now=1000.0 + 3600) is None
+    assert len(server.requests) == 1
+
+
+def test_release_check_backoff_doubles_after_each_failure(server, tmp_path):
+    cache_path = str(tmp_path / "update_cache.json")
+    url = server.url("/releases/latest")
+    server.release_status = 500
+    base = float(lpw.CONFIG["update_backoff_minutes"]) * 60
+    now = 1000.0
+    for failures in (1, 2, 3):
+        lpw.fetch_latest_release(url, cache_path, now=now)
+        with open(cache_path, encoding="utf-8") as f:
+            cache = json.load(f)
+        delay = cache["next_attempt_at"] - now
+        assert cache["failures"] == failures
+        assert base * 2 ** (failures - 1) * 0.5 <= delay <= base * 2 ** (failures - 1) * 1.5
+        now = cache["next_attempt_at"]
+
+    # 성공하면 실패 횟수와 재시도 시각을 초기화합니다.
+    server.release_status = 200
+    assert lpw.fetch_latest_release(url, cache_path, now=now)["tag_name"] == "v9.9.9"
+    with open(cache_path, encoding="utf-8") as f:
+        cache = json.load(f)
+    assert cache["failures"] == 0 and cache["next_attempt_at"] == 0